@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
 import asyncio
+from datetime import datetime, timedelta
+
 import click
 
+import settings
+from crawler.db import Engine
 from crawler.factory import Factory
 from crawler.scheduler import Scheduler
-from crawler.helpers import insert_resources
+from crawler.helpers import insert_resources, config_service
+from crawler.http_client import HttpClient
+from crawler.fetcher.simple import SimpleFetcher
+from crawler.history import (
+    HistoryDownloader,
+    Checkpoint,
+    CSVWriter,
+    RateHistoryWriter,
+)
 from utils import get_logger
 
 
@@ -16,6 +28,8 @@ def cli():
 async def schedule_trading(scheduler):
     factory = Factory()
     await factory.init()
+    scheduler.http_client = factory.http_client
+    config_service.start_listening(factory.engine)
     grabber_tasks = await factory.create_grabbers()
     trader_tasks = await factory.create_traders()
     scheduler.add_tasks(grabber_tasks)
@@ -23,6 +37,7 @@ async def schedule_trading(scheduler):
     try:
         await scheduler.run_forever()
     finally:
+        await config_service.stop_listening()
         await factory.cleanup()
         await scheduler.cleanup()
 
@@ -52,5 +67,66 @@ def insert_resources_command():
     loop.run_until_complete(insert_resources())
 
 
+async def download_history(start, end, *, output, concurrency, checkpoint):
+    http_client = HttpClient(limit_per_host=concurrency)
+    fetcher = SimpleFetcher(None, http_client=http_client)
+    checkpoint = Checkpoint(checkpoint).load()
+    try:
+        if output == 'csv':
+            downloader = HistoryDownloader(
+                fetcher, CSVWriter(),
+                checkpoint=checkpoint, concurrency=concurrency)
+            return await downloader.run(start, end)
+
+        async with Engine() as engine:
+            downloader = HistoryDownloader(
+                fetcher, RateHistoryWriter(engine),
+                checkpoint=checkpoint, concurrency=concurrency)
+            return await downloader.run(start, end)
+    finally:
+        await fetcher.close()
+        await http_client.close()
+
+
+@cli.command(name='download_rates')
+@click.option('--start', required=True,
+              type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--end', default=None,
+              type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Last day to download, yesterday by default')
+@click.option('--output', default='db', type=click.Choice(['db', 'csv']))
+@click.option('--concurrency', default=settings.HISTORY_CONCURRENCY)
+@click.option('--checkpoint', default=None, type=click.Path(),
+              help='File with already downloaded days')
+def download_rates(start, end, output, concurrency, checkpoint):
+    """
+    Backfill historical rates. Re-run to download days which failed or were
+    not reached because of interruption.
+    """
+    logger = get_logger()
+    if end is None:
+        end = datetime.now() - timedelta(days=1)
+    if checkpoint is None:
+        checkpoint = settings.HISTORY_DATA_DIR / f'history_{output}.checkpoint'
+
+    loop = asyncio.get_event_loop()
+    try:
+        stats = loop.run_until_complete(download_history(
+            start.date(), end.date(),
+            output=output,
+            concurrency=concurrency,
+            checkpoint=checkpoint,
+        ))
+    except KeyboardInterrupt:
+        logger.debug('Download interrupted, progress is saved...')
+        return
+
+    logger.info('Downloaded %d days, skipped %d, %d items without rates',
+                stats['downloaded'], stats['skipped'], stats['missing'])
+    if stats['failed']:
+        logger.error('Failed to download %d days, run command again to '
+                     'retry them', len(stats['failed']))
+
+
 if __name__ == '__main__':
     cli()
@@ -1,17 +1,90 @@
 import json
+import time
+import uuid
+import pickle
+import asyncio
+from collections import OrderedDict
 
 import aioredis
 
 import settings
+from utils import LoggableMixin
+from crawler.single_flight import SingleFlight
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JsonSerializer(object):
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class PickleSerializer(object):
+    """
+    Binary one, keeps python types (e.g. datetime) intact. Use only for data
+    written by ourselves.
+    """
+    def dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+class MsgpackSerializer(object):
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError('Install msgpack to use msgpack serializer')
+
+    def dumps(self, value):
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'pickle': PickleSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def get_serializer(name):
+    serializer_cls = SERIALIZERS.get(name)
+    if serializer_cls is None:
+        raise ValueError(f'No such serializer: {name}')
+    return serializer_cls()
 
 
 class Cache(object):
 
     MIN_POOL_CONNS = 3
     MAX_POOL_CONNS = 5
+    LOCK_POLL_INTERVAL = 0.05
+    # Deletes lock only when it is still held by the one releasing it
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
 
-    def __init__(self):
+    def __init__(self, *, namespace=settings.CACHE_NAMESPACE,
+                 serializer=settings.CACHE_SERIALIZER):
         self._pool = None
+        self.namespace = namespace
+        if isinstance(serializer, str):
+            serializer = get_serializer(serializer)
+        self.serializer = serializer
+        # Concurrent computations of the same key within the process
+        self._computing = SingleFlight(ttl=0)
 
     async def _create_pool(self):
         self._pool = await aioredis.create_redis_pool(
@@ -20,14 +93,288 @@ class Cache(object):
             maxsize=self.MAX_POOL_CONNS,
         )
 
-    async def set(self, key, value):
-        data = json.dumps(value)
-        return await self._pool.set(key, data)
+    def make_key(self, *parts):
+        """
+        Build key like `chemister:rates:privatbank:01_12_18:USD`.
+        """
+        return ':'.join(str(part) for part in (self.namespace, *parts))
+
+    def _loads(self, data):
+        if data is not None:
+            return self.serializer.loads(data)
+
+    async def set(self, key, value, *, ttl=None):
+        data = self.serializer.dumps(value)
+        return await self._pool.set(key, data, expire=ttl or 0)
 
     async def get(self, key):
         data = await self._pool.get(key)
-        return json.loads(data)
+        return self._loads(data)
+
+    async def delete(self, *keys):
+        if keys:
+            return await self._pool.delete(*keys)
+        return 0
+
+    async def mget(self, keys):
+        """
+        Values for all the keys in one round trip, None for missing ones.
+        """
+        if not keys:
+            return []
+        data = await self._pool.mget(*keys)
+        return [self._loads(item) for item in data]
+
+    async def mset(self, mapping, *, ttl=None):
+        """
+        Set all the values in one round trip.
+        """
+        if not mapping:
+            return
+
+        transaction = self._pool.multi_exec()
+        for key, value in mapping.items():
+            transaction.set(key, self.serializer.dumps(value), expire=ttl or 0)
+        return await transaction.execute()
+
+    def pipeline(self):
+        """
+        Batch raw commands, values are not serialized.
+        """
+        return self._pool.pipeline()
+
+    async def get_or_compute(self, key, compute, *, ttl=None,
+                             lock_timeout=settings.CACHE_LOCK_TIMEOUT):
+        """
+        Return cached value or compute it with `compute` coroutine function.
+        Only one caller computes the value at a time, others (within the
+        process and in other processes) wait for the result.
+        """
+        found, value = await self._get_computed(key)
+        if found:
+            return value
+
+        return await self._computing.run(
+            key, self._compute, key, compute, ttl, lock_timeout)
+
+    def _get_none_key(self, key):
+        return f'{key}:none'
+
+    async def _get_computed(self, key):
+        """
+        None can be a computed value too, it is marked with a separate key
+        not to compute it again on each call.
+        """
+        data, is_none = await self._pool.mget(key, self._get_none_key(key))
+        if data is not None:
+            return True, self._loads(data)
+        return is_none is not None, None
+
+    async def _compute(self, key, compute, ttl, lock_timeout):
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        while True:
+            acquired = await self._pool.set(
+                lock_key, token,
+                pexpire=int(lock_timeout * 1000),
+                exist=self._pool.SET_IF_NOT_EXIST,
+            )
+            if acquired:
+                try:
+                    value = await compute()
+                    if value is None:
+                        await self._pool.set(
+                            self._get_none_key(key), 1,
+                            expire=settings.CACHE_NONE_TTL)
+                    else:
+                        await self.set(key, value, ttl=ttl)
+                    return value
+                finally:
+                    await self._pool.eval(
+                        self.RELEASE_LOCK_SCRIPT,
+                        keys=[lock_key], args=[token])
+
+            # Another process computes the value. Lock expires if it dies.
+            started = time.monotonic()
+            while time.monotonic() - started < lock_timeout:
+                await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+                found, value = await self._get_computed(key)
+                if found:
+                    return value
+                if not await self._pool.exists(lock_key):
+                    break
 
     async def close(self):
         self._pool.close()
         await self._pool.wait_closed()
+
+
+class TieredCache(LoggableMixin):
+    """
+    Bounded in-process LRU in front of redis `Cache`. Entries live for `ttl`
+    seconds at most and are dropped as soon as any process changes them
+    through a tiered cache: changes are announced via redis pub/sub.
+    Values are shared between callers and must not be mutated.
+    """
+    def __init__(self, cache, *,
+                 maxsize=settings.L1_CACHE_SIZE,
+                 ttl=settings.L1_CACHE_TTL,
+                 channel=settings.CACHE_INVALIDATION_CHANNEL):
+        self.cache = cache
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.channel = channel
+        self._data = OrderedDict()
+        # Not to invalidate values this process has just set
+        self._sender_id = uuid.uuid4().hex
+        self._listen_task = None
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expired': 0,
+            'invalidated': 0,
+        }
+
+    def make_key(self, *parts):
+        return self.cache.make_key(*parts)
+
+    def stats(self):
+        return dict(self.counters, size=len(self._data))
+
+    def _get_local(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.counters['expired'] += 1
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def _set_local(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _drop_local(self, keys):
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                self.counters['invalidated'] += 1
+
+    async def _publish(self, keys):
+        await self.cache._pool.publish_json(self.channel, {
+            'sender': self._sender_id,
+            'keys': list(keys),
+        })
+
+    def handle_invalidation(self, message):
+        if message.get('sender') != self._sender_id:
+            self._drop_local(message.get('keys', []))
+
+    async def get(self, key):
+        found, value = self._get_local(key)
+        if found:
+            self.counters['hits'] += 1
+            return value
+
+        self.counters['misses'] += 1
+        value = await self.cache.get(key)
+        if value is not None:
+            self._set_local(key, value)
+        return value
+
+    async def mget(self, keys):
+        values = {}
+        missing = []
+        for key in keys:
+            found, value = self._get_local(key)
+            if found:
+                self.counters['hits'] += 1
+                values[key] = value
+            else:
+                self.counters['misses'] += 1
+                missing.append(key)
+
+        if missing:
+            for key, value in zip(missing, await self.cache.mget(missing)):
+                values[key] = value
+                if value is not None:
+                    self._set_local(key, value)
+
+        return [values[key] for key in keys]
+
+    async def set(self, key, value, *, ttl=None):
+        result = await self.cache.set(key, value, ttl=ttl)
+        self._set_local(key, value)
+        await self._publish([key])
+        return result
+
+    async def mset(self, mapping, *, ttl=None):
+        if not mapping:
+            return
+
+        result = await self.cache.mset(mapping, ttl=ttl)
+        for key, value in mapping.items():
+            self._set_local(key, value)
+        await self._publish(mapping.keys())
+        return result
+
+    async def delete(self, *keys):
+        result = await self.cache.delete(*keys)
+        self._drop_local(keys)
+        if keys:
+            await self._publish(keys)
+        return result
+
+    async def get_or_compute(self, key, compute, **kwargs):
+        found, value = self._get_local(key)
+        if found:
+            self.counters['hits'] += 1
+            return value
+
+        self.counters['misses'] += 1
+        value = await self.cache.get_or_compute(key, compute, **kwargs)
+        if value is not None:
+            self._set_local(key, value)
+        return value
+
+    def pipeline(self):
+        """
+        Raw commands bypass in-process layer and are not announced.
+        """
+        return self.cache.pipeline()
+
+    def start_listening(self):
+        if self._listen_task is None:
+            self._listen_task = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        pool = self.cache._pool
+        channel, = await pool.subscribe(self.channel)
+        try:
+            while await channel.wait_message():
+                self.handle_invalidation(await channel.get_json())
+        finally:
+            # Stale entries are possible from now on, rely on ttl only
+            self.logger.warning('Stopped listening for cache invalidation')
+
+    async def stop_listening(self):
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+            await self.cache._pool.unsubscribe(self.channel)
+
+    async def close(self):
+        await self.stop_listening()
+        await self.cache.close()
@@ -1,7 +1,82 @@
+import time
+
 from aiopg.sa import create_engine
 from sqlalchemy.dialects import postgresql
 
 import settings
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class MeteredEngine(object):
+    """
+    Engine wrapper collecting pool usage: how long callers wait for a free
+    connection and how many connections are in use at once.
+    """
+    def __init__(self, engine, *,
+                 slow_acquire=settings.DATABASE_POOL_SLOW_ACQUIRE):
+        self._engine = engine
+        self.slow_acquire = slow_acquire
+        self.counters = {
+            'acquired': 0,
+            'slow_acquired': 0,
+            'wait_time': 0,
+            'max_wait_time': 0,
+            'in_use': 0,
+            'max_in_use': 0,
+        }
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+    def acquire(self):
+        return _MeteredConnection(self)
+
+    def stats(self):
+        return dict(
+            self.counters,
+            size=self._engine.size,
+            freesize=self._engine.freesize,
+            maxsize=self._engine.maxsize,
+        )
+
+    def _record_acquire(self, wait_time):
+        counters = self.counters
+        counters['acquired'] += 1
+        counters['wait_time'] += wait_time
+        counters['max_wait_time'] = max(counters['max_wait_time'], wait_time)
+        counters['in_use'] += 1
+        counters['max_in_use'] = max(counters['max_in_use'],
+                                     counters['in_use'])
+        if wait_time >= self.slow_acquire:
+            counters['slow_acquired'] += 1
+            logger.warning('Waited %.2f seconds for db connection, '
+                           'pool might be too small: %s',
+                           wait_time, self.stats())
+
+    def _record_release(self):
+        self.counters['in_use'] -= 1
+
+
+class _MeteredConnection(object):
+    def __init__(self, engine):
+        self._engine = engine
+        self._conn = None
+
+    async def __aenter__(self):
+        started = time.monotonic()
+        self._conn = await self._engine._engine.acquire()
+        self._engine._record_acquire(time.monotonic() - started)
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._engine._engine.release(self._conn)
+        finally:
+            self._conn = None
+            self._engine._record_release()
 
 
 async def get_engine():
@@ -10,7 +85,7 @@ async def get_engine():
         minsize=settings.DATABASE_POOL_MINSIZE,
         maxsize=settings.DATABASE_POOL_MAXSIZE,
     )
-    return engine
+    return MeteredEngine(engine)
 
 
 async def close_engine(engine):
@@ -30,6 +105,32 @@ class Engine(object):
         await close_engine(self.engine)
 
 
+class Connection(object):
+    """
+    Acquire connection from given engine or from a temporary one when
+    caller is not bound to any.
+    """
+    def __init__(self, engine=None):
+        self.engine = engine
+        self._engine_cm = None
+        self._conn_cm = None
+
+    async def __aenter__(self):
+        engine = self.engine
+        if engine is None:
+            self._engine_cm = Engine()
+            engine = await self._engine_cm.__aenter__()
+        self._conn_cm = engine.acquire()
+        return await self._conn_cm.__aenter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._conn_cm.__aexit__(exc_type, exc, tb)
+        finally:
+            if self._engine_cm is not None:
+                await self._engine_cm.__aexit__(exc_type, exc, tb)
+
+
 def show_sql_query_for_clause(sa_clause, logger=None):
     # todo: this does not display values
     # http://docs.sqlalchemy.org/en/latest/faq/sqlexpressions.html#faq-sql-expression-string
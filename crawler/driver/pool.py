@@ -0,0 +1,170 @@
+"""
+Bounded pool of warm browser drivers shared between browser fetchers.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from selenium.common.exceptions import WebDriverException
+
+import settings
+from utils import LoggableMixin
+from crawler.driver.chrome import ChromeDriver
+
+
+def get_proxy_uri(proxy, driver_cls):
+    """
+    Proxy format may vary based on browser driver used. This helpers allows
+    to figure out which format is correct.
+    """
+    proxy_uri = None
+    if proxy and driver_cls == ChromeDriver:
+        proxy_uri = proxy.chrome_uri
+    elif proxy:
+        proxy_uri = proxy.uri
+
+    return proxy_uri
+
+
+class PooledDriver(object):
+    def __init__(self, driver_wrapper):
+        self.driver_wrapper = driver_wrapper
+        self.pages = 0
+
+    @property
+    def driver(self):
+        return self.driver_wrapper.driver
+
+    def quit(self):
+        self.driver.quit()
+
+
+class _Lease(object):
+    def __init__(self, pool):
+        self.pool = pool
+        self.pooled = None
+
+    async def __aenter__(self):
+        self.pooled = await self.pool.acquire()
+        return self.pooled
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Driver may be left in unknown state after a crash. When the lease
+        # is cancelled the call may still be running within executor's
+        # thread, so driver cannot be handed to anyone else either.
+        broken = exc_type is not None
+        await self.pool.release(self.pooled, broken=broken)
+
+
+class BrowserPool(LoggableMixin):
+    """
+    Keeps up to `size` drivers alive and leases them to fetchers. Driver is
+    recycled after `max_pages` page loads or after a crash. All blocking
+    driver calls run on a single long-lived executor.
+    """
+    DEFAULT_DRIVER_CLS = ChromeDriver
+
+    def __init__(self, *, driver_cls=None, proxy_uri=None,
+                 size=settings.BROWSER_POOL_SIZE,
+                 max_pages=settings.BROWSER_MAX_PAGES):
+        self.driver_cls = driver_cls or self.DEFAULT_DRIVER_CLS
+        self.proxy_uri = proxy_uri
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = deque()
+        self._semaphore = None
+        self._executor = None
+        self._closed = False
+
+    @property
+    def semaphore(self):
+        # Created lazily to be bound to a running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run blocking driver call on the pool's executor.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(fn, *args, **kwargs))
+
+    def _create_driver(self):
+        self.logger.info('Starting %s driver with proxy: %s',
+                         self.driver_cls.__name__, self.proxy_uri)
+        return PooledDriver(self.driver_cls(proxy_uri=self.proxy_uri))
+
+    def _quit_driver(self, pooled):
+        try:
+            pooled.quit()
+        except WebDriverException as e:
+            self.logger.warning('Failed to quit driver: %s', e)
+
+    async def acquire(self):
+        if self._closed:
+            raise RuntimeError('Browser pool is closed')
+
+        await self.semaphore.acquire()
+        creating = None
+        try:
+            if self._idle:
+                return self._idle.pop()
+            creating = self.executor.submit(self._create_driver)
+            return await asyncio.wrap_future(creating)
+        except BaseException:
+            self.semaphore.release()
+            if creating is not None:
+                # Driver started after cancellation has no owner
+                creating.add_done_callback(self._quit_abandoned)
+            raise
+
+    def _quit_abandoned(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._quit_driver(future.result())
+
+    async def release(self, pooled, *, broken=False):
+        try:
+            pooled.pages += 1
+            if broken or self._closed or pooled.pages >= self.max_pages:
+                self.logger.debug('Recycling driver after %s pages',
+                                  pooled.pages)
+                await self.run(self._quit_driver, pooled)
+            else:
+                self._idle.append(pooled)
+        finally:
+            self.semaphore.release()
+
+    def lease(self):
+        """
+        Use as `async with pool.lease() as pooled` to get a driver.
+        """
+        return _Lease(self)
+
+    async def warm_up(self, count=None):
+        """
+        Start drivers in advance so first requests do not wait for them.
+        """
+        count = min(count or self.size, self.size)
+        missing = count - len(self._idle)
+        drivers = await asyncio.gather(
+            *[self.run(self._create_driver) for _ in range(missing)])
+        self._idle.extend(drivers)
+
+    async def close(self):
+        self._closed = True
+        while self._idle:
+            await self.run(self._quit_driver, self._idle.pop())
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
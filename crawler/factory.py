@@ -10,18 +10,41 @@ import settings
 from utils import get_logger
 from crawler.models.resource import Resource
 from crawler.scheduled_task import ScheduledTask
-from crawler.proxy import Proxy
-from crawler.cache import Cache
-from crawler.db import get_engine
+from crawler.proxy import Proxy, ProxyPool
+from crawler.cache import Cache, TieredCache
+from crawler.http_client import HttpClient
+from crawler.response_cache import MemoryResponseCache, RedisResponseCache
+from crawler.retry import RetryPolicy
+from crawler.single_flight import SingleFlight
+from crawler.parser.pool import ParserPool
+from crawler.db import get_engine, close_engine
+from crawler.driver.pool import BrowserPool, get_proxy_uri
 
 # what?
 from trader.shift_trader import ShiftTrader_v0
 
 
 class Factory(object):
-    def __init__(self, resources=None):
+    def __init__(self, resources=None, *, engine=None, single_flight=None,
+                 parser_pool=None):
         self.resources = resources or []
+        # One pool of db connections for all grabbers and traders
+        self.engine = engine
+        self._own_engine = engine is None
         self.cache = None
+        self.http_client = None
+        self.response_caches = {}
+        self.browser_pools = {}
+        # Resources with the same proxies share health checks and stats
+        self.proxy_pools = {}
+        # Shared to track hosts health across all fetchers
+        self.retry_policy = RetryPolicy()
+        # Pass the same instance to dedup requests between factories too
+        self.single_flight = single_flight or SingleFlight()
+        # Worker processes are shared by parsers of all resources; pass the
+        # same instance not to spawn them for each factory
+        self._own_parser_pool = parser_pool is None
+        self.parser_pool = parser_pool or ParserPool()
         self.logger = get_logger(self.__class__.__name__.lower())
 
     def load_resources(self):
@@ -37,16 +60,49 @@ class Factory(object):
         way as database engine.
         """
         self.logger.debug('Initializing cache...')
-        self.cache = Cache()
-        await self.cache._create_pool()
+        cache = Cache()
+        await cache._create_pool()
+        # Grabbers and traders mostly read values they have just written
+        self.cache = TieredCache(cache)
+        self.cache.start_listening()
+
+    def init_http_client(self):
+        """
+        One pooled connector shared by all fetchers, notifier and healthcheck
+        so keep-alive connections are reused between updates.
+        """
+        self.logger.debug('Initializing http client...')
+        self.http_client = HttpClient()
+
+    async def init_engine(self):
+        if self.engine is None:
+            self.logger.debug('Initializing db engine...')
+            self.engine = await get_engine()
 
     async def init(self):
         self.load_resources()
+        self.init_http_client()
+        await self.init_engine()
         await self.init_cache()
 
     async def cleanup(self):
         self.logger.debug('Closing factory resources...')
         await self.cache.close()
+        if self.http_client is not None:
+            await self.http_client.close()
+        for pool in self.browser_pools.values():
+            await pool.close()
+        for pool in self.proxy_pools.values():
+            await pool.close()
+        self.logger.debug('Parser pool usage: %s', self.parser_pool.stats())
+        if self._own_parser_pool:
+            await self.parser_pool.close()
+        if self._own_engine and self.engine is not None:
+            stats = getattr(self.engine, 'stats', None)
+            if stats is not None:
+                self.logger.debug('Db pool usage: %s', stats())
+            await close_engine(self.engine)
+            self.engine = None
 
     def _load_cls_from_module(self, subpackage, module_name):
         """
@@ -71,9 +127,61 @@ class Factory(object):
 
         return cls_obj
 
-    def get_parser(self, parser_name):
+    def get_parser(self, parser_name, engine_name=None):
         parser_cls = self._load_cls_from_module('parser', parser_name)
-        return parser_cls()
+        return parser_cls.with_engine(engine_name)
+
+    def get_response_cache(self, cache_name):
+        """
+        Response caches are shared between fetchers as entries are keyed by
+        url anyway.
+        """
+        if cache_name is None:
+            return
+
+        if cache_name not in self.response_caches:
+            if cache_name == 'memory':
+                response_cache = MemoryResponseCache()
+            elif cache_name == 'redis':
+                response_cache = RedisResponseCache(self.cache)
+            else:
+                raise ValueError(
+                    f'No such response cache: {cache_name}. '
+                    f'Check resources file syntax.'
+                )
+            self.response_caches[cache_name] = response_cache
+
+        return self.response_caches[cache_name]
+
+    def get_browser_pool(self, driver_cls, proxy):
+        """
+        Drivers are interchangeable only when launched with the same browser
+        and proxy, so pool is shared between fetchers on that basis.
+        """
+        driver_cls = driver_cls or BrowserPool.DEFAULT_DRIVER_CLS
+        proxy_uri = get_proxy_uri(proxy, driver_cls)
+        key = (driver_cls, proxy_uri)
+        if key not in self.browser_pools:
+            self.browser_pools[key] = BrowserPool(
+                driver_cls=driver_cls,
+                proxy_uri=proxy_uri,
+            )
+        return self.browser_pools[key]
+
+    def get_proxy_pool(self, resource):
+        proxy_cfg = resource.proxy
+        if not proxy_cfg.pool:
+            return
+
+        proxies = [Proxy(**item) for item in proxy_cfg.pool]
+        if proxy_cfg.ip:
+            proxies.insert(0, Proxy(ip=proxy_cfg.ip, port=proxy_cfg.port))
+
+        key = frozenset(proxy.uri for proxy in proxies)
+        if key not in self.proxy_pools:
+            self.proxy_pools[key] = ProxyPool(
+                proxies, http_client=self.http_client)
+        return self.proxy_pools[key]
 
     def get_fetcher(self, resource):
         fetcher_cfg = resource.fetcher
@@ -82,18 +190,38 @@ class Factory(object):
         driver_name = fetcher_cfg.driver
 
         proxy = None
+        proxy_pool = None
         if proxy_cfg.use:
-            proxy = Proxy(ip=resource.proxy.ip, port=resource.proxy.port)
+            proxy_pool = self.get_proxy_pool(resource)
+            if proxy_pool is not None:
+                # Browser is launched with a proxy, keep it for the session
+                # until it becomes unhealthy, see `BrowserFetcher`
+                proxy = proxy_pool.sticky(resource.name)
+            else:
+                proxy = Proxy(ip=resource.proxy.ip, port=resource.proxy.port)
 
         driver_cls = None
         if driver_name:
             driver_cls = self._load_cls_from_module('driver', driver_name)
 
+        browser_pool = None
+        if fetcher_name == 'browser':
+            browser_pool = self.get_browser_pool(driver_cls, proxy)
+
         fetcher_cls = self._load_cls_from_module('fetcher', fetcher_name)
         return fetcher_cls(
             base_url=None,
             proxy=proxy,
             driver_cls=driver_cls,
+            http_client=self.http_client,
+            response_cache=self.get_response_cache(fetcher_cfg.cache),
+            browser_pool=browser_pool,
+            wait=fetcher_cfg.wait,
+            retry_policy=self.retry_policy,
+            single_flight=self.single_flight,
+            proxy_pool=proxy_pool,
+            proxy_key=resource.name,
+            get_browser_pool=self.get_browser_pool,
         )
 
     def get_grabber(self, resource, *, fetcher, parser, cache, engine):
@@ -103,32 +231,34 @@ class Factory(object):
             resource=resource,
             fetcher=fetcher,
             parser=parser,
+            parser_pool=self.parser_pool,
             cache=cache,
             engine=engine,
         )
 
     async def create_grabbers(self):
         grabbers = []
-        # Each grabber is responsible for closing resources within itself
+        # Each grabber is responsible for closing its fetcher
         for res in self.resources:
             fetcher = self.get_fetcher(res)
-            parser = self.get_parser(res.parser)
-            engine = await get_engine()
+            parser = self.get_parser(res.parser, res.parser_engine)
             grabber = self.get_grabber(
                 resource=res,
                 fetcher=fetcher,
                 parser=parser,
                 cache=self.cache,
-                engine=engine,
+                engine=self.engine,
             )
             grabbers.append(grabber)
         return grabbers
 
     async def create_traders(self):
         # Create multiple traders for different algorithms
-        # todo: reuse cache from here
         trader = ShiftTrader_v0(
             starting_amount=10000,
+            http_client=self.http_client,
+            engine=self.engine,
+            cache=self.cache,
         )
         await trader.init()
         return [
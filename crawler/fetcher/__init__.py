@@ -2,9 +2,12 @@ from abc import ABC, abstractmethod
 
 
 class BaseFetcher(ABC):
-    def __init__(self, base_url, *, proxy=None, **kwargs):
+    def __init__(self, base_url, *, proxy=None, retry_policy=None,
+                 single_flight=None, **kwargs):
         self.base_url = base_url
         self.proxy = proxy
+        self.retry_policy = retry_policy
+        self.single_flight = single_flight
 
     @abstractmethod
     async def close(self):
@@ -18,5 +21,30 @@ class BaseFetcher(ABC):
         Make a request to remote resource.
         """
 
+    async def request_if_modified(self, url=None, **kwargs):
+        """
+        Make a request and tell whether content has changed since previous
+        one. Fetchers without conditional requests support always report
+        content as modified.
+        """
+        return True, await self.request(url, **kwargs)
+
+    async def _run_with_retry(self, url, fn, *args, **kwargs):
+        """
+        Invoke request function according to retry policy if any.
+        """
+        if self.retry_policy is None:
+            return await fn(*args, **kwargs)
+        return await self.retry_policy.run(url, fn, *args, **kwargs)
+
+    async def _run_shared(self, key, fn, *args, **kwargs):
+        """
+        Share result of request function with concurrent identical requests
+        if single flight is enabled.
+        """
+        if self.single_flight is None:
+            return await fn(*args, **kwargs)
+        return await self.single_flight.run(key, fn, *args, **kwargs)
+
     def install_proxy(self, proxy):
         self.proxy = proxy
@@ -1,6 +1,4 @@
 import time
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import WebDriverException
@@ -8,69 +6,114 @@ from selenium.common.exceptions import WebDriverException
 from utils import get_logger
 from crawler.fetcher import BaseFetcher
 from crawler.driver.chrome import ChromeDriver
+from crawler.driver.pool import BrowserPool, get_proxy_uri
 
 
 class BrowserFetcher(BaseFetcher):
     DEFAULT_DRIVER_CLS = ChromeDriver
+    # Fixed delays used only when resource has no readiness conditions
     DEFAULT_WAIT_TIME = 2
     ACTIONS_DELAY_TIME = 2
+    # Backoff for polling readiness conditions
+    POLL_INTERVAL = 0.1
+    MAX_POLL_INTERVAL = 1
 
     def __init__(self, base_url, *,
-                 driver_cls=None, xpath=None, proxy=None):
-        super().__init__(base_url, proxy=proxy)
+                 driver_cls=None, xpath=None, proxy=None, browser_pool=None,
+                 wait=None, retry_policy=None, single_flight=None,
+                 proxy_pool=None, proxy_key=None, get_browser_pool=None,
+                 **kwargs):
+        super().__init__(base_url, proxy=proxy, retry_policy=retry_policy,
+                         single_flight=single_flight)
 
         driver_cls = driver_cls or self.DEFAULT_DRIVER_CLS
         proxy_uri = self._get_proxy_uri(proxy, driver_cls)
-        driver_wrapper = driver_cls(proxy_uri=proxy_uri)
 
-        self.driver = driver_wrapper.driver
+        # Fetcher owns the pool only when it is not shared via factory
+        self._own_pool = browser_pool is None
+        if browser_pool is None:
+            browser_pool = BrowserPool(
+                driver_cls=driver_cls,
+                proxy_uri=proxy_uri,
+                size=1,
+            )
+
+        self.driver_cls = driver_cls
+        self.pool = browser_pool
         self.proxy_uri = proxy_uri
+        # Sticky proxy is checked on each request and browser pool follows
+        # it when the proxy is replaced
+        self.proxy_pool = proxy_pool
+        self.proxy_key = proxy_key
+        self._get_browser_pool = get_browser_pool
         self.xpath = xpath
+        self.wait = wait  # WaitConfig
         self.logger = get_logger(self.__class__.__name__.lower())
 
     def _get_proxy_uri(self, proxy, driver_cls):
-        """
-        Proxy format may vary based on browser driver used. This helpers allows
-        to figure out which format is correct.
-        """
-        proxy_uri = None
-        if proxy and driver_cls == ChromeDriver:
-            proxy_uri = proxy.chrome_uri
-        elif proxy:
-            proxy_uri = proxy.uri
-
-        return proxy_uri
+        return get_proxy_uri(proxy, driver_cls)
 
     async def request(self, url=None):
         if url is None:
             url = self.base_url
 
+        # Same page may be cropped differently by different resources
+        return await self._run_shared(
+            ('browser', url, self.xpath),
+            self._run_with_retry, url, self._request, url,
+        )
+
+    def _select_pool(self):
+        if self.proxy_pool is None or self._get_browser_pool is None:
+            return self.proxy, self.pool
+
+        proxy = self.proxy_pool.sticky(self.proxy_key)
+        if proxy is not self.proxy:
+            self.proxy = proxy
+            self.proxy_uri = self._get_proxy_uri(proxy, self.driver_cls)
+            self.pool = self._get_browser_pool(self.driver_cls, proxy)
+        return self.proxy, self.pool
+
+    async def _request(self, url):
+        proxy, pool = self._select_pool()
         self.logger.info(f'Requesting {url} with proxy: {self.proxy_uri}')
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            loop = asyncio.get_event_loop()
-            future = loop.run_in_executor(
-                executor, self._get, url, self.DEFAULT_WAIT_TIME)
-        return await future
-
-    def _get(self, url: str, wait: int=0) -> str:
-        self.driver.delete_all_cookies()
-        self.driver.get(url)
+        started = time.monotonic()
+        try:
+            async with pool.lease() as pooled:
+                result = await pool.run(
+                    self._get, pooled.driver, url, self.DEFAULT_WAIT_TIME)
+        except WebDriverException:
+            self._report_proxy(proxy, error=True)
+            raise
+
+        self._report_proxy(proxy, latency=time.monotonic() - started)
+        return result
+
+    def _report_proxy(self, proxy, *, latency=None, error=False):
+        if self.proxy_pool is not None and proxy is not None:
+            self.proxy_pool.report(proxy, latency=latency, error=error)
+
+    def _get(self, driver, url: str, wait: int=0) -> str:
+        driver.delete_all_cookies()
+        driver.get(url)
         # Wait for js on page to render
-        time.sleep(wait)
+        state = {}
+        self._wait_ready(driver, wait, state=state)
 
-        self._do_actions()
+        self._do_actions(driver, state=state)
         # Crop page to particular region if needed
         if self.xpath is not None:
-            return self.driver. \
+            return driver. \
                 find_element_by_xpath(self.xpath). \
                 get_attribute('outerHTML')
 
-        return self.driver.page_source
+        return driver.page_source
 
-    def _do_actions(self):
+    def _do_actions(self, driver, state=None):
         """
         Make some actions on a page like clicking tabs or open
-        collapsed elements.
+        collapsed elements. `state` of readiness polling is the one left
+        by waiting for the page.
         """
         expand_elements_text = (
             'Show More',
@@ -79,18 +122,83 @@ class BrowserFetcher(BaseFetcher):
         for guess_text in expand_elements_text:
             try:
                 # Add any logic for common elements here
-                elem = self.driver.find_element_by_xpath(
+                elem = driver.find_element_by_xpath(
                     f'//*[contains(text(), "{guess_text}")]')
 
-                self._click_element(elem)
+                url = driver.current_url
+                self._click_element(driver, elem)
             except NoSuchElementException:
                 pass
             else:
+                self._wait_action(driver, url, state)
                 break
-        # Wait for page to process events
-        time.sleep(self.ACTIONS_DELAY_TIME)
 
-    def _click_element(self, elem):
+    def _wait_action(self, driver, url, state=None):
+        """
+        Wait for page to process events of an action. Page which is still
+        ready after it is used as is unless the action has navigated away.
+        """
+        if self.wait is None:
+            return self._wait_ready(driver, self.ACTIONS_DELAY_TIME)
+
+        if state is None:
+            state = {}
+        if driver.current_url != url:
+            # Readiness of previous page tells nothing about the new one
+            state.clear()
+        elif self._is_ready(driver, state):
+            return True
+        return self._wait_ready(driver, state=state)
+
+    def _wait_ready(self, driver, default_wait=0, *, state=None):
+        """
+        Poll readiness conditions with increasing interval until all of them
+        are met or timeout expires. Sleep for `default_wait` seconds when
+        resource has no conditions configured.
+        """
+        if self.wait is None:
+            time.sleep(default_wait)
+            return True
+
+        if state is None:
+            state = {}
+        interval = self.POLL_INTERVAL
+        deadline = time.monotonic() + self.wait.timeout
+        while not self._is_ready(driver, state):
+            if time.monotonic() >= deadline:
+                self.logger.warning(
+                    f'Page is not ready within {self.wait.timeout} seconds. '
+                    f'Using it as is, you may get partial results.')
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+        return True
+
+    def _is_ready(self, driver, state):
+        if self.wait.css is not None and \
+                not driver.find_elements_by_css_selector(self.wait.css):
+            return False
+
+        if self.wait.xpath is not None and \
+                not driver.find_elements_by_xpath(self.wait.xpath):
+            return False
+
+        if self.wait.script is not None and \
+                not driver.execute_script(f'return !!({self.wait.script});'):
+            return False
+
+        if self.wait.network_idle:
+            # Idle when no new resources were loaded since previous poll
+            resources_count = driver.execute_script(
+                "return performance.getEntriesByType('resource').length;")
+            previous_count = state.get('resources_count')
+            state['resources_count'] = resources_count
+            if resources_count != previous_count:
+                return False
+
+        return True
+
+    def _click_element(self, driver, elem):
         try:
             elem.click()
         except WebDriverException as e:
@@ -103,7 +211,7 @@ class BrowserFetcher(BaseFetcher):
             xpos = pos['x']
             ypos = pos['y']
             # Element should be available to click
-            self.driver.execute_script(
+            driver.execute_script(
                 f'window.scrollBy({xpos}, {ypos})', '')
             elem.click()
         except WebDriverException as e:
@@ -111,11 +219,6 @@ class BrowserFetcher(BaseFetcher):
                 f'Received unexpected error: {e} '
                 f'Ignoring it, but you may get corrupted/partial results.')
 
-    def _close(self):
-        self.driver.close()
-
     async def close(self):
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            loop = asyncio.get_event_loop()
-            future = loop.run_in_executor(executor, self._close)
-            await future
+        if self._own_pool:
+            await self.pool.close()
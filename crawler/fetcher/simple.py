@@ -1,26 +1,55 @@
 """
 Class handling requests to remote resources.
 """
+import json
+import time
+import codecs
+import asyncio
 from http import HTTPStatus
 
 import aiohttp
 
+import settings
 from utils import get_logger
 from crawler.fetcher import BaseFetcher
+from crawler.response_cache import CachedResponse
+from crawler.retry import ResponseError, parse_retry_after
+from crawler.streaming import JsonItemsDecoder, ResponseTooLarge
+
+
+# Responses which are likely caused by proxy rather than by resource
+PROXY_ERROR_STATUSES = (
+    HTTPStatus.FORBIDDEN,
+    HTTPStatus.PROXY_AUTHENTICATION_REQUIRED,
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
 
 
 class SimpleFetcher(BaseFetcher):
-    def __init__(self, base_url, *, proxy=None, **kwargs):
+    def __init__(self, base_url, *, proxy=None, http_client=None,
+                 response_cache=None, proxy_pool=None, **kwargs):
         super().__init__(base_url, proxy=proxy, **kwargs)
         self._session = None
+        # Shared client is owned (and closed) by the factory
+        self.http_client = http_client
+        # Enables conditional requests when set
+        self.response_cache = response_cache
+        # Takes precedence over single proxy when set
+        self.proxy_pool = proxy_pool
         self.verify_ssl = False
+        self.max_size = settings.MAX_RESPONSE_SIZE
         self.logger = get_logger(self.__class__.__name__.lower())
 
     @property
     def session(self):
+        if self.http_client is not None:
+            return self.http_client.session
+
         if self._session is None:
             self._session = aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(verify_ssl=self.verify_ssl))
+                connector=aiohttp.TCPConnector(ssl=self.verify_ssl))
         return self._session
 
     async def close(self):
@@ -28,16 +57,179 @@ class SimpleFetcher(BaseFetcher):
             await self._session.close()
 
     async def request(self, url=None, is_json=False):
+        _, body = await self.request_if_modified(url=url, is_json=is_json)
+        return body
+
+    async def request_if_modified(self, url=None, is_json=False):
         if url is None:
             url = self.base_url
+        return await self._run_shared(
+            ('simple', url, is_json),
+            self._run_with_retry, url, self._request_if_modified, url, is_json,
+        )
+
+    async def stream(self, url=None, *, decode=False,
+                     chunk_size=settings.STREAM_CHUNK_SIZE, max_size=None):
+        """
+        Yield body in chunks as they arrive: bytes or text when `decode` is
+        set. Streams are not retried as part of the body is already consumed
+        by the caller at the moment of failure.
+        """
+        if url is None:
+            url = self.base_url
+        if max_size is None:
+            max_size = self.max_size
+
+        self.logger.info(f'Streaming {url}')
+        proxy = self._get_proxy()
+        proxy_uri = proxy.uri if proxy else None
+        started = time.monotonic()
+        try:
+            async with self.session.get(url, proxy=proxy_uri) as resp:
+                if resp.status != HTTPStatus.OK:
+                    self._report_proxy(
+                        proxy,
+                        latency=time.monotonic() - started,
+                        error=resp.status in PROXY_ERROR_STATUSES,
+                    )
+                    raise ResponseError(resp.status)
+
+                self._report_proxy(proxy, latency=time.monotonic() - started)
+                self._check_size(url, resp.content_length, max_size)
+
+                decoder = None
+                if decode:
+                    decoder = codecs.getincrementaldecoder(
+                        resp.charset or 'utf-8')(errors='replace')
+
+                size = 0
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    size += len(chunk)
+                    self._check_size(url, size, max_size)
+                    yield decoder.decode(chunk) if decoder else chunk
+
+                if decoder is not None:
+                    tail = decoder.decode(b'', final=True)
+                    if tail:
+                        yield tail
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._report_proxy(proxy, error=True)
+            raise
+
+    async def stream_json(self, url=None, *, key=None, **kwargs):
+        """
+        Yield items of json array (or of array under top-level `key`) one by
+        one without loading the whole document.
+        """
+        decoder = JsonItemsDecoder(key=key)
+        async for text in self.stream(url, decode=True, **kwargs):
+            for item in decoder.feed(text):
+                yield item
+
+        for item in decoder.close():
+            yield item
+
+    async def _read_text(self, url, resp):
+        """
+        Read body in chunks not to load more than allowed when response has
+        no (or a wrong) Content-Length, e.g. chunked or compressed one.
+        """
+        self._check_size(url, resp.content_length, self.max_size)
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(
+                settings.STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            self._check_size(url, size, self.max_size)
+            chunks.append(chunk)
+        return b''.join(chunks).decode(resp.charset or 'utf-8',
+                                       errors='replace')
+
+    def _check_size(self, url, size, max_size):
+        if size is not None and max_size and size > max_size:
+            raise ResponseTooLarge(
+                f'Response from {url} exceeds {max_size} bytes')
+
+    def _get_proxy(self):
+        if self.proxy_pool is not None:
+            return self.proxy_pool.get()
+        return self.proxy
+
+    async def _request_if_modified(self, url, is_json):
+        proxy = self._get_proxy()
+
+        started = time.monotonic()
+        try:
+            result = await self._request(url, is_json, proxy)
+        except ResponseError as e:
+            self._report_proxy(
+                proxy,
+                latency=time.monotonic() - started,
+                error=e.status in PROXY_ERROR_STATUSES,
+            )
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._report_proxy(proxy, error=True)
+            raise
+
+        self._report_proxy(proxy, latency=time.monotonic() - started)
+        return result
+
+    def _report_proxy(self, proxy, *, latency=None, error=False):
+        if self.proxy_pool is not None:
+            self.proxy_pool.report(proxy, latency=latency, error=error)
+
+    async def _request(self, url, is_json, proxy):
         self.logger.info(f'Requesting {url}')
 
-        proxy_uri = self.proxy.uri if self.proxy else None
-        async with self.session.get(url, proxy=proxy_uri) as resp:
+        cached = await self._get_cached(url, is_json)
+        headers = cached.validators if cached is not None else None
+
+        proxy_uri = proxy.uri if proxy else None
+        async with self.session.get(
+            url, proxy=proxy_uri, headers=headers,
+        ) as resp:
+            if resp.status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                self.logger.debug(f'{url} not modified, using cached body')
+                return False, cached.body
+
             if resp.status != HTTPStatus.OK:
                 self.logger.debug(f'{url} respond {resp.status}')
-                raise RuntimeError(f'Incorrect response: {resp.status}')
+                raise ResponseError(
+                    resp.status,
+                    retry_after=parse_retry_after(
+                        resp.headers.get('Retry-After')),
+                )
+
+            body = await self._read_text(url, resp)
             if is_json:
-                return await resp.json()
-            else:
-                return await resp.text()
+                body = json.loads(body)
+
+            await self._set_cached(url, resp, body, is_json)
+            return True, body
+
+    async def _get_cached(self, url, is_json):
+        if self.response_cache is None:
+            return
+
+        cached = await self.response_cache.get(url)
+        # Body stored in a different format cannot be reused
+        if cached is not None and cached.is_json == is_json:
+            return cached
+
+    async def _set_cached(self, url, resp, body, is_json):
+        if self.response_cache is None:
+            return
+
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if etag is None and last_modified is None:
+            # Upstream does not support conditional requests
+            return
+
+        await self.response_cache.set(url, CachedResponse(
+            body=body,
+            is_json=is_json,
+            etag=etag,
+            last_modified=last_modified,
+        ))
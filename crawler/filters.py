@@ -1,32 +1,432 @@
+"""
+Filtering of grabbed items with chains like
+
+    Container(data) >> Filter('amount', operator.ge, 100) >> ...
+
+Filters of a chain are fused into one predicate which is applied in one pass
+over the data when the result is needed. Large batches of plain comparisons
+are evaluated on numpy columns.
+
+Chains built with `Container.from_query(query)` are translated into a `where`
+clause of the query instead, so the rows are filtered by the database. Parts
+of the chain which cannot be translated are evaluated in memory on fetched
+rows.
+"""
+import operator
 from collections import UserList
 
+import numpy as np
+import sqlalchemy as sa
 
-class Container(UserList):
-    def __rshift__(self, other):
-        if not isinstance(other, Filter):
-            raise ValueError('Create correct Filter instance first')
+import settings
+from crawler.models import paginate
+
+
+# Comparisons numpy arrays support elementwise
+INFIX_OPERATORS = (
+    operator.lt,
+    operator.le,
+    operator.eq,
+    operator.ne,
+    operator.ge,
+    operator.gt,
+)
+
+
+def is_in(value, values):
+    return value in values
+
+
+# Operators with a counterpart for columns of a table
+SQL_OPERATORS = {
+    **{op: op for op in INFIX_OPERATORS},
+    is_in: lambda column, values: column.in_(list(values)),
+}
+
+
+# Kinds of elements predicate is compiled for
+MAPPING = 'mapping'  # elements are dicts
+GENERIC = 'generic'  # attributes or items, see `_get_elem_value`
+
+
+def _get_elem_value(elem, prop):
+    if hasattr(elem, prop):
+        return getattr(elem, prop)
+
+    if prop in elem:
+        return elem[prop]
+
+    raise ValueError('Cannot get %(prop)s from element %(elem)s' %
+                     dict(prop=prop, elem=elem))
+
+
+class Predicate(object):
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
 
-        filtered_data = [
-            elem for elem in self.data if self._filter(elem, other)
-        ]
-        return Container(filtered_data)
+    def __call__(self, elem):
+        return self.compile(GENERIC)(elem)
 
-    def _filter(self, elem, filter):
-        return filter.op(self._get_elem_value(elem, filter.prop), filter.value)
+    @property
+    def filters(self):
+        """
+        All the filters of the predicate in order of evaluation.
+        """
+        raise NotImplementedError()
 
-    def _get_elem_value(self, elem, prop):
-        if hasattr(elem, prop):
-            return getattr(elem, prop)
+    def compile(self, kind):
+        """
+        Function of an element telling whether it passes.
+        """
+        raise NotImplementedError()
 
-        if prop in elem:
-            return elem[prop]
+    def mask(self, columns):
+        """
+        Evaluate predicate on columns of values at once.
+        """
+        raise NotImplementedError()
 
-        raise ValueError('Cannot get %(prop)s from element %(elem)s' %
-                         dict(prop=prop, elem=elem))
+    def to_sql(self, columns):
+        """
+        Clause for the columns by name or None when predicate cannot be
+        evaluated by the database.
+        """
+        raise NotImplementedError()
 
 
-class Filter(object):
+class Filter(Predicate):
     def __init__(self, prop, op, value):
         self.prop = prop
         self.op = op
         self.value = value
+
+    def __repr__(self):
+        return 'Filter(%r, %s, %r)' % (
+            self.prop, getattr(self.op, '__name__', self.op), self.value)
+
+    @property
+    def filters(self):
+        return [self]
+
+    def compile(self, kind):
+        prop, op, value = self.prop, self.op, self.value
+        # Attributes take precedence over items, e.g. `dict.items`
+        if kind == MAPPING and not hasattr(dict, prop):
+            get_value = operator.itemgetter(prop)
+        else:
+            def get_value(elem):
+                return _get_elem_value(elem, prop)
+
+        if op is is_in:
+            return lambda elem: get_value(elem) in value
+        return lambda elem: op(get_value(elem), value)
+
+    def mask(self, columns):
+        if self.op is is_in:
+            return np.isin(columns[self.prop], list(self.value))
+        return self.op(columns[self.prop], self.value)
+
+    def to_sql(self, columns):
+        column = columns.get(self.prop)
+        translate = SQL_OPERATORS.get(self.op)
+        if column is None or translate is None:
+            return None
+        return translate(column, self.value)
+
+
+class _Combination(Predicate):
+    SEPARATOR = None
+
+    def __init__(self, *predicates):
+        flat = []
+        for predicate in predicates:
+            if type(predicate) is type(self):
+                flat.extend(predicate.predicates)
+            else:
+                flat.append(predicate)
+        self.predicates = flat
+
+    def __repr__(self):
+        return '(%s)' % f' {self.SYMBOL} '.join(map(repr, self.predicates))
+
+    @property
+    def filters(self):
+        return [f for p in self.predicates for f in p.filters]
+
+    def compile(self, kind):
+        return self.combine([p.compile(kind) for p in self.predicates])
+
+    def to_sql(self, columns):
+        clauses = [p.to_sql(columns) for p in self.predicates]
+        if any(clause is None for clause in clauses):
+            return None
+        return self.CLAUSE(*clauses)
+
+
+class And(_Combination):
+    SYMBOL = '&'
+    CLAUSE = staticmethod(sa.and_)
+
+    @staticmethod
+    def combine(tests):
+        def test(elem):
+            for t in tests:
+                if not t(elem):
+                    return False
+            return True
+        return test
+
+    def mask(self, columns):
+        result = None
+        for predicate in self.predicates:
+            mask = predicate.mask(columns)
+            result = mask if result is None else result & mask
+        return result
+
+
+class Or(_Combination):
+    SYMBOL = '|'
+    CLAUSE = staticmethod(sa.or_)
+
+    @staticmethod
+    def combine(tests):
+        def test(elem):
+            for t in tests:
+                if t(elem):
+                    return True
+            return False
+        return test
+
+    def mask(self, columns):
+        result = None
+        for predicate in self.predicates:
+            mask = predicate.mask(columns)
+            result = mask if result is None else result | mask
+        return result
+
+
+class Not(Predicate):
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def __repr__(self):
+        return '~%r' % (self.predicate,)
+
+    @property
+    def filters(self):
+        return self.predicate.filters
+
+    def compile(self, kind):
+        test = self.predicate.compile(kind)
+        return lambda elem: not test(elem)
+
+    def mask(self, columns):
+        return ~self.predicate.mask(columns)
+
+    def to_sql(self, columns):
+        clause = self.predicate.to_sql(columns)
+        if clause is None:
+            return None
+        return sa.not_(clause)
+
+
+def _filter_rows(data, predicate):
+    try:
+        test = predicate.compile(MAPPING)
+        return [elem for elem in data if test(elem)]
+    except (KeyError, TypeError, AttributeError):
+        # Not only dicts, fallback to the generic getter which raises
+        # meaningful errors
+        test = predicate.compile(GENERIC)
+        return [elem for elem in data if test(elem)]
+
+
+def _is_columnar(predicate):
+    return all(f.op in INFIX_OPERATORS or f.op is is_in
+               for f in predicate.filters)
+
+
+def _filter_columns(data, predicate):
+    """
+    Evaluate predicate on numpy columns. Returns None when data does not fit
+    into typed columns.
+    """
+    columns = {}
+    for prop in dict.fromkeys(f.prop for f in predicate.filters):
+        try:
+            values = [elem[prop] for elem in data]
+        except (KeyError, TypeError):
+            return None
+        column = np.asarray(values)
+        if column.dtype == object or column.ndim != 1:
+            return None
+        columns[prop] = column
+
+    try:
+        mask = predicate.mask(columns)
+    except TypeError:
+        # Values of a column cannot be compared with filter's value
+        return None
+    if not isinstance(mask, np.ndarray) or mask.shape != (len(data),) \
+            or mask.dtype != bool:
+        return None
+    return [data[i] for i in np.flatnonzero(mask)]
+
+
+def apply_predicate(data, predicate):
+    if predicate is None or not data:
+        return list(data)
+
+    if len(data) >= settings.FILTER_COLUMNAR_MIN_SIZE and \
+            isinstance(data[0], dict) and _is_columnar(predicate):
+        result = _filter_columns(data, predicate)
+        if result is not None:
+            return result
+
+    return _filter_rows(data, predicate)
+
+
+def split_predicate(predicate, columns):
+    """
+    Split predicate into a clause for the columns by name and a residual
+    predicate to evaluate in memory. Conjuncts are translated one by one,
+    other predicates either completely or not at all.
+    """
+    if predicate is None:
+        return None, None
+
+    conjuncts = predicate.predicates if isinstance(predicate, And) \
+        else [predicate]
+    clauses = []
+    residual = []
+    for conjunct in conjuncts:
+        clause = conjunct.to_sql(columns)
+        if clause is None:
+            residual.append(conjunct)
+        else:
+            clauses.append(clause)
+
+    whereclause = sa.and_(*clauses) if clauses else None
+    if not residual:
+        return whereclause, None
+    if len(residual) == 1:
+        return whereclause, residual[0]
+    return whereclause, And(*residual)
+
+
+class Container(UserList):
+    """
+    Filters are applied lazily: chain of `>>` accumulates them and the data
+    is filtered once on first access. Once accessed (and so possibly
+    changed) the data itself is the source for next filters.
+    """
+    def __init__(self, initlist=None):
+        self._source = list(initlist) if initlist is not None else []
+        self._predicate = None
+        self._data = self._source
+
+    @classmethod
+    def _filtered(cls, source, predicate):
+        container = cls()
+        container._source = source
+        container._predicate = predicate
+        container._data = None
+        return container
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = apply_predicate(self._source, self._predicate)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._source = self._data = value
+        self._predicate = None
+
+    @property
+    def predicate(self):
+        return self._predicate
+
+    @property
+    def source(self):
+        return self._source
+
+    @classmethod
+    def from_query(cls, query, *, limit=None, offset=None):
+        return QueryContainer(query, limit=limit, offset=offset)
+
+    def __rshift__(self, other):
+        if not isinstance(other, Predicate):
+            raise ValueError('Create correct Filter instance first')
+
+        if self._data is not None:
+            return self._filtered(self._data, other)
+        return self._filtered(self._source, self._predicate & other)
+
+
+class QueryContainer(object):
+    """
+    Chain of filters over rows of a select query. Filters are pushed down
+    into the query where possible and the rest is applied to fetched rows.
+    Pass `limit` and `offset` here rather than within the query, so filters
+    are known to apply to the rows of the page.
+    """
+    def __init__(self, query, predicate=None, *, limit=None, offset=None):
+        self.query = query
+        self.predicate = predicate
+        self.limit = limit
+        self.offset = offset
+
+    def __rshift__(self, other):
+        if not isinstance(other, Predicate):
+            raise ValueError('Create correct Filter instance first')
+
+        if self.predicate is None:
+            predicate = other
+        else:
+            predicate = self.predicate & other
+        return self.__class__(self.query, predicate,
+                              limit=self.limit, offset=self.offset)
+
+    def compile(self):
+        """
+        Query with filters translated to its `where` clause and a predicate
+        left to evaluate in memory (None when everything is pushed down).
+        """
+        query = self.query
+        if self.limit is not None or self.offset is not None:
+            query = query.limit(self.limit).offset(self.offset)
+            if self.predicate is not None:
+                # Filters apply to the rows of a page, not the other way round
+                query = sa.select([query.alias()])
+        columns = {column.key: column for column in query.inner_columns}
+
+        whereclause, residual = split_predicate(self.predicate, columns)
+        if whereclause is not None:
+            query = query.where(whereclause)
+        return query, residual
+
+    def paginate(self, columns, *, after=None, limit=None, descending=False):
+        """
+        Page of the filtered rows, see `crawler.models.paginate`.
+        """
+        query, residual = self.compile()
+        if residual is not None:
+            raise ValueError(
+                'Cannot paginate by filters evaluated in memory: %r' %
+                (residual,))
+        query = paginate(query, columns, after=after, descending=descending)
+        return self.__class__(query, limit=limit)
+
+    async def fetch(self, conn):
+        query, residual = self.compile()
+        result = await conn.execute(query)
+        rows = await result.fetchall()
+        return Container._filtered(rows, residual)
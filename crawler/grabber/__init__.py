@@ -5,24 +5,33 @@ import asyncio
 from abc import ABC, abstractmethod
 from datetime import datetime
 
+import settings
 from utils import get_logger, get_date_cache_key
-from crawler.models.bid import (
-    insert_new_bid,
-    get_bid_by_signature,
-)
+from crawler.models.bid import insert_new_bids
+from crawler.models.rate import insert_rate_snapshots
 from crawler.models.resource import Resource
 
 
 class BaseGrabber(ABC):
     def __init__(self, resource: Resource, *,
-                 fetcher=None, parser=None, cache=None, engine=None):
+                 fetcher=None, parser=None, parser_pool=None,
+                 cache=None, engine=None):
         self.resource = resource
         self.fetcher = fetcher
         self.parser = parser
+        self.parser_pool = parser_pool
         self.cache = cache
         self.engine = engine
         self.logger = get_logger(self.__class__.__name__.lower())
         self._exception = None
+        # Set to False by `get_rates` when upstream reports no changes
+        self.modified = True
+        # Set to False by `get_rates` when only part of requests succeeded
+        self.complete = True
+        self._cache_key = None
+        self._semaphore = None
+        # Latest stored snapshot for each currency
+        self._last_snapshots = {}
 
     def __str__(self):
         return 'Grabber[{}] for resource [{}]'.format(
@@ -37,6 +46,46 @@ class BaseGrabber(ABC):
     def urls(self):
         return self.resource.urls
 
+    @property
+    def semaphore(self):
+        """
+        Limits simultaneous requests to the resource. Created lazily to be
+        bound to a running loop.
+        """
+        if self._semaphore is None:
+            concurrency = getattr(self.resource, 'concurrency', None) or \
+                settings.DEFAULT_RESOURCE_CONCURRENCY
+            self._semaphore = asyncio.Semaphore(concurrency)
+        return self._semaphore
+
+    async def fan_out(self, coros):
+        """
+        Run coroutines concurrently within resource's concurrency limit.
+        Results keep the order of coroutines; failed item is represented by
+        its exception and does not affect the others.
+        """
+        async def bounded(coro):
+            async with self.semaphore:
+                return await coro
+
+        results = await asyncio.gather(
+            *[bounded(coro) for coro in coros],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error('Request to %s failed: %r',
+                                  self.name, result)
+        return results
+
+    async def parse(self, html):
+        """
+        Parse in worker process when pool is given not to block the loop.
+        """
+        if self.parser_pool is None:
+            return self.parser.parse(html)
+        return await self.parser_pool.parse(self.parser, html)
+
     def _save_exception(self, fut):
         self._exception = fut.exception()
 
@@ -46,40 +95,95 @@ class BaseGrabber(ABC):
         return fut.__await__()
 
     async def close(self):
+        # Engine is shared between grabbers and closed by factory
         self.logger.debug('Closing fetcher connections...')
         await self.fetcher.close()
-        self.logger.debug('Closing db engine connections...')
-        self.engine.close()
-        await self.engine.wait_closed()
 
     async def update(self):
         data = await self.get_rates()
 
         if self.cache is not None:
             cache_key = get_date_cache_key(datetime.now())
-            await self.cache.set(cache_key, data)
-
-        # todo: insert rates here for history
+            if not self.complete:
+                # Partial rates should not be read as the day's ones
+                await self.cache.mset(
+                    self.get_cache_items(data, cache_key),
+                    ttl=settings.PARTIAL_RATES_CACHE_TTL,
+                )
+                self._cache_key = None
+            elif self.modified or cache_key != self._cache_key:
+                await self.cache.mset(
+                    self.get_cache_items(data, cache_key),
+                    ttl=settings.RATES_CACHE_TTL,
+                )
+                self._cache_key = cache_key
+            else:
+                self.logger.debug('Rates did not change, skip cache update')
+
+        if self.engine is not None and self.modified:
+            await self.store_history(data)
         return data
 
     @abstractmethod
     async def get_rates(self):
         return {}
 
-    async def insert_new_bids(self, bids):
-        insert_tasks = []
-
-        async def insert_new_bid_task(*args, **kwargs):
-            async with self.engine.acquire() as conn:
-                self.logger.debug('Inserting new bid...')
-                return await insert_new_bid(conn, *args, **kwargs)
-
-        for bid in bids:
-            async with self.engine.acquire() as conn:
-                already_stored = await get_bid_by_signature(conn, bid)
+    def get_rates_key(self, date_key, currency=None):
+        parts = ['rates', self.name, date_key]
+        if currency is not None:
+            parts.append(currency)
+        return self.cache.make_key(*parts)
+
+    def get_cache_items(self, data, date_key):
+        """
+        Rates of the resource for the day, also split per currency when
+        grabber knows how to do it.
+        """
+        items = {self.get_rates_key(date_key): data}
+        for currency, currency_data in self.group_by_currency(data).items():
+            items[self.get_rates_key(date_key, currency)] = currency_data
+        return items
+
+    def group_by_currency(self, data):
+        return {}
 
-            if not already_stored:
-                insert_tasks.append(
-                    insert_new_bid_task(bid, resource=self.resource))
+    def get_rate_snapshots(self, data):
+        """
+        Rates as a list of dicts with currency, rate_buy and rate_sale keys
+        to be kept in history.
+        """
+        return []
+
+    def get_changed_snapshots(self, data):
+        return [
+            snapshot for snapshot in self.get_rate_snapshots(data)
+            if self._last_snapshots.get(snapshot['currency']) != snapshot
+        ]
+
+    async def store_history(self, data):
+        """
+        Append rates to history when they differ from the previous ones.
+        """
+        snapshots = self.get_changed_snapshots(data)
+        if not snapshots:
+            return []
+
+        async with self.engine.acquire() as conn:
+            inserted = await insert_rate_snapshots(
+                conn, snapshots, bank=self.name)
+
+        for snapshot in snapshots:
+            self._last_snapshots[snapshot['currency']] = snapshot
+        self.logger.debug('Stored %s changed rates of %s',
+                          len(inserted), self.name)
+        return inserted
 
-        await asyncio.gather(*insert_tasks)
+    async def insert_new_bids(self, bids):
+        async with self.engine.acquire() as conn:
+            async with conn.begin():
+                result = await insert_new_bids(
+                    conn, bids, resource=self.resource)
+
+        self.logger.debug('Inserted %(inserted)s new bids, '
+                          'skipped %(skipped)s already stored', result)
+        return result
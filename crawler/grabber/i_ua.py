@@ -1,44 +1,69 @@
+import asyncio
 import operator
 
 import settings
 from crawler.grabber import BaseGrabber
 from crawler.filters import Container, Filter
-from crawler.helpers import load_config
+from crawler.helpers import config_service
 
 
 class IUaGrabber(BaseGrabber):
+    async def get_rates(self):
+        return []
+
+    async def get_bids(self):
+        """
+        Grab IN and OUT bids simultaneously, both share resource's
+        concurrency limit.
+        """
+        in_bids, out_bids = await asyncio.gather(
+            self.get_in_bids(),
+            self.get_out_bids(),
+        )
+        return in_bids, out_bids
+
     async def get_in_bids(self):
-        data = []
-        for item in self.urls:
-            self.logger.debug(
-                'Grabbing IN %(currency)s bids for %(name)s',
-                dict(currency=item.currency, name=self.name)
-            )
-            response = await self.fetcher.request(url=item.in_bids)
-            # currency = item.currency
-            currency_data = self.parser.parse(html=response)
-            data.extend(currency_data)
-        return await self.filter_data(data)
+        results = await self.fan_out(
+            self.get_currency_bids(item, item.in_bids, 'IN')
+            for item in self.urls
+        )
+        return await self.filter_data(self._merge(results))
 
     async def get_out_bids(self):
+        results = await self.fan_out(
+            self.get_currency_bids(item, item.out_bids, 'OUT')
+            for item in self.urls
+        )
+        return await self.filter_data(self._merge(results))
+
+    async def get_currency_bids(self, item, url, bid_type):
+        self.logger.debug(
+            'Grabbing %(bid_type)s %(currency)s bids for %(name)s',
+            dict(bid_type=bid_type, currency=item.currency, name=self.name)
+        )
+        if self.parser.incremental and hasattr(self.fetcher, 'stream'):
+            # Only bids which were not on the page during previous update
+            chunks = self.fetcher.stream(url=url, decode=True)
+            return [bid async for bid in self.parser.iter_bids(
+                chunks, key=url)]
+
+        response = await self.fetcher.request(url=url)
+        # currency = item.currency
+        return await self.parse(response)
+
+    def _merge(self, results):
         data = []
-        for item in self.urls:
-            self.logger.debug(
-                'Grabbing OUT %(currency)s bids for %(name)s',
-                dict(currency=item.currency, name=self.name)
-            )
-            response = await self.fetcher.request(url=item.out_bids)
-            # currency = item.currency
-            currency_data = self.parser.parse(html=response)
-            data.extend(currency_data)
-        return await self.filter_data(data)
+        for currency_data in results:
+            # Errors are already logged, skip only failed currency
+            if not isinstance(currency_data, Exception):
+                data.extend(currency_data)
+        return data
 
     async def filter_data(self, data):
         if not settings.APPLY_FILTER:
             return data
 
-        async with self.engine.acquire() as conn:
-            config = await load_config(conn)
+        config = await config_service.get(engine=self.engine)
 
         filtered_result = Container(data) >> \
             Filter('amount', operator.ge, config.MIN_BID_AMOUNT) >> \
@@ -3,14 +3,42 @@ from crawler.grabber import BaseGrabber
 
 class PrivatbankGrabber(BaseGrabber):
     async def get_rates(self):
+        results = await self.fan_out(
+            self.get_currency_rates(item) for item in self.urls)
+
         data = []
-        for item in self.urls:
-            self.logger.debug(
-                'Grabbing %(currency)s rates for %(name)s',
-                dict(currency=item.currency, name=self.name)
-            )
-            response = await self.fetcher.request(url=item.url, is_json=True)
+        modified = False
+        complete = True
+        for result in results:
+            if isinstance(result, Exception):
+                complete = False
+                continue
+            item_modified, response = result
+            modified = modified or item_modified
             data.extend(response)
+        self.modified = modified
+        self.complete = complete
         # currency = item.currency
         # currency_data = self.parser.parse(html=response)
         return data
+
+    def group_by_currency(self, data):
+        return {item['ccy']: item for item in data}
+
+    def get_rate_snapshots(self, data):
+        return [
+            {
+                'currency': item['ccy'],
+                'rate_buy': float(item['buy']),
+                'rate_sale': float(item['sale']),
+            }
+            for item in data
+        ]
+
+    async def get_currency_rates(self, item):
+        self.logger.debug(
+            'Grabbing %(currency)s rates for %(name)s',
+            dict(currency=item.currency, name=self.name)
+        )
+        return await self.fetcher.request_if_modified(
+            url=item.url, is_json=True)
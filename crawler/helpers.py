@@ -1,20 +1,30 @@
+import time
+import asyncio
 from operator import attrgetter
 
 import attr
 import yaml
+import aiopg
+import psycopg2
 from sqlalchemy import desc
 
 import settings
 from utils import get_logger
-from crawler.db import Engine
+from crawler.db import Connection
 from crawler.forms.config import config_trafaret
-from crawler.models.configs import config as config_model
+from crawler.models.configs import config as config_model, CONFIG_CHANNEL
 from crawler.models.resource import insert_new_resource, get_resource_by_name
 
 
 logger = get_logger(__name__)
 
 
+Config = attr.make_class(
+    'Config',
+    {key.name: attr.ib(default=None) for key in config_trafaret.keys}
+)
+
+
 def get_statuses(*args):
     return [*map(attrgetter('value'), args)]
 
@@ -37,33 +47,112 @@ async def load_config(conn):
         )
 
     config_value = row.value
-    Config = attr.make_class(
-        'Config',
-        {key.name: attr.ib(default=None) for key in config_trafaret.keys}
-    )
     loaded_config = Config(**config_value)
     return loaded_config
 
 
+class ConfigService(object):
+    """
+    Keeps latest config in memory. It is reloaded when changed (Postgres
+    NOTIFY sent by config model, received once `start_listening` is called)
+    or when `ttl` seconds have passed.
+    """
+    def __init__(self, *, ttl=settings.CONFIG_CACHE_TTL):
+        self.ttl = ttl
+        self.engine = None
+        self._config = None
+        self._loaded_at = None
+        self._listen_task = None
+
+    @property
+    def is_valid(self):
+        return self._config is not None and \
+            time.monotonic() - self._loaded_at < self.ttl
+
+    def invalidate(self):
+        self._config = None
+
+    def set(self, config):
+        self._config = config
+        self._loaded_at = time.monotonic()
+
+    async def get(self, *, conn=None, engine=None):
+        """
+        Use given connection or engine only when config has to be reloaded.
+        """
+        if self.is_valid:
+            return self._config
+
+        if conn is not None:
+            config = await load_config(conn)
+        else:
+            async with Connection(engine or self.engine) as conn:
+                config = await load_config(conn)
+
+        self.set(config)
+        return config
+
+    def start_listening(self, engine=None, *, dsn=settings.DATABASE_DSN):
+        """
+        Keep one connection subscribed to config changes. It is opened with
+        `dsn` outside of the engine pool, so LISTEN does not hold one of the
+        pooled connections forever. Engine is used to reload config later on.
+        """
+        self.engine = engine
+        if self._listen_task is None:
+            self._listen_task = asyncio.ensure_future(self._listen(dsn))
+
+    async def _listen(self, dsn):
+        while True:
+            try:
+                await self._listen_changes(dsn)
+            except psycopg2.Error as e:
+                # Changes might be missed while reconnecting
+                self.invalidate()
+                logger.error('Listening for config changes failed: %r. '
+                             'Reconnecting in %s seconds...', e, self.ttl)
+                await asyncio.sleep(self.ttl)
+
+    async def _listen_changes(self, dsn):
+        async with aiopg.connect(dsn) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(f'LISTEN {CONFIG_CHANNEL}')
+            while True:
+                await conn.notifies.get()
+                logger.info('Config has changed, reloading it')
+                self.invalidate()
+
+    async def stop_listening(self):
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+        self.engine = None
+
+
+# Shared by all the components within a process
+config_service = ConfigService()
+
+
 async def get_config():
     """
     A wrapper to load config in case you do not have any created engine you can
-    bind to.
+    bind to. Cached one is returned when still valid.
     """
-    async with Engine() as engine:
-        async with engine.acquire() as conn:
-            return await load_config(conn)
+    return await config_service.get()
 
 
-async def insert_resources():
+async def insert_resources(engine=None):
     with open(settings.RESOURCES_FILEPATH) as f:
         resources = yaml.load(f.read())
 
-    async with Engine() as engine:
-        async with engine.acquire() as conn:
-            for resource in resources:
-                resource_name = resource['name']
-                res = await get_resource_by_name(conn, resource_name)
-                if res is None:
-                    logger.info('Adding new resource: %s', resource_name)
-                    await insert_new_resource(conn, resource)
+    async with Connection(engine) as conn:
+        for resource in resources:
+            resource_name = resource['name']
+            res = await get_resource_by_name(conn, resource_name)
+            if res is None:
+                logger.info('Adding new resource: %s', resource_name)
+                await insert_new_resource(conn, resource)
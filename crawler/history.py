@@ -0,0 +1,262 @@
+"""
+Backfill historical exchange rates from privatbank archive.
+"""
+import csv
+import asyncio
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import settings
+from utils import LoggableMixin
+from crawler.retry import RetryPolicy
+from crawler.models.rate import insert_rate_history, delete_rate_history
+
+
+CHECKPOINT_DATE_FORMAT = '%Y-%m-%d'
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+class AdaptiveLimiter(object):
+    """
+    Concurrency limit which slowly grows while requests succeed and halves
+    on each failure, so downloader finds the rate upstream tolerates.
+    """
+    def __init__(self, max_limit, *, min_limit=1, initial=None):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.window = float(initial or min_limit)
+        self.active = 0
+        self._condition = None
+
+    @property
+    def limit(self):
+        return int(self.window)
+
+    @property
+    def condition(self):
+        # Created lazily to be bound to a running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.condition:
+            self.active -= 1
+            if exc_type is None:
+                self.window = min(self.window + 1 / self.window,
+                                  self.max_limit)
+            else:
+                self.window = max(self.window / 2, self.min_limit)
+            self.condition.notify_all()
+
+
+class Checkpoint(object):
+    """
+    Append-only file with days already stored. Interrupted run loses only
+    days which were in flight.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+
+    def load(self):
+        if self.path.exists():
+            with open(self.path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        return self
+
+    def __contains__(self, day):
+        return day.strftime(CHECKPOINT_DATE_FORMAT) in self.done
+
+    def mark(self, day):
+        key = day.strftime(CHECKPOINT_DATE_FORMAT)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(f'{key}\n')
+        self.done.add(key)
+
+
+class RateHistoryWriter(object):
+    """
+    Store rates in `rate_history` the same way grabbers do. A day replaces
+    rows previously stored for it, so writing it again after a crash or
+    with a lost checkpoint does not duplicate rates.
+    """
+    def __init__(self, engine, *,
+                 bank=settings.HISTORY_BANK,
+                 currencies=settings.HISTORY_CURRENCIES):
+        self.engine = engine
+        self.bank = bank
+        self.currencies = currencies
+
+    async def write(self, day, rows):
+        rows = [
+            dict(
+                created=row['date'],
+                bank=row['bank'],
+                currency=row['currency'],
+                rate_buy=row['rate_buy'],
+                rate_sale=row['rate_sale'],
+            )
+            for row in rows
+        ]
+        async with self.engine.acquire() as conn:
+            async with conn.begin():
+                await delete_rate_history(
+                    conn,
+                    bank=self.bank,
+                    currencies=list(self.currencies),
+                    created=datetime(day.year, day.month, day.day),
+                )
+                await insert_rate_history(conn, rows)
+
+
+class CSVWriter(object):
+    """
+    One file per currency and year, same layout `notebooks` use.
+    """
+    HEADER = ['date', 'buy', 'sale', 'nb']
+
+    def __init__(self, data_dir=settings.HISTORY_DATA_DIR):
+        self.data_dir = Path(data_dir)
+
+    def get_filename(self, currency, year):
+        return self.data_dir / f'uah_to_{currency.lower()}_{year}.csv'
+
+    async def write(self, day, rows):
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        for row in rows:
+            filename = self.get_filename(row['currency'], day.year)
+            is_new = not filename.exists()
+            with open(filename, 'a') as f:
+                writer = csv.DictWriter(f, fieldnames=self.HEADER)
+                if is_new:
+                    writer.writeheader()
+                writer.writerow({
+                    'date': day.strftime(settings.HISTORY_URL_DATE_FORMAT),
+                    'buy': row['rate_buy'],
+                    'sale': row['rate_sale'],
+                    'nb': row['rate_nb'],
+                })
+
+
+class HistoryDownloader(LoggableMixin):
+    """
+    Download archive rates for each day of a period with adaptive
+    concurrency, skipping days recorded in checkpoint.
+    """
+    def __init__(self, fetcher, writer, *, checkpoint,
+                 concurrency=settings.HISTORY_CONCURRENCY,
+                 currencies=settings.HISTORY_CURRENCIES,
+                 bank=settings.HISTORY_BANK,
+                 retry_policy=None):
+        # Fetcher should not retry on its own, policy below does
+        self.fetcher = fetcher
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.currencies = currencies
+        self.bank = bank
+        self.limiter = AdaptiveLimiter(
+            concurrency, initial=max(concurrency // 4, 1))
+        if retry_policy is None:
+            attempts = settings.HISTORY_RETRY_ATTEMPTS
+            retry_policy = RetryPolicy(
+                attempts=attempts,
+                # Throttled responses are expected, do not give up on host
+                failure_threshold=concurrency * attempts,
+            )
+        self.retry_policy = retry_policy
+        self.stats = {
+            'skipped': 0,
+            'downloaded': 0,
+            'missing': 0,
+            'failed': [],
+        }
+
+    def get_url(self, day):
+        return settings.HISTORY_URL_TEMPLATE.format(
+            date=day.strftime(settings.HISTORY_URL_DATE_FORMAT))
+
+    async def run(self, start, end):
+        days = []
+        for day in date_range(start, end):
+            if day in self.checkpoint:
+                self.stats['skipped'] += 1
+            else:
+                days.append(day)
+
+        self.logger.info('Downloading rates for %d days, %d already stored',
+                         len(days), self.stats['skipped'])
+        queue = asyncio.Queue()
+        for day in days:
+            queue.put_nowait(day)
+
+        workers = [
+            asyncio.ensure_future(self._worker(queue))
+            for _ in range(self.limiter.max_limit)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return self.stats
+
+    async def _worker(self, queue):
+        while not queue.empty():
+            day = queue.get_nowait()
+            try:
+                await self.download_day(day)
+            except Exception as e:
+                self.logger.error('Cannot download rates for %s: %r', day, e)
+                self.stats['failed'].append(day)
+
+    async def download_day(self, day):
+        url = self.get_url(day)
+        data = await self.retry_policy.run(url, self._fetch, url)
+        rows = self.get_rows(day, data)
+        await self.writer.write(day, rows)
+        self.checkpoint.mark(day)
+        self.stats['downloaded'] += 1
+        if self.stats['downloaded'] % 100 == 0:
+            self.logger.info('%d days downloaded, concurrency is %d',
+                             self.stats['downloaded'], self.limiter.limit)
+
+    async def _fetch(self, url):
+        async with self.limiter:
+            return await self.fetcher.request(url, is_json=True)
+
+    def get_rows(self, day, data):
+        date = datetime(day.year, day.month, day.day)
+        rows = []
+        for item in data.get('exchangeRate', []):
+            # Currency key might be missing in data
+            currency = item.get('currency')
+            if currency not in self.currencies:
+                continue
+
+            if 'purchaseRate' not in item or 'saleRate' not in item:
+                self.stats['missing'] += 1
+                continue
+
+            rows.append({
+                'date': date,
+                'bank': self.bank,
+                'currency': currency,
+                'rate_buy': item['purchaseRate'],
+                'rate_sale': item['saleRate'],
+                'rate_nb': item.get('saleRateNB'),
+            })
+        return rows
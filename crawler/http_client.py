@@ -0,0 +1,67 @@
+"""
+Process-wide HTTP client sharing one pooled connector between fetchers,
+notifier and healthcheck.
+"""
+import aiohttp
+
+import settings
+from utils import get_logger
+
+
+class HttpClient(object):
+    def __init__(
+        self, *,
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        total_timeout=settings.HTTP_TOTAL_TIMEOUT,
+        verify_ssl=settings.HTTP_VERIFY_SSL,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.total_timeout = total_timeout
+        self.verify_ssl = verify_ssl
+        self._session = None
+        self.logger = get_logger(self.__class__.__name__.lower())
+
+    def _create_connector(self):
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            ssl=self.verify_ssl,
+        )
+
+    @property
+    def session(self):
+        """
+        Session is created lazily as it has to be bound to a running loop.
+        """
+        if self._session is None:
+            self.logger.debug('Creating shared http session...')
+            timeout = aiohttp.ClientTimeout(
+                total=self.total_timeout,
+                sock_connect=self.connect_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=self._create_connector(),
+                timeout=timeout,
+            )
+        return self._session
+
+    @property
+    def closed(self):
+        return self._session is None or self._session.closed
+
+    async def close(self):
+        if self._session is not None:
+            self.logger.debug('Closing shared http session...')
+            await self._session.close()
+            self._session = None
@@ -1,4 +1,9 @@
+import uuid
+
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+import settings
 
 
 metadata = sa.MetaData()
@@ -9,3 +14,69 @@ async def check_result(result, fetchone=False):
         if fetchone:
             return await result.fetchone()
         return await result.fetchall()
+
+
+def paginate(query, columns, *, after=None, limit=None, descending=False):
+    """
+    Keyset pagination: rows following the `after` key (values of `columns`
+    for the last row of previous page) in order of `columns`. Unlike offset
+    it costs the same for any page when there is an index on `columns`.
+    """
+    if after is not None:
+        key = sa.tuple_(*columns)
+        bound = sa.tuple_(*after)
+        query = query.where(key < bound if descending else key > bound)
+
+    order = sa.desc if descending else sa.asc
+    query = query.order_by(*[order(column) for column in columns])
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_page_key(row, columns):
+    """
+    Key to pass as `after` to get a page following the row.
+    """
+    return tuple(row[column.name] for column in columns)
+
+
+async def iter_pages(fetch, columns, *, page_size=settings.PAGE_SIZE):
+    """
+    Walk through all the rows page by page holding one page in memory.
+    `fetch` is a coroutine function accepting `after` and `limit`.
+    """
+    after = None
+    while True:
+        rows = await fetch(after=after, limit=page_size)
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        after = get_page_key(rows[-1], columns)
+
+
+async def stream_rows(conn, query, *, chunk_size=settings.STREAM_CHUNK_ROWS):
+    """
+    Iterate over rows of the query fetching them in chunks from a server-side
+    cursor. Rows are typed as for `conn.execute`. Cursor lives within a
+    transaction, so iterate till the end or close the generator explicitly.
+    """
+    # Named cursors are not supported by psycopg2 in asynchronous mode
+    name = f'stream_{uuid.uuid4().hex}'
+    compiled = query.compile(dialect=postgresql.dialect())
+    fetch = sa.text(f'FETCH FORWARD {chunk_size} FROM {name}')\
+        .columns(*query.c)
+
+    async with conn.begin():
+        await conn.execute(
+            f'DECLARE {name} NO SCROLL CURSOR FOR {compiled}',
+            compiled.params,
+        )
+        while True:
+            result = await conn.execute(fetch)
+            rows = await result.fetchall()
+            if not rows:
+                break
+            for row in rows:
+                yield row
@@ -1,3 +1,4 @@
+import operator
 from enum import Enum
 from typing import Iterable
 from datetime import datetime, timedelta
@@ -5,9 +6,10 @@ from datetime import datetime, timedelta
 import sqlalchemy as sa
 
 from utils import get_midnight, get_logger
-from crawler.helpers import load_config, get_statuses
-from crawler.db import Engine
-from . import metadata
+from crawler.helpers import config_service, get_statuses
+from crawler.db import Connection
+from crawler.filters import Container, Filter, is_in
+from . import metadata, paginate, stream_rows
 from .resource import resource, Resource, get_resource_by_name
 
 
@@ -56,6 +58,9 @@ bid = sa.Table(
                             ondelete='NO ACTION'),
 )
 
+# Bids are paginated in order of creation, id breaks ties
+BID_PAGE_KEY = (bid.c.created, bid.c.id)
+
 
 async def get_bid_by_id(conn, bid_id):
     query = bid.select().where(bid.c.id == bid_id)
@@ -74,7 +79,7 @@ async def get_bid_by_signature(conn, bid_item):
         bid.c.in_use == True,
     )
 
-    query = bid.select(whereclause)
+    query = bid.select(whereclause).limit(1)
     result = await conn.execute(query)
     return await result.fetchone()
 
@@ -84,22 +89,37 @@ async def get_bids_for_period(
     *,
     start_date,
     end_date,
+    after=None,
+    limit=None,
 ):
-    query = bid.select().where(sa.and_(
-        bid.c.created >= start_date,
-        bid.c.created <= end_date,
-    ))
+    query = _bids_for_period_query(start_date, end_date)
+    query = paginate(query, BID_PAGE_KEY, after=after, limit=limit)
 
     result = await conn.execute(query)
     return await result.fetchall()
 
 
+def stream_bids_for_period(conn, *, start_date, end_date):
+    """
+    Same as `get_bids_for_period` without loading all the rows at once.
+    """
+    query = _bids_for_period_query(start_date, end_date)
+    return stream_rows(conn, paginate(query, BID_PAGE_KEY))
+
+
+def _bids_for_period_query(start_date, end_date):
+    return bid.select().where(sa.and_(
+        bid.c.created >= start_date,
+        bid.c.created <= end_date,
+    ))
+
+
 async def insert_new_bid(
     conn,
     new_bid: dict,
     resource: Resource,
 ):
-    config = await load_config(conn)
+    config = await config_service.get(conn=conn)
 
     resource_item = await get_resource_by_name(conn, resource.name)
     if resource_item is None:
@@ -117,30 +137,115 @@ async def insert_new_bid(
     await conn.execute(query)
 
 
-async def get_daily_bids(
+def get_bid_signature(bid_item):
+    return (
+        float(bid_item['rate']),
+        float(bid_item['amount']),
+        bid_item['currency'],
+        bid_item['phone'],
+        bid_item['bid_type'],
+    )
+
+
+async def get_stored_signatures(conn, bid_items):
+    """
+    Signatures of bids from the batch which are already stored and in use.
+    """
+    signatures = {get_bid_signature(b) for b in bid_items}
+    if not signatures:
+        return set()
+
+    columns = (bid.c.rate, bid.c.amount, bid.c.currency,
+               bid.c.phone, bid.c.bid_type)
+    query = sa.select(columns).where(sa.and_(
+        sa.tuple_(*columns).in_(list(signatures)),
+        bid.c.in_use == True,
+    ))
+    result = await conn.execute(query)
+    return {get_bid_signature(row) for row in await result.fetchall()}
+
+
+async def insert_new_bids(
     conn,
+    new_bids: Iterable[dict],
+    resource: Resource,
+):
+    """
+    Insert bids which are not stored yet with a single statement.
+    Return number of inserted and skipped bids.
+    """
+    new_bids = list(new_bids)
+    if not new_bids:
+        return {'inserted': 0, 'skipped': 0}
+
+    config = await config_service.get(conn=conn)
+    resource_item = await get_resource_by_name(conn, resource.name)
+    if resource_item is None:
+        raise ValueError('Cannot load such a [%s]' % resource)
+
+    stored = await get_stored_signatures(conn, new_bids)
+    values = []
+    for new_bid in new_bids:
+        signature = get_bid_signature(new_bid)
+        # Page may also contain the same bid twice
+        if signature in stored:
+            continue
+        stored.add(signature)
+        values.append(dict(
+            rate=new_bid['rate'],
+            amount=new_bid['amount'],
+            currency=new_bid['currency'],
+            phone=new_bid['phone'],
+            bid_type=new_bid['bid_type'],
+            dry_run=config.DRY_RUN,
+            resource_id=resource_item.id,
+        ))
+
+    if values:
+        await conn.execute(bid.insert().values(values))
+
+    return {
+        'inserted': len(values),
+        'skipped': len(new_bids) - len(values),
+    }
+
+
+def daily_bids(
     *,
     bid_type: BidType=None,
-    statuses: Iterable[BidStatus]=None
+    statuses: Iterable[BidStatus]=None,
 ):
+    """
+    Filtered bids of the current day to fetch or aggregate within database.
+    """
     datetime_today = datetime.now()
     datetime_tomorrow = datetime_today + timedelta(days=1)
     midnight_today = get_midnight(datetime_today)
     midnight_tomorrow = get_midnight(datetime_tomorrow)
-    query = bid.select().where(sa.and_(
-        bid.c.created > midnight_today,
-        bid.c.created <= midnight_tomorrow,
-    ))
+    bids = Container.from_query(bid.select()) >> \
+        Filter('created', operator.gt, midnight_today) >> \
+        Filter('created', operator.le, midnight_tomorrow)
 
     if bid_type is not None:
-        query = query.where(bid.c.bid_type == bid_type.value)
+        bids >>= Filter('bid_type', operator.eq, bid_type.value)
 
     if statuses is not None:
-        status_values = get_statuses(*statuses)
-        query = query.where(bid.c.status.in_(status_values))
+        bids >>= Filter('status', is_in, get_statuses(*statuses))
 
-    result = await conn.execute(query)
-    return await result.fetchall()
+    return bids
+
+
+async def get_daily_bids(
+    conn,
+    *,
+    bid_type: BidType=None,
+    statuses: Iterable[BidStatus]=None,
+    after=None,
+    limit=None,
+):
+    bids = daily_bids(bid_type=bid_type, statuses=statuses)
+    page = bids.paginate(BID_PAGE_KEY, after=after, limit=limit)
+    return await page.fetch(conn)
 
 
 async def mark_bids_as(conn, bid_ids: list, bid_status: BidStatus):
@@ -167,28 +272,26 @@ async def set_bid_status(conn, bid_id: int, bid_status: BidStatus):
     return (await conn.execute(query)).rowcount
 
 
-async def mark_daily_bids_as_unused():
+async def mark_daily_bids_as_unused(engine=None):
     """
     Daily task that will mark all daily bids as unused not to collide with
     newcoming bids.
     """
     bid_ids = []
-    async with Engine() as engine:
-        async with engine.acquire() as conn:
-            return await mark_bids_as_unused(conn, bid_ids)
+    async with Connection(engine) as conn:
+        return await mark_bids_as_unused(conn, bid_ids)
 
 
-async def _autoclose_bids():
+async def _autoclose_bids(engine=None):
     """
     Helper function for developer mode simulating closing bids after
     notifications being sent.
     """
-    async with Engine() as engine:
-        async with engine.acquire() as conn:
-            statuses = [BidStatus.NOTIFIED]
-            daily_bids = await get_daily_bids(conn, statuses=statuses)
-
-            bid_ids = [b.id for b in daily_bids]
-            if bid_ids:
-                logger.debug('Closing bids %s', bid_ids)
-                await mark_bids_as(conn, bid_ids, BidStatus.CLOSED)
+    async with Connection(engine) as conn:
+        statuses = [BidStatus.NOTIFIED]
+        daily_bids = await get_daily_bids(conn, statuses=statuses)
+
+        bid_ids = [b.id for b in daily_bids]
+        if bid_ids:
+            logger.debug('Closing bids %s', bid_ids)
+            await mark_bids_as(conn, bid_ids, BidStatus.CLOSED)
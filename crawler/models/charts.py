@@ -5,20 +5,45 @@ import sqlalchemy as sa
 
 import settings
 from utils import get_midnight
+from crawler.models import metadata, paginate
 from crawler.models.bid import (
     bid,
+    BID_PAGE_KEY,
     BidType,
     BidStatus,
 )
-from crawler.models.event import (
-    event,
-    EventType,
-)
+from crawler.models.event import EventType
 
 
 DAYS_IN_MONTH = 30
 
 
+# Daily rollups maintained by triggers, see `008_create_daily_stats.sql`
+bid_daily_stats = sa.Table(
+    'bid_daily_stats', metadata,
+    sa.Column('day', sa.Date, nullable=False),
+    sa.Column('resource_id', sa.Integer, nullable=False),
+    sa.Column('bid_type', sa.String, nullable=False),
+    sa.Column('status', sa.String, nullable=False),
+    sa.Column('bids', sa.Integer, nullable=False),
+    sa.Column('amount', sa.Numeric(asdecimal=False), nullable=False),
+    sa.Column('volume', sa.Numeric(asdecimal=False), nullable=False),
+
+    sa.PrimaryKeyConstraint('day', 'resource_id', 'bid_type', 'status',
+                            name='bid_daily_stats_pkey'),
+)
+
+event_daily_stats = sa.Table(
+    'event_daily_stats', metadata,
+    sa.Column('day', sa.Date, nullable=False),
+    sa.Column('event_type', sa.String, nullable=False),
+    sa.Column('event_count', sa.Integer, nullable=False),
+
+    sa.PrimaryKeyConstraint('day', 'event_type',
+                            name='event_daily_stats_pkey'),
+)
+
+
 def _get_starting_day(days_passed=DAYS_IN_MONTH):
     now = datetime.now()
     starting_point = now - timedelta(days=days_passed)
@@ -28,39 +53,54 @@ def _get_starting_day(days_passed=DAYS_IN_MONTH):
 
 async def get_profit_last_month(conn):
     starting_day = _get_starting_day()
-    bids = await get_closed_bids_for_period(conn, starting_day=starting_day)
-    data = defaultdict(int)
+    volume = bid_daily_stats.c.volume
+    profit = sa.func.sum(sa.case(
+        [(bid_daily_stats.c.bid_type == BidType.IN.value, -volume)],
+        else_=volume,
+    )).label('profit')
+    query = sa.select([
+        bid_daily_stats.c.day,
+        profit,
+    ]).where(sa.and_(
+        bid_daily_stats.c.day >= starting_day.date(),
+        bid_daily_stats.c.status == BidStatus.CLOSED.value,
+        bid_daily_stats.c.bid_type.in_((BidType.IN.value, BidType.OUT.value)),
+    )).group_by(bid_daily_stats.c.day).order_by(bid_daily_stats.c.day)
 
-    for bid in bids:
-        day_key = bid.created.strftime(settings.DEFAULT_DATE_FORMAT)
-        if bid.bid_type == BidType.IN.value:
-            data[day_key] -= bid.amount * bid.rate
-        elif bid.bid_type == BidType.OUT.value:
-            data[day_key] += bid.amount * bid.rate
-
-    return [{'date': key, 'value': value} for key, value in data.items()]
+    result = await conn.execute(query)
+    return [{
+        'date': row.day.strftime(settings.DEFAULT_DATE_FORMAT),
+        'value': row.profit,
+    } for row in await result.fetchall()]
 
 
 async def get_bids_statuses_last_month(conn):
     starting_day = _get_starting_day()
-    bids = await get_closed_bids_for_period(conn, starting_day=starting_day)
-    data = defaultdict(int)
-
-    for bid in bids:
-        data[bid.status] += 1
+    query = sa.select([
+        bid_daily_stats.c.status,
+        sa.func.sum(bid_daily_stats.c.bids).label('bids'),
+    ]).where(sa.and_(
+        bid_daily_stats.c.day >= starting_day.date(),
+        bid_daily_stats.c.status == BidStatus.CLOSED.value,
+    )).group_by(bid_daily_stats.c.status)
 
+    result = await conn.execute(query)
+    data = {row.status: row.bids for row in await result.fetchall()}
     return [data]  # for donut chart
 
 
 async def get_closed_bids_for_period(
     conn,
     *,
-    starting_day
+    starting_day,
+    after=None,
+    limit=None,
 ):
     query = bid.select().where(sa.and_(
         bid.c.created > starting_day,
         bid.c.status == BidStatus.CLOSED.value,
-    )).order_by(sa.asc(bid.c.created))
+    ))
+    query = paginate(query, BID_PAGE_KEY, after=after, limit=limit)
 
     result = await conn.execute(query)
     return await result.fetchall()
@@ -69,22 +109,25 @@ async def get_closed_bids_for_period(
 async def get_notifications_last_month(conn):
     starting_day = _get_starting_day()
 
-    query = event.select().where(sa.and_(
-        event.c.created > starting_day,
-        event.c.event_type.in_((EventType.CALLED.value, EventType.NOTIFIED.value)),
-    ))
+    query = sa.select([
+        event_daily_stats.c.day,
+        event_daily_stats.c.event_type,
+        event_daily_stats.c.event_count,
+    ]).where(sa.and_(
+        event_daily_stats.c.day >= starting_day.date(),
+        event_daily_stats.c.event_type.in_(
+            (EventType.CALLED.value, EventType.NOTIFIED.value)),
+    )).order_by(event_daily_stats.c.day)
 
     result = await conn.execute(query)
-    events = await result.fetchall()
-
     data = defaultdict(lambda: defaultdict(int))
 
-    for ev in events:
-        day_key = ev.created.strftime(settings.DEFAULT_DATE_FORMAT)
-        if ev.event_type == EventType.CALLED.value:
-            data[day_key]['called'] += ev.event_count
-        elif ev.event_type == EventType.NOTIFIED.value:
-            data[day_key]['notified'] += ev.event_count
+    for row in await result.fetchall():
+        day_key = row.day.strftime(settings.DEFAULT_DATE_FORMAT)
+        if row.event_type == EventType.CALLED.value:
+            data[day_key]['called'] += row.event_count
+        elif row.event_type == EventType.NOTIFIED.value:
+            data[day_key]['notified'] += row.event_count
 
     return [{
         'date': key,
@@ -7,10 +7,46 @@ from . import metadata, check_result
 from .user import user
 
 
+@attr.s
+class WaitConfig(object):
+    """
+    Conditions telling browser fetcher that page is ready to be grabbed.
+    All of the specified conditions should be met within `timeout` seconds.
+    """
+    css: str = attr.ib(default=None)  # selector of element to be present
+    xpath: str = attr.ib(default=None)
+    script: str = attr.ib(default=None)  # js expression evaluated to true
+    network_idle: bool = attr.ib(default=False)
+    timeout: float = attr.ib(default=10)
+
+
+def _wait_config(val):
+    if val is None or isinstance(val, WaitConfig):
+        return val
+    return WaitConfig(**val)
+
+
 @attr.s
 class FetcherConfig(object):
     driver: str = attr.ib(default=None)
     instance: str = attr.ib(default='simple')
+    # Response cache to make conditional requests with: memory or redis
+    cache: str = attr.ib(default=None)
+    wait = attr.ib(default=None, convert=_wait_config)
+
+
+@attr.s
+class ScheduleConfig(object):
+    """
+    When resource is grabbed. Interval defaults to global refresh period.
+    """
+    interval: float = attr.ib(default=None)  # minutes
+    jitter: float = attr.ib(default=0)  # max random delay of a run, seconds
+    # Run is cancelled when not finished within deadline, defaults to interval
+    deadline: float = attr.ib(default=None)  # seconds
+    # What to do when previous run is still in progress: skip or queue
+    overlap: str = attr.ib(
+        default='skip', validator=attr.validators.in_(('skip', 'queue')))
 
 
 @attr.s
@@ -18,12 +54,20 @@ class ProxyConfig(object):
     ip: str = attr.ib(default=None)
     use: bool = attr.ib(default=False)
     port: int = attr.ib(default=80)
+    # List of {ip, port} items to rotate proxies
+    pool: list = attr.ib(default=attr.Factory(list))
 
 
 @attr.s
 class URLConfig(object):
     currency: str = attr.ib(default=None)
     url: str = attr.ib(default=None)
+    in_bids: str = attr.ib(default=None)
+    out_bids: str = attr.ib(default=None)
+
+
+# Postgres channel notified on every config change
+CONFIG_CHANNEL = 'config_changed'
 
 
 config = sa.Table(
@@ -47,10 +91,12 @@ async def insert_new_config(
     new_config,
     user_id,
 ):
-    return await conn.execute(config.insert().values(
+    result = await conn.execute(config.insert().values(
         value=new_config,
         user_id=user_id,
     ))
+    await notify_config_changed(conn)
+    return result
 
 
 async def get_config_history(conn):
@@ -61,4 +107,10 @@ async def get_config_history(conn):
 async def remove_config(conn, config_id):
     query = config.delete(config.c.id == config_id)
     result = await conn.execute(query)
-    return await check_result(result)
+    removed = await check_result(result)
+    await notify_config_changed(conn)
+    return removed
+
+
+async def notify_config_changed(conn):
+    await conn.execute(f'NOTIFY {CONFIG_CHANNEL}')
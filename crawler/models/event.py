@@ -4,7 +4,7 @@ from datetime import datetime
 import sqlalchemy as sa
 
 from utils import get_logger
-from . import metadata
+from . import metadata, paginate
 
 
 logger = get_logger(__name__)
@@ -30,6 +30,8 @@ event = sa.Table(
     sa.PrimaryKeyConstraint('id', name='event_id_pkey'),
 )
 
+EVENT_PAGE_KEY = (event.c.created, event.c.id)
+
 
 async def add_event(
     conn,
@@ -50,7 +52,11 @@ async def add_event(
     return row_id
 
 
-async def get_events(conn):
-    query = event.select()
+async def get_events(conn, *, after=None, limit=None):
+    """
+    Newest events first.
+    """
+    query = paginate(event.select(), EVENT_PAGE_KEY,
+                     after=after, limit=limit, descending=True)
     result = await conn.execute(query)
     return await result.fetchall()
@@ -1,9 +1,10 @@
 from datetime import datetime
 
+import numpy as np
 import sqlalchemy as sa
 
 from utils import get_logger, get_midnight
-from . import metadata
+from . import metadata, paginate
 
 
 logger = get_logger(__name__)
@@ -24,6 +25,22 @@ rate = sa.Table(
     sa.PrimaryKeyConstraint('id', name='rate_id_pkey'),
 )
 
+RATE_PAGE_KEY = (rate.c.date, rate.c.id)
+
+
+# Partitioned by month, see `006_create_rate_history.sql`
+rate_history = sa.Table(
+    'rate_history', metadata,
+    sa.Column('created', sa.DateTime, nullable=False, default=datetime.now),
+    sa.Column('bank', sa.String, nullable=False),
+    sa.Column('currency', sa.String, nullable=False),
+    sa.Column('rate_buy', sa.Numeric(asdecimal=False), nullable=False),
+    sa.Column('rate_sale', sa.Numeric(asdecimal=False), nullable=False),
+)
+
+# Partitions known to exist, not to run DDL on every insert
+_history_partitions = set()
+
 
 async def insert_new_rate(
     conn, *,
@@ -42,7 +59,147 @@ async def insert_new_rate(
     return row_id
 
 
-async def get_rates(conn):
-    query = rate.select().order_by(sa.desc(rate.c.date))
+def get_partition_bounds(value):
+    start = datetime(value.year, value.month, 1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+async def ensure_history_partition(conn, created):
+    """
+    Create monthly partition for the time given along with BRIN index on time
+    which stays tiny as rows are appended in time order and btree index to
+    find latest snapshots.
+    """
+    start, end = get_partition_bounds(created)
+    name = f'rate_history_{start:%Y_%m}'
+    if name in _history_partitions:
+        return name
+
+    await conn.execute(
+        f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF rate_history '
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+    await conn.execute(
+        f'CREATE INDEX IF NOT EXISTS {name}_created_idx '
+        f'ON {name} USING brin (created)'
+    )
+    await conn.execute(
+        f'CREATE INDEX IF NOT EXISTS {name}_latest_idx '
+        f'ON {name} (bank, currency, created DESC)'
+    )
+    _history_partitions.add(name)
+    return name
+
+
+async def insert_rate_history(conn, rows):
+    """
+    Append many rate items with a single statement.
+    """
+    if not rows:
+        return 0
+
+    for created in {row['created'] for row in rows}:
+        await ensure_history_partition(conn, created)
+
+    result = await conn.execute(rate_history.insert().values(rows))
+    return result.rowcount
+
+
+async def delete_rate_history(conn, *, bank, currencies, created):
+    """
+    Remove rates of the bank stored exactly at `created`, e.g. a day of
+    archive to be written again.
+    """
+    query = rate_history.delete().where(sa.and_(
+        rate_history.c.bank == bank,
+        rate_history.c.currency.in_(currencies),
+        rate_history.c.created == created,
+    ))
+    result = await conn.execute(query)
+    return result.rowcount
+
+
+async def get_latest_snapshots(conn, *, bank, currencies):
+    """
+    One query per currency with a limit, so each partition is probed via
+    `(bank, currency, created)` index instead of reading the whole history.
+    """
+    if not currencies:
+        return {}
+
+    query = sa.union_all(*[
+        sa.select([rate_history]).where(sa.and_(
+            rate_history.c.bank == bank,
+            rate_history.c.currency == currency,
+        )).order_by(sa.desc(rate_history.c.created)).limit(1)
+        for currency in currencies
+    ])
+    result = await conn.execute(query)
+    return {row.currency: row for row in await result.fetchall()}
+
+
+async def insert_rate_snapshots(conn, snapshots, *, bank, created=None):
+    """
+    Append snapshots (currency, rate_buy, rate_sale) which differ from the
+    latest stored ones for the bank. Return snapshots actually inserted.
+    """
+    if not snapshots:
+        return []
+
+    latest = await get_latest_snapshots(
+        conn, bank=bank, currencies=[s['currency'] for s in snapshots])
+
+    changed = []
+    for snapshot in snapshots:
+        stored = latest.get(snapshot['currency'])
+        if stored is not None and \
+                stored.rate_buy == snapshot['rate_buy'] and \
+                stored.rate_sale == snapshot['rate_sale']:
+            continue
+        changed.append(snapshot)
+
+    created = created or datetime.now()
+    await insert_rate_history(conn, [
+        dict(snapshot, created=created, bank=bank) for snapshot in changed
+    ])
+    return changed
+
+
+async def get_rate_history(conn, *, bank, currency, start, end=None):
+    """
+    Snapshots within [start, end) as time ordered numpy arrays.
+    """
+    whereclause = [
+        rate_history.c.bank == bank,
+        rate_history.c.currency == currency,
+        rate_history.c.created >= start,
+    ]
+    if end is not None:
+        whereclause.append(rate_history.c.created < end)
+
+    query = sa.select([
+        rate_history.c.created,
+        rate_history.c.rate_buy,
+        rate_history.c.rate_sale,
+    ]).where(sa.and_(*whereclause)).order_by(rate_history.c.created)
+    result = await conn.execute(query)
+    rows = await result.fetchall()
+    return {
+        'created': np.array([r.created for r in rows], dtype='datetime64[s]'),
+        'rate_buy': np.array([r.rate_buy for r in rows], dtype=float),
+        'rate_sale': np.array([r.rate_sale for r in rows], dtype=float),
+    }
+
+
+async def get_rates(conn, *, after=None, limit=None):
+    """
+    Newest rates first.
+    """
+    query = paginate(rate.select(), RATE_PAGE_KEY,
+                     after=after, limit=limit, descending=True)
     result = await conn.execute(query)
     return await result.fetchall()
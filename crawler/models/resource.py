@@ -2,8 +2,9 @@ import attr
 import sqlalchemy as sa
 from attr.validators import instance_of as an
 
+import settings
 from . import metadata
-from .configs import ProxyConfig, FetcherConfig, URLConfig
+from .configs import ProxyConfig, FetcherConfig, URLConfig, ScheduleConfig
 
 
 def ensure_cls(cl):
@@ -47,8 +48,17 @@ class Resource(object):
         convert=ensure_cls(FetcherConfig),
         validator=an(FetcherConfig),
     )
+    schedule = attr.ib(
+        default=ScheduleConfig(),
+        convert=ensure_cls(ScheduleConfig),
+        validator=an(ScheduleConfig),
+    )
     grabber: str = attr.ib(default='dummy')
     parser: str = attr.ib(default='dummy')
+    # Engine of the parser, e.g. `bs` or `lxml`; parser's default when empty
+    parser_engine: str = attr.ib(default=None)
+    # Max number of simultaneous requests to the resource
+    concurrency: int = attr.ib(default=settings.DEFAULT_RESOURCE_CONCURRENCY)
 
     def __str__(self):
         return '{}({})'.format(self.name, self.link)
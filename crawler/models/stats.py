@@ -1,8 +1,11 @@
 import operator
 import statistics
 
-from crawler.helpers import load_config, get_statuses
+import sqlalchemy as sa
+
+from crawler.helpers import config_service, get_statuses
 from crawler.models.bid import (
+    daily_bids,
     get_daily_bids,
     BidType,
     BidStatus,
@@ -25,7 +28,7 @@ async def get_current_profit(conn):
 
 
 async def collect_statistics(conn):
-    config = await load_config(conn)
+    config = await config_service.get(conn=conn)
 
     total_profit = await get_daily_profit(conn)
     current_profit = await get_current_profit(conn)
@@ -66,8 +69,15 @@ def get_bids_info(bids):
     active = _f(len,
                 [*filter(lambda s: s in get_statuses(*ACTIVE_STATUSES),
                          statuses)])
+    dropped = _f(len,
+                 [*filter(lambda s: s in get_statuses(*GONE_STATUSES),
+                          statuses)])
+    closed = statuses.count(BidStatus.CLOSED.value)
     return {
+        'total': len(statuses),
         'active': active,
+        'dropped': dropped,
+        'closed': closed,
         'rate': {
             'min': _f(min, rates),
             'avg': _f(statistics.mean, rates),
@@ -79,3 +89,59 @@ def get_bids_info(bids):
             'max': _f(max, amounts),
         },
     }
+
+
+def _n(value):
+    if value is None:
+        return 0
+    return float(value)
+
+
+async def get_daily_bids_info(conn):
+    return await get_query_bids_info(conn, daily_bids())
+
+
+async def get_query_bids_info(conn, bids):
+    """
+    Same as `get_bids_info` for a container of stored bids computed by
+    database. Falls back to fetching bids when some of the filters cannot be
+    translated to sql.
+    """
+    query, residual = bids.compile()
+    if residual is not None:
+        return get_bids_info(await bids.fetch(conn))
+
+    rows = query.alias()
+    active = rows.c.status.in_(get_statuses(*ACTIVE_STATUSES))
+    dropped = rows.c.status.in_(get_statuses(*GONE_STATUSES))
+    closed = rows.c.status == BidStatus.CLOSED.value
+    info_query = sa.select([
+        sa.func.count().label('total'),
+        sa.func.count().filter(active).label('active'),
+        sa.func.count().filter(dropped).label('dropped'),
+        sa.func.count().filter(closed).label('closed'),
+        sa.func.min(rows.c.rate).label('rate_min'),
+        sa.func.avg(rows.c.rate).label('rate_avg'),
+        sa.func.max(rows.c.rate).label('rate_max'),
+        sa.func.min(rows.c.amount).label('amount_min'),
+        sa.func.avg(rows.c.amount).label('amount_avg'),
+        sa.func.max(rows.c.amount).label('amount_max'),
+    ])
+    result = await conn.execute(info_query)
+    info = await result.fetchone()
+    return {
+        'total': info.total,
+        'active': info.active,
+        'dropped': info.dropped,
+        'closed': info.closed,
+        'rate': {
+            'min': _n(info.rate_min),
+            'avg': _n(info.rate_avg),
+            'max': _n(info.rate_max),
+        },
+        'amount': {
+            'min': _n(info.amount_min),
+            'avg': _n(info.amount_avg),
+            'max': _n(info.amount_max),
+        },
+    }
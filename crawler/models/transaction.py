@@ -10,7 +10,7 @@ import sqlalchemy as sa
 import settings
 from utils import get_midnight, get_logger
 from crawler.helpers import load_config, get_statuses
-from . import metadata
+from . import metadata, paginate
 from .user import user
 
 
@@ -51,6 +51,8 @@ transaction = sa.Table(
                             ondelete='NO ACTION'),
 )
 
+TRANSACTION_PAGE_KEY = (transaction.c.id,)
+
 
 class NewTransaction(object):
     def __init__(self, amount, rate_buy, rate_sale, date):
@@ -105,11 +107,18 @@ async def get_transactions(
     conn,
     *,
     statuses: Iterable[TransactionStatus]=None,
+    after=None,
+    limit=None,
 ):
+    """
+    Newest transactions first.
+    """
     query = transaction.select()
     if statuses is not None:
         status_values = get_statuses(*statuses)
         query = query.where(transaction.c.status.in_(status_values))
+    query = paginate(query, TRANSACTION_PAGE_KEY,
+                     after=after, limit=limit, descending=True)
 
     result = await conn.execute(query)
     return await result.fetchall()
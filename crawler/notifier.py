@@ -34,7 +34,7 @@ def format_message(transaction_type, amount, rate, bank):
     )
 
 
-async def notify(message):
+async def notify(message, *, session=None):
     url = settings.ENDPOINT_TEMPLATE.format(bot_api_key=settings.TELEGRAM_BOT_TOKEN)
     if settings.TELEGRAM_BOT_TOKEN is None or settings.CHAT_ID is None:
         logger.warning(
@@ -47,8 +47,15 @@ async def notify(message):
         'chat_id': settings.CHAT_ID,
         'text': message,
     }
+    if session is not None:
+        return await _send(session, url, params)
+
     async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as resp:
-            if resp.status != HTTPStatus.OK:
-                text = await resp.text()
-                logger.error(f'Error {resp.status}: {text}')
+        return await _send(session, url, params)
+
+
+async def _send(session, url, params):
+    async with session.get(url, params=params) as resp:
+        if resp.status != HTTPStatus.OK:
+            text = await resp.text()
+            logger.error(f'Error {resp.status}: {text}')
@@ -2,12 +2,38 @@ import re
 
 from abc import ABC, abstractmethod
 
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
 
 class BaseParser(ABC):
+    # Engines parser can be created with by name, see `with_engine`
+    engines = {}
+
+    @classmethod
+    def with_engine(cls, name=None):
+        if name is None:
+            return cls()
+
+        engine_cls = cls.engines.get(name)
+        if engine_cls is None:
+            raise ValueError(f'{cls.__name__} has no such engine: {name}')
+        return cls(engine_cls=engine_cls)
+
     @abstractmethod
     def parse(self, html):
         pass
 
+    async def parse_stream(self, chunks):
+        """
+        Parse html received as async iterator of text chunks. Engines which
+        cannot process partial documents get the whole page at once.
+        """
+        html = ''.join([chunk async for chunk in chunks])
+        return self.parse(html)
+
 
 class BaseEngine(ABC):
     def __init__(self):
@@ -27,3 +53,28 @@ class BaseEngine(ABC):
     @property
     def data(self):
         return self._data
+
+
+def has_class(class_name):
+    """
+    XPath predicate matching element by one of its classes the same way
+    BeautifulSoup does.
+    """
+    return (f'contains(concat(" ", normalize-space(@class), " "), '
+            f'" {class_name} ")')
+
+
+class BaseLxmlEngine(BaseEngine):
+    """
+    Engine backed by libxml2 parser which is much faster than html5lib.
+    """
+    def __init__(self):
+        super().__init__()
+        if lxml is None:
+            raise RuntimeError('Install lxml to use lxml parser engine')
+
+    @staticmethod
+    def get_tree(html):
+        # Unicode strings with encoding declaration are not accepted
+        parser = lxml.html.HTMLParser(encoding='utf-8')
+        return lxml.html.document_fromstring(html.encode(), parser=parser)
@@ -1,14 +1,49 @@
 import re
 import base64
 from itertools import takewhile
+from html.parser import HTMLParser
 
 from bs4 import BeautifulSoup
 
 from utils import LoggableMixin
-from crawler.parser import BaseParser, BaseEngine
+from crawler.parser import BaseParser, BaseEngine, BaseLxmlEngine, has_class
 
 
-class _BSEngine(BaseEngine, LoggableMixin):
+class _BaseIUaEngine(LoggableMixin):
+    """
+    Extraction of a bid from texts of table cells shared between engines.
+    """
+    def make_bid(self, rate_text, amount_text, phone_text, handler):
+        return {
+            'rate': self._extract_rate(rate_text),
+            'amount': self._extract_amount(amount_text),
+            'phone': self._extract_phone(phone_text, handler),
+            'currency': 'USD',
+        }
+
+    def _extract_rate(self, text):
+        return float(text)
+
+    def _extract_amount(self, text):
+        return float(''.join(takewhile(str.isnumeric, text)))
+
+    def _extract_phone(self, text, handler):
+        pattern = r"showPhone\(this, '(\S+)'\)"
+        match_phone = re.match(pattern, handler)
+        if match_phone is None:
+            self.logger.warning('Cannot match the string %s' % handler)
+            return
+        encoded_second_part = match_phone.group(1)
+
+        first_part = ''.join(
+            takewhile(str.isprintable, text)).replace(' ', '')
+        second_part = base64.b64decode(encoded_second_part).decode().strip()
+
+        encoded_phone = first_part + second_part
+        return encoded_phone
+
+
+class _BSEngine(_BaseIUaEngine, BaseEngine):
     def process(self, html):
         soup = BeautifulSoup(html, 'html5lib')
         tbodies = soup.select('tbody')
@@ -25,43 +60,209 @@ class _BSEngine(BaseEngine, LoggableMixin):
         data = []
         for row in rows:
             cells = row.find_all('td')
-            new_bid = {
-                'rate': self._extract_rate(cells[1]),
-                'amount': self._extract_amount(cells[2]),
-                'phone': self._extract_phone(cells[3]),
-                'currency': 'USD',
-            }
+            link = cells[3].find('span', 'a')
+            new_bid = self.make_bid(
+                cells[1].text,
+                cells[2].text,
+                cells[3].text,
+                link.attrs['onclick'],
+            )
             data.append(new_bid)
         self._data = data
 
-    def _extract_rate(self, cell):
-        return float(cell.text)
 
-    def _extract_amount(self, cell):
-        return float(''.join(takewhile(str.isnumeric, cell.text)))
+class _LxmlEngine(_BaseIUaEngine, BaseLxmlEngine):
+    def process(self, html):
+        tree = self.get_tree(html)
+        tbody = None
+        for tb in tree.iter('tbody'):
+            if 'avoid-sort' not in tb.classes:
+                tbody = tb
+                break
 
-    def _extract_phone(self, cell):
-        link = cell.find('span', 'a')
-        handler = link.attrs['onclick']
-        pattern = r"showPhone\(this, '(\S+)'\)"
-        match_phone = re.match(pattern, handler)
-        if match_phone is None:
-            self.logger.warning('Cannot match the string %s' % handler)
+        if tbody is None:
+            raise ValueError('Cannot find table body with data')
+
+        data = []
+        for row in tbody.iter('tr'):
+            cells = row.xpath('.//td')
+            link = cells[3].xpath(f'.//span[{has_class("a")}]')[0]
+            new_bid = self.make_bid(
+                cells[1].text_content(),
+                cells[2].text_content(),
+                cells[3].text_content(),
+                link.get('onclick'),
+            )
+            data.append(new_bid)
+        self._data = data
+
+
+def get_row_fingerprint(rate_text, amount_text, phone_text, handler):
+    """
+    Identify a row by raw texts of rate, amount and phone not to spend time
+    on extraction for rows which are already known.
+    """
+    return rate_text.strip(), amount_text.strip(), phone_text.strip(), handler
+
+
+class _StreamEngine(_BaseIUaEngine, HTMLParser, BaseEngine):
+    """
+    Event driven engine which emits bids row by row as soon as a row of the
+    data table is closed and ignores the rest of the document.
+    Rows known from the previous page (`seen` fingerprints) are not emitted.
+    Order of rows is not relied upon, so the whole table is always read.
+    """
+    def __init__(self, *, seen=None):
+        HTMLParser.__init__(self)
+        BaseEngine.__init__(self)
+        self.seen = seen or set()
+        self._reset_state()
+
+    def _reset_state(self):
+        self.fingerprints = set()
+        self.found = False
+        self.done = False
+        self._in_table = False
+        self._cells = None
+        self._cell_parts = None
+        self._handler = None
+        self._rows = []
+
+    def process(self, html):
+        self.reset()
+        self._reset_state()
+        self.feed(html)
+        self.close()
+        self._data = self.pop_rows()
+
+    def close(self):
+        super().close()
+        if not self.found:
+            raise ValueError('Cannot find table body with data')
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def pop_rows(self):
+        rows = self._rows
+        self._rows = []
+        return rows
+
+    @staticmethod
+    def _get_classes(attrs):
+        return (dict(attrs).get('class') or '').split()
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
             return
-        encoded_second_part = match_phone.group(1)
 
-        first_part = ''.join(
-            takewhile(str.isprintable, cell.text)).replace(' ', '')
-        second_part = base64.b64decode(encoded_second_part).decode().strip()
+        if not self._in_table:
+            if tag == 'tbody' and \
+                    'avoid-sort' not in self._get_classes(attrs):
+                self._in_table = self.found = True
+            return
 
-        encoded_phone = first_part + second_part
-        return encoded_phone
+        if tag == 'tr':
+            self._end_row()
+            self._cells = []
+            self._handler = None
+        elif tag == 'td' and self._cells is not None:
+            self._end_cell()
+            self._cell_parts = []
+        elif tag == 'span' and self._cell_parts is not None and \
+                len(self._cells) == 3 and self._handler is None and \
+                'a' in self._get_classes(attrs):
+            self._handler = dict(attrs).get('onclick')
+
+    def handle_endtag(self, tag):
+        if not self._in_table:
+            return
+
+        if tag == 'td':
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag == 'tbody':
+            self._end_row()
+            self._in_table = False
+            self.done = True
+
+    def handle_data(self, data):
+        if self._cell_parts is not None:
+            self._cell_parts.append(data)
+
+    def _end_cell(self):
+        if self._cell_parts is not None:
+            self._cells.append(''.join(self._cell_parts))
+            self._cell_parts = None
+
+    def _end_row(self):
+        self._end_cell()
+        cells, self._cells = self._cells, None
+        if not cells or self.done:
+            return
+
+        texts = (cells[1], cells[2], cells[3], self._handler)
+        fingerprint = get_row_fingerprint(*texts)
+        self.fingerprints.add(fingerprint)
+        if fingerprint in self.seen:
+            return
+
+        self._rows.append(self.make_bid(*texts))
 
 
 class IUaParser(BaseParser):
+    engines = {
+        'bs': _BSEngine,
+        'lxml': _LxmlEngine,
+        'stream': _StreamEngine,
+    }
+
     def __init__(self, engine_cls=_BSEngine):
+        self.engine_cls = engine_cls
         self.engine = engine_cls()
+        # Fingerprints of rows of the previous page by page key
+        self._seen = {}
+
+    @property
+    def incremental(self):
+        return issubclass(self.engine_cls, _StreamEngine)
 
     def parse(self, html):
         self.engine.process(html)
         return self.engine.data
+
+    async def iter_bids(self, chunks, *, key=None):
+        """
+        Yield bids which were not on the previous page with the same key
+        while html is still being received. Stops receiving once the data
+        table is over. Without a key all the bids are yielded.
+        """
+        if not self.incremental:
+            for row in await super().parse_stream(chunks):
+                yield row
+            return
+
+        seen = self._seen.get(key) if key is not None else None
+        engine = self.engine_cls(seen=seen)
+        try:
+            async for chunk in chunks:
+                engine.feed(chunk)
+                for row in engine.pop_rows():
+                    yield row
+                if engine.done:
+                    break
+            engine.close()
+            for row in engine.pop_rows():
+                yield row
+        finally:
+            aclose = getattr(chunks, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+
+        if key is not None:
+            self._seen[key] = engine.fingerprints
+
+    async def parse_stream(self, chunks):
+        return [row async for row in self.iter_bids(chunks)]
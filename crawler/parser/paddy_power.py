@@ -1,9 +1,21 @@
 from bs4 import BeautifulSoup
 
-from crawler.parser import BaseParser, BaseEngine
+from crawler.parser import BaseParser, BaseEngine, BaseLxmlEngine, has_class
 
 
-class _BSEngine(BaseEngine):
+class _OddMixin(object):
+    def get_odd_value(self, text):
+        if '/' in text:
+            nominator, denominator = map(int, text.split('/'))
+            return nominator / denominator
+
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+class _BSEngine(_OddMixin, BaseEngine):
     def process(self, html):
         html = html.replace('<!---->', '')
         soup = BeautifulSoup(html, 'html5lib')
@@ -18,18 +30,29 @@ class _BSEngine(BaseEngine):
 
         self._data = data
 
-    def get_odd_value(self, text):
-        if '/' in text:
-            nominator, denominator = map(int, text.split('/'))
-            return nominator / denominator
 
-        try:
-            return float(text)
-        except ValueError:
-            return text
+class _LxmlEngine(_OddMixin, BaseLxmlEngine):
+    def process(self, html):
+        html = html.replace('<!---->', '')
+        tree = self.get_tree(html)
+        data = {}
+        for item in tree.xpath(f'//div[{has_class("outright-item")}]'):
+            team_elem = item.xpath(
+                f'.//p[{has_class("outright-item__runner-name")}]')[0]
+            odd_elem = item.xpath(f'.//button[{has_class("btn-odds")}]')[0]
+            team = team_elem.text_content().strip()
+            odd = self.get_odd_value(odd_elem.text_content().strip())
+            data[team] = odd
+
+        self._data = data
 
 
 class PaddyPowerParser(BaseParser):
+    engines = {
+        'bs': _BSEngine,
+        'lxml': _LxmlEngine,
+    }
+
     def __init__(self, engine_cls=_BSEngine):
         self.engine = engine_cls()
 
@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import settings
+from utils import LoggableMixin
+
+
+def _parse(parser, html):
+    # Runs within a worker on a copy of the parser
+    return parser.parse(html)
+
+
+class ParserPool(LoggableMixin):
+    """
+    Runs CPU-heavy parsing in worker processes not to block the loop. Parsers
+    (with their engines) are pickled for each call, so they have to keep no
+    state between calls. Small pages are parsed inline as sending them to a
+    worker costs more than parsing.
+    """
+    def __init__(self, *,
+                 workers=settings.PARSER_POOL_WORKERS,
+                 min_size=settings.PARSER_POOL_MIN_SIZE):
+        self.workers = workers
+        self.min_size = min_size
+        self._executor = None
+        self.counters = {
+            'inline': 0,
+            'offloaded': 0,
+        }
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # Workers must not inherit loop, sockets and locks of the crawler
+            context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def stats(self):
+        return dict(self.counters)
+
+    async def parse(self, parser, html):
+        if not self.workers or len(html) < self.min_size:
+            self.counters['inline'] += 1
+            return parser.parse(html)
+
+        self.counters['offloaded'] += 1
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, _parse, parser, html)
+
+    async def close(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # Waiting for workers to exit should not block the loop
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, functools.partial(executor.shutdown, wait=True))
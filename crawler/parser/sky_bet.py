@@ -83,6 +83,10 @@ class _HTMLParserEngine(HTMLParser, BaseEngine):
 
 
 class SkyBetParser(BaseParser):
+    engines = {
+        'html': _HTMLParserEngine,
+    }
+
     def __init__(self, engine_cls=_HTMLParserEngine):
         self.engine = engine_cls()
 
@@ -90,3 +94,9 @@ class SkyBetParser(BaseParser):
         self.engine.process(html)
         result = self.engine.data
         return result
+
+    async def parse_stream(self, chunks):
+        async for chunk in chunks:
+            self.engine.process(chunk)
+        self.engine.close()
+        return self.engine.data
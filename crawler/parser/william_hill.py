@@ -1,9 +1,24 @@
 from bs4 import BeautifulSoup
 
-from crawler.parser import BaseParser, BaseEngine
+from crawler.parser import BaseParser, BaseEngine, BaseLxmlEngine, has_class
 
 
-class _RegexEngine(BaseEngine):
+class _OddMixin(object):
+    def get_odd_value(self, text):
+        if text == 'EVS':
+            return text
+
+        if '/' in text:
+            nominator, denominator = map(int, text.split('/'))
+            return nominator / denominator
+
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+class _RegexEngine(_OddMixin, BaseEngine):
     def process(self, html):
         html = html.replace('<!---->', '')
         soup = BeautifulSoup(html, 'html5lib')
@@ -20,21 +35,30 @@ class _RegexEngine(BaseEngine):
         odds_values = map(self.get_odd_value, odds)
         self._data = dict(zip(teams, odds_values))
 
-    def get_odd_value(self, text):
-        if text == 'EVS':
-            return text
-
-        if '/' in text:
-            nominator, denominator = map(int, text.split('/'))
-            return nominator / denominator
 
-        try:
-            return float(text)
-        except ValueError:
-            return text
+class _LxmlEngine(_OddMixin, BaseLxmlEngine):
+    def process(self, html):
+        html = html.replace('<!---->', '')
+        tree = self.get_tree(html)
+        team_class = has_class('ui-scoreboard-runner__home')
+        teams = [
+            e.text_content().strip()
+            for e in tree.xpath(f'//ui-scoreboard-runner[{team_class}]')
+        ]
+        odds = []
+        for item in tree.iter('avb-item'):
+            odds_elem = item.xpath(
+                f'.//btn-odds[{has_class("avb-item__btn-odds")}]')[0]
+            odds.append(self.get_odd_value(odds_elem.text_content().strip()))
+        self._data = dict(zip(teams, odds))
 
 
 class WilliamHillParser(BaseParser):
+    engines = {
+        'bs': _RegexEngine,
+        'lxml': _LxmlEngine,
+    }
+
     def __init__(self, engine_cls=_RegexEngine):
         self.engine = engine_cls()
 
@@ -1,6 +1,13 @@
 """
 Proxy module allowing fetchers to use proxy servers.
 """
+import time
+import asyncio
+
+import aiohttp
+
+import settings
+from utils import LoggableMixin
 
 
 class Proxy(object):
@@ -18,3 +25,140 @@ class Proxy(object):
     @property
     def chrome_uri(self):
         return f'{self.ip}:{self.port}'
+
+    def __repr__(self):
+        return f'Proxy({self.ip}:{self.port})'
+
+
+class ProxyStats(object):
+    """
+    Health of a proxy: exponentially weighted latency and error rate, so
+    recent results matter more than old ones.
+    """
+    SMOOTHING = 0.3
+    # Latency assumed for proxy which was not used yet
+    DEFAULT_LATENCY = 1
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0
+        self.successes = 0
+        self.failures = 0
+
+    def _smooth(self, previous, value):
+        if previous is None:
+            return value
+        return previous + self.SMOOTHING * (value - previous)
+
+    def record_success(self, latency):
+        self.successes += 1
+        if latency is not None:
+            self.latency = self._smooth(self.latency, latency)
+        self.error_rate = self._smooth(self.error_rate, 0)
+
+    def record_failure(self):
+        self.failures += 1
+        self.error_rate = self._smooth(self.error_rate, 1)
+
+    @property
+    def score(self):
+        """
+        The lower the better. Errors make proxy look proportionally slower.
+        """
+        latency = self.latency
+        if latency is None:
+            latency = self.DEFAULT_LATENCY
+        return latency * (1 + 10 * self.error_rate)
+
+
+class ProxyPool(LoggableMixin):
+    """
+    Hands out the healthiest proxy for each request and checks all of them
+    in background.
+    """
+    def __init__(self, proxies, *, http_client=None,
+                 check_url=settings.PROXY_CHECK_URL,
+                 check_interval=settings.PROXY_CHECK_INTERVAL,
+                 max_error_rate=settings.PROXY_MAX_ERROR_RATE):
+        if not proxies:
+            raise ValueError('Proxy pool requires at least one proxy')
+
+        self.proxies = list(proxies)
+        self.stats = {proxy.uri: ProxyStats() for proxy in self.proxies}
+        self.http_client = http_client
+        self.check_url = check_url
+        self.check_interval = check_interval
+        self.max_error_rate = max_error_rate
+        self._sticky = {}
+        self._check_task = None
+
+    def _ensure_checking(self):
+        if self._check_task is None and self.check_interval:
+            self._check_task = asyncio.ensure_future(self._check_forever())
+
+    def get(self):
+        """
+        Best proxy for a single request.
+        """
+        self._ensure_checking()
+        return min(self.proxies, key=lambda p: self.stats[p.uri].score)
+
+    def sticky(self, key):
+        """
+        Same proxy for the same key (e.g. a browser session) until it becomes
+        unhealthy.
+        """
+        proxy = self._sticky.get(key)
+        if proxy is None or not self.is_healthy(proxy):
+            proxy = self.get()
+            self._sticky[key] = proxy
+        return proxy
+
+    def is_healthy(self, proxy):
+        return self.stats[proxy.uri].error_rate <= self.max_error_rate
+
+    def report(self, proxy, *, latency=None, error=False):
+        stats = self.stats[proxy.uri]
+        if error:
+            stats.record_failure()
+        else:
+            stats.record_success(latency)
+
+    async def check(self, proxy):
+        session = self.http_client.session
+        started = time.monotonic()
+        try:
+            async with session.get(self.check_url, proxy=proxy.uri) as resp:
+                await resp.read()
+                if resp.status >= 400:
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.debug('%s failed health check: %r', proxy, e)
+            self.report(proxy, error=True)
+        else:
+            self.report(proxy, latency=time.monotonic() - started)
+
+    async def check_all(self):
+        await asyncio.gather(*[self.check(proxy) for proxy in self.proxies])
+
+    async def _check_forever(self):
+        if self.http_client is None:
+            return
+
+        while True:
+            try:
+                await self.check_all()
+            except Exception:
+                # Keep checking, otherwise proxies never recover
+                self.logger.exception('Proxies health check failed')
+            await asyncio.sleep(self.check_interval)
+
+    async def close(self):
+        if self._check_task is not None:
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+            self._check_task = None
@@ -0,0 +1,91 @@
+"""
+Storage for response bodies and their validators (ETag/Last-Modified) which
+allows fetchers to make conditional requests.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import attr
+
+import settings
+
+
+@attr.s
+class CachedResponse(object):
+    body = attr.ib()
+    is_json: bool = attr.ib(default=False)
+    etag: str = attr.ib(default=None)
+    last_modified: str = attr.ib(default=None)
+
+    @property
+    def validators(self):
+        """
+        Headers to be sent along with conditional request.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class BaseResponseCache(ABC):
+    @abstractmethod
+    async def get(self, url):
+        """
+        Return `CachedResponse` stored for the url or None.
+        """
+
+    @abstractmethod
+    async def set(self, url, response: CachedResponse):
+        """
+        Store response for the url.
+        """
+
+
+class MemoryResponseCache(BaseResponseCache):
+    """
+    In-process LRU cache. Keeps decoded bodies so nothing is parsed again
+    on cache hit.
+    """
+    def __init__(self, maxsize=settings.RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    async def get(self, url):
+        response = self._data.get(url)
+        if response is not None:
+            self._data.move_to_end(url)
+        return response
+
+    async def set(self, url, response: CachedResponse):
+        self._data[url] = response
+        self._data.move_to_end(url)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisResponseCache(BaseResponseCache):
+    """
+    Store responses within shared `crawler.cache.Cache` so validators
+    survive restarts and are visible to other processes.
+    """
+    KEY_PREFIX = 'response'
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _get_key(self, url):
+        return self.cache.make_key(self.KEY_PREFIX, url)
+
+    async def get(self, url):
+        data = await self.cache.get(self._get_key(url))
+        if data is not None:
+            return CachedResponse(**data)
+
+    async def set(self, url, response: CachedResponse):
+        await self.cache.set(self._get_key(url), attr.asdict(response))
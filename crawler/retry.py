@@ -0,0 +1,214 @@
+"""
+Retry failed requests with backoff and stop hammering hosts which are down.
+"""
+import time
+import random
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+import aiohttp
+from selenium.common.exceptions import WebDriverException
+
+import settings
+from utils import LoggableMixin
+
+
+RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+RETRY_EXCEPTIONS = (
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+    # Crashed browser is replaced by pool so next attempt gets a new one
+    WebDriverException,
+)
+
+
+class ResponseError(RuntimeError):
+    def __init__(self, status, *, retry_after=None):
+        super().__init__(f'Incorrect response: {status}')
+        self.status = status
+        self.retry_after = retry_after  # seconds
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def parse_retry_after(value):
+    """
+    Retry-After header holds either number of seconds or http date.
+    """
+    if value is None:
+        return
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return
+    delta = retry_date - datetime.now(timezone.utc)
+    return max(delta.total_seconds(), 0)
+
+
+def get_host(url):
+    return urlparse(url).netloc
+
+
+class CircuitBreaker(object):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, *,
+                 failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=settings.CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0  # consecutive ones
+        self.opened_at = None
+        self.trial_pending = False
+        self.counters = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'rejected': 0,
+        }
+
+    def allow(self):
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.counters['rejected'] += 1
+                return False
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            # Let one trial request through, others wait for its result
+            if self.trial_pending:
+                self.counters['rejected'] += 1
+                return False
+            self.trial_pending = True
+
+        self.counters['requests'] += 1
+        return True
+
+    def record_success(self):
+        self.trial_pending = False
+        self.counters['successes'] += 1
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def cancel_trial(self):
+        """
+        Request was cancelled before telling anything about the host, so
+        the next one becomes the trial.
+        """
+        self.trial_pending = False
+
+    def record_failure(self):
+        self.trial_pending = False
+        self.counters['failures'] += 1
+        self.failures += 1
+        if self.state == self.HALF_OPEN or \
+                self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self):
+        return dict(state=self.state, **self.counters)
+
+
+class RetryPolicy(LoggableMixin):
+    """
+    Retry requests failed with connection errors or with one of
+    `RETRY_STATUSES` using exponential backoff with full jitter. Holds one
+    circuit breaker per host so it should be shared between fetchers.
+    """
+    def __init__(self, *,
+                 attempts=settings.FETCH_RETRY_ATTEMPTS,
+                 base_delay=settings.FETCH_RETRY_BASE_DELAY,
+                 max_delay=settings.FETCH_RETRY_MAX_DELAY,
+                 failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=settings.CIRCUIT_RESET_TIMEOUT):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+
+    def get_breaker(self, host):
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                failure_threshold=self.failure_threshold,
+                reset_timeout=self.reset_timeout,
+            )
+        return self.breakers[host]
+
+    def stats(self):
+        """
+        Per host state and counters.
+        """
+        return {host: breaker.stats()
+                for host, breaker in self.breakers.items()}
+
+    def is_retryable(self, exc):
+        if isinstance(exc, ResponseError):
+            return exc.status in RETRY_STATUSES
+        return isinstance(exc, RETRY_EXCEPTIONS)
+
+    def get_delay(self, attempt, exc):
+        retry_after = getattr(exc, 'retry_after', None)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        backoff = min(self.base_delay * 2 ** attempt, self.max_delay)
+        return random.uniform(0, backoff)
+
+    async def run(self, url, fn, *args, **kwargs):
+        host = get_host(url)
+        breaker = self.get_breaker(host)
+        for attempt in range(self.attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(
+                    f'Circuit for {host} is open, not requesting {url}')
+
+            try:
+                result = await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                # E.g. by deadline of a task, neither success nor failure
+                breaker.cancel_trial()
+                raise
+            except Exception as e:
+                if not self.is_retryable(e):
+                    # Host is responsive, request itself is wrong
+                    breaker.record_success()
+                    raise
+
+                breaker.record_failure()
+                if attempt == self.attempts - 1:
+                    raise
+
+                delay = self.get_delay(attempt, e)
+                breaker.counters['retries'] += 1
+                self.logger.warning('Request to %s failed: %r. '
+                                    'Retrying in %.2f seconds...',
+                                    url, e, delay)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
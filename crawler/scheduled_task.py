@@ -1,4 +1,7 @@
+import math
+import random
 import typing
+import asyncio
 
 from datetime import datetime, timedelta
 from utils import make_datetime, LoggableMixin
@@ -32,3 +35,103 @@ class ScheduledTask(LoggableMixin):
         self.logger.info('Running task scheduled for %s at %s',
                          self.scheduled_time, self.current_time)
         return self.task().__await__()
+
+
+class PeriodicTask(LoggableMixin):
+    """
+    Task running at a fixed rate: runs are planned relatively to the
+    previous planned time, not to the moment previous run has finished.
+    """
+    SKIP = 'skip'
+    QUEUE = 'queue'
+
+    def __init__(self, *, task, name=None, interval=None, jitter=0,
+                 deadline=None, overlap=SKIP):
+        self.task = task  # awaitable object or coroutine function
+        self.name = name or str(task)
+        self.interval = interval  # seconds, None to use scheduler's default
+        self.jitter = jitter
+        self.deadline = deadline
+        self.overlap = overlap
+        # Nominal time of the next run, without jitter
+        self.planned_at = None
+        self.running = None
+        self.queued = False
+        self.counters = {
+            'runs': 0,
+            'skipped': 0,
+            'queued': 0,
+            'failed': 0,
+            'overdue': 0,
+        }
+
+    @classmethod
+    def for_grabber(cls, grabber):
+        schedule = grabber.resource.schedule
+        interval = schedule.interval
+        return cls(
+            task=grabber,
+            name=grabber.name,
+            interval=interval * 60 if interval else None,
+            jitter=schedule.jitter,
+            deadline=schedule.deadline,
+            overlap=schedule.overlap,
+        )
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_running(self):
+        return self.running is not None and not self.running.done()
+
+    def get_next_time(self, now, default_interval):
+        """
+        Plan next run skipping periods missed while the loop was busy.
+        """
+        interval = self.interval or default_interval
+        if self.planned_at is None:
+            self.planned_at = now
+        else:
+            self.planned_at += interval
+            if self.planned_at < now:
+                missed = math.ceil((now - self.planned_at) / interval)
+                self.planned_at += missed * interval
+        return self.planned_at + random.uniform(0, self.jitter)
+
+    def start(self, default_interval):
+        if self.is_running:
+            if self.overlap == self.QUEUE and not self.queued:
+                self.counters['queued'] += 1
+                self.queued = True
+            else:
+                self.counters['skipped'] += 1
+                self.logger.warning('%s is still running, skipping', self)
+            return
+
+        deadline = self.deadline or self.interval or default_interval
+        self.running = asyncio.ensure_future(self._run(deadline))
+
+    async def _call(self):
+        if callable(self.task):
+            return await self.task()
+        return await self.task
+
+    async def _run(self, deadline):
+        self.counters['runs'] += 1
+        try:
+            return await asyncio.wait_for(self._call(), deadline)
+        except asyncio.CancelledError:
+            self.queued = False
+            raise
+        except asyncio.TimeoutError:
+            self.counters['overdue'] += 1
+            self.logger.error('%s did not finish within %s seconds',
+                              self, deadline)
+        except Exception:
+            self.counters['failed'] += 1
+            self.logger.exception('%s got exception:', self)
+        finally:
+            if self.queued:
+                self.queued = False
+                self.running = asyncio.ensure_future(self._run(deadline))
@@ -1,6 +1,7 @@
 """
 Schedule periodic tasks and ensure their execution within given period.
 """
+import heapq
 import asyncio
 import traceback
 from datetime import datetime
@@ -11,17 +12,20 @@ import aiohttp
 import settings
 from utils import make_datetime, LoggableMixin
 from crawler.notifier import notify
+from crawler.scheduled_task import PeriodicTask
 from crawler.helpers import get_config
 
 
 class Scheduler(LoggableMixin):
     def __init__(self, *, tasks=None, daily_tasks=None,
-                 interval=settings.DEFAULT_UPDATE_PERIOD):
+                 interval=settings.DEFAULT_UPDATE_PERIOD, http_client=None):
         self.tasks = tasks or []  # List of grabbers
         # List of tasks to be executed on daily basis
         self.daily_tasks = daily_tasks or []
         self.default_interval = interval
+        self.http_client = http_client
         self.config = None
+        self.jobs = []
 
     def add_tasks(self, tasks: list):
         self.tasks.extend(tasks)
@@ -33,19 +37,62 @@ class Scheduler(LoggableMixin):
         self.config = await get_config()
 
     async def run_forever(self):
-        # todo: add exceptions handling within child processes
-        while True:
-            await self.update_config()
-
-            if self.working_time:
-                await self.run_tasks()
-                await self.run_extra()
-
-            asyncio.ensure_future(self.run_daily_tasks())
-            asyncio.ensure_future(self.send_healthcheck())
-            self.logger.info('Waiting %s seconds to make next update...' %
-                             self.update_interval)
-            await asyncio.sleep(self.update_interval)
+        """
+        Run each grabber on its own fixed-rate schedule so slow resources do
+        not delay the fast ones. Config reload, daily tasks and healthcheck
+        are run as a separate periodic job with global interval.
+        """
+        await self.update_config()
+        housekeeping = PeriodicTask(
+            task=self.housekeeping, name='housekeeping')
+        self.jobs = [PeriodicTask.for_grabber(task) for task in self.tasks]
+        self.jobs.append(housekeeping)
+
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        # Index breaks ties so jobs themselves are never compared
+        heap = [
+            (job.get_next_time(now, self.update_interval), index, job)
+            for index, job in enumerate(self.jobs)
+        ]
+        heapq.heapify(heap)
+        try:
+            while True:
+                run_at, index, job = heap[0]
+                delay = run_at - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+
+                heapq.heappop(heap)
+                if job is housekeeping or self.working_time:
+                    job.start(self.update_interval)
+
+                next_time = job.get_next_time(
+                    loop.time(), self.update_interval)
+                heapq.heappush(heap, (next_time, index, job))
+        finally:
+            for job in self.jobs:
+                if job.is_running:
+                    job.running.cancel()
+
+    async def housekeeping(self):
+        await self.update_config()
+        if self.working_time:
+            await self.run_extra()
+
+        asyncio.ensure_future(self.run_daily_tasks())
+        asyncio.ensure_future(self.send_healthcheck())
+
+    def stats(self):
+        """
+        Per job counters of runs, skipped/queued overlapping runs, failures
+        and runs cancelled on deadline.
+        """
+        return {
+            job.name: dict(job.counters, running=job.is_running)
+            for job in self.jobs
+        }
 
     async def run_tasks(self):
         """
@@ -76,11 +123,18 @@ class Scheduler(LoggableMixin):
             return
 
         self.logger.debug('Sending healthcheck...')
+        if self.http_client is not None:
+            return await self._send_healthcheck(
+                self.http_client.session, endpoint)
+
         async with aiohttp.ClientSession() as session:
-            async with session.get(endpoint) as resp:
-                if resp.status != HTTPStatus.OK:
-                    text = await resp.text()
-                    self.logger.error('Request failed %s', text)
+            return await self._send_healthcheck(session, endpoint)
+
+    async def _send_healthcheck(self, session, endpoint):
+        async with session.get(endpoint) as resp:
+            if resp.status != HTTPStatus.OK:
+                text = await resp.text()
+                self.logger.error('Request failed %s', text)
 
     @property
     def update_interval(self):
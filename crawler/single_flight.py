@@ -0,0 +1,94 @@
+"""
+Collapse identical concurrent requests into one upstream call.
+"""
+import time
+import asyncio
+import functools
+
+import settings
+
+
+class SingleFlight(object):
+    """
+    Callers running the same key while a call is in flight wait for its
+    result instead of making their own. Successful result is also reused
+    for `ttl` seconds after the call has finished.
+    """
+    def __init__(self, *, ttl=settings.SINGLE_FLIGHT_TTL):
+        self.ttl = ttl
+        self._calls = {}
+        self._results = {}
+        self.counters = {
+            'calls': 0,
+            'shared': 0,
+            'cached': 0,
+        }
+
+    def _get_result(self, key):
+        item = self._results.get(key)
+        if item is None:
+            return False, None
+
+        expires_at, result = item
+        if expires_at <= time.monotonic():
+            del self._results[key]
+            return False, None
+        return True, result
+
+    def _set_result(self, key, result):
+        if not self.ttl:
+            return
+
+        now = time.monotonic()
+        # Do not keep expired results of urls which are not requested anymore
+        expired = [k for k, (expires_at, _) in self._results.items()
+                   if expires_at <= now]
+        for k in expired:
+            del self._results[k]
+        self._results[key] = (now + self.ttl, result)
+
+    def forget(self, key):
+        self._results.pop(key, None)
+
+    async def run(self, key, fn, *args, **kwargs):
+        found, result = self._get_result(key)
+        if found:
+            self.counters['cached'] += 1
+            return result
+
+        call = self._calls.get(key)
+        if call is not None:
+            self.counters['shared'] += 1
+        else:
+            self.counters['calls'] += 1
+            # Upstream call does not belong to any of the callers, so
+            # cancelling the first one does not affect the others
+            call = _Call(asyncio.ensure_future(fn(*args, **kwargs)))
+            call.task.add_done_callback(
+                functools.partial(self._finish, key, call))
+            self._calls[key] = call
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Nobody is interested in the result anymore
+                call.task.cancel()
+
+    def _finish(self, key, call, task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+        if task.cancelled():
+            return
+        # Also marks exception as retrieved when nobody waits for it
+        if task.exception() is None:
+            self._set_result(key, task.result())
+
+
+class _Call(object):
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
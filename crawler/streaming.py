@@ -0,0 +1,101 @@
+"""
+Helpers to process response body while it is being downloaded.
+"""
+import re
+import json
+
+
+class ResponseTooLarge(RuntimeError):
+    pass
+
+
+class JsonItemsDecoder(object):
+    """
+    Incrementally decode items of a json array. Array is either the whole
+    document or a value of top-level object's `key` (e.g. `exchangeRate` of
+    privatbank archive).
+    """
+    WHITESPACE = ' \t\n\r'
+    TERMINATORS = WHITESPACE + ',]'
+
+    def __init__(self, key=None):
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+        if key is None:
+            self._start_re = re.compile(r'\s*\[')
+        else:
+            self._start_re = re.compile(
+                r'"{}"\s*:\s*\['.format(re.escape(key)))
+
+    def _find_start(self):
+        if self.key is None:
+            match = self._start_re.match(self._buffer)
+        else:
+            match = self._start_re.search(self._buffer)
+
+        if match is None:
+            if self.key is None and self._buffer.strip():
+                raise ValueError('Json document is not an array')
+            return False
+
+        self._pos = match.end()
+        self._started = True
+        return True
+
+    def _skip_separators(self):
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in self.WHITESPACE + ',':
+            pos += 1
+        self._pos = pos
+
+    def feed(self, text, final=False):
+        """
+        Add next piece of a document and return list of items completed
+        so far.
+        """
+        if self._done:
+            return []
+
+        self._buffer += text
+        if not self._started and not self._find_start():
+            return []
+
+        items = []
+        while True:
+            self._skip_separators()
+            if self._pos >= len(self._buffer):
+                break
+
+            if self._buffer[self._pos] == ']':
+                self._done = True
+                break
+
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                # Item is not complete yet
+                break
+
+            # Number at the very end may continue in the next piece
+            if not final and (end == len(self._buffer) or
+                              self._buffer[end] not in self.TERMINATORS):
+                break
+
+            items.append(item)
+            self._pos = end
+
+        # Drop already decoded part not to grow buffer infinitely
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        return items
+
+    def close(self):
+        items = self.feed('', final=True)
+        if not self._done:
+            raise ValueError('Json document ended unexpectedly')
+        return items
@@ -14,6 +14,8 @@ from webapp import (
     destroy_cache,
     init_pg,
     close_pg,
+    setup_parser_pool,
+    close_parser_pool,
 )
 from webapp.helpers import setup_flash
 
@@ -24,8 +26,10 @@ def run():
     app['logger'] = logger
     app.on_startup.append(setup_cache)
     app.on_startup.append(init_pg)
+    app.on_startup.append(setup_parser_pool)
     app.on_shutdown.append(destroy_cache)
     app.on_shutdown.append(close_pg)
+    app.on_cleanup.append(close_parser_pool)
 
     setup_session(app)
     setup_flash(app)
@@ -10,5 +10,9 @@ export PGPASSWORD="${PASSWORD}"
 
 _info "applying migrations"
 run_sql "005_add_events_table.sql"
+run_sql "006_create_rate_history.sql"
+run_sql "007_add_indexes.sql"
+run_sql "008_create_daily_stats.sql"
+run_sql "009_add_rate_history_latest_index.sql"
 
 _note "migrations has been successfully applied!"
@@ -10,6 +10,9 @@ DROP TABLE IF EXISTS "resource" CASCADE;
 DROP TABLE IF EXISTS "user" CASCADE;
 DROP TABLE IF EXISTS fund CASCADE;
 DROP TABLE IF EXISTS rate CASCADE;
+DROP TABLE IF EXISTS rate_history CASCADE;
 DROP TABLE IF EXISTS "event" CASCADE;
+DROP TABLE IF EXISTS bid_daily_stats CASCADE;
+DROP TABLE IF EXISTS event_daily_stats CASCADE;
 
 DROP ROLE IF EXISTS "che";
@@ -0,0 +1,11 @@
+-- Snapshots of rates appended by grabbers whenever rates change.
+-- Partitions are monthly and created by application on demand
+-- (see `crawler.models.rate.ensure_history_partition`), each one gets
+-- a BRIN index on time as rows are appended in time order.
+CREATE TABLE IF NOT EXISTS rate_history(
+  created       TIMESTAMP       NOT NULL    DEFAULT CURRENT_TIMESTAMP(2),
+  bank          VARCHAR         NOT NULL,
+  currency      VARCHAR         NOT NULL,
+  rate_buy      NUMERIC         NOT NULL,
+  rate_sale     NUMERIC         NOT NULL
+) PARTITION BY RANGE (created);
@@ -0,0 +1,39 @@
+-- Indexes matching predicates of queries in crawler/models.
+-- CONCURRENTLY does not lock tables for writes, so statements are run
+-- one by one outside of a transaction (psql -f does exactly that).
+SET SCHEMA 'public';
+
+
+-- Columns used by the code but missing in the initial schema
+ALTER TABLE bid ADD COLUMN IF NOT EXISTS status VARCHAR NOT NULL DEFAULT 'new';
+ALTER TABLE bid ADD COLUMN IF NOT EXISTS bid_type VARCHAR NOT NULL DEFAULT 'in';
+
+
+-- get_bids_for_period, get_daily_bids, keyset pagination on (created, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bid_created_id_idx
+  ON bid (created, id);
+
+-- get_closed_bids_for_period, get_daily_bids with statuses
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bid_status_created_idx
+  ON bid (status, created, id);
+
+-- get_bid_by_signature, get_stored_signatures
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bid_signature_idx
+  ON bid (phone, currency, bid_type, rate, amount)
+  WHERE in_use;
+
+-- get_transactions with statuses, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transaction_status_id_idx
+  ON "transaction" (status, id);
+
+-- get_events, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS event_created_id_idx
+  ON "event" (created, id);
+
+-- get_notifications_last_month
+CREATE INDEX CONCURRENTLY IF NOT EXISTS event_type_created_idx
+  ON "event" (event_type, created);
+
+-- get_rates, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rate_date_id_idx
+  ON rate (date, id);
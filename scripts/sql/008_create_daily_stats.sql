@@ -0,0 +1,113 @@
+-- Daily rollups read by dashboard charts (crawler/models/charts.py).
+-- Kept up to date by triggers on every change of bids and events.
+SET SCHEMA 'public';
+
+
+CREATE TABLE IF NOT EXISTS bid_daily_stats(
+  day           DATE            NOT NULL,
+  resource_id   INT             NOT NULL,
+  bid_type      VARCHAR         NOT NULL,
+  status        VARCHAR         NOT NULL,
+  bids          INT             NOT NULL    DEFAULT 0,
+  amount        NUMERIC         NOT NULL    DEFAULT 0,
+  -- sum of amount * rate
+  volume        NUMERIC         NOT NULL    DEFAULT 0,
+
+  PRIMARY KEY (day, resource_id, bid_type, status)
+);
+
+
+CREATE TABLE IF NOT EXISTS event_daily_stats(
+  day           DATE            NOT NULL,
+  event_type    event_type      NOT NULL,
+  event_count   INT             NOT NULL    DEFAULT 0,
+
+  PRIMARY KEY (day, event_type)
+);
+
+
+CREATE OR REPLACE FUNCTION update_bid_daily_stats() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE bid_daily_stats SET
+      bids = bids - 1,
+      amount = amount - OLD.amount,
+      volume = volume - OLD.amount * OLD.rate
+    WHERE day = OLD.created::date
+      AND resource_id = OLD.resource_id
+      AND bid_type = OLD.bid_type
+      AND status = OLD.status;
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO bid_daily_stats AS s
+      (day, resource_id, bid_type, status, bids, amount, volume)
+    VALUES
+      (NEW.created::date, NEW.resource_id, NEW.bid_type, NEW.status,
+       1, NEW.amount, NEW.amount * NEW.rate)
+    ON CONFLICT (day, resource_id, bid_type, status) DO UPDATE SET
+      bids = s.bids + 1,
+      amount = s.amount + EXCLUDED.amount,
+      volume = s.volume + EXCLUDED.volume;
+  END IF;
+
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION update_event_daily_stats() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE event_daily_stats SET
+      event_count = event_count - OLD.event_count
+    WHERE day = OLD.created::date
+      AND event_type = OLD.event_type;
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO event_daily_stats AS s (day, event_type, event_count)
+    VALUES (NEW.created::date, NEW.event_type, NEW.event_count)
+    ON CONFLICT (day, event_type) DO UPDATE SET
+      event_count = s.event_count + EXCLUDED.event_count;
+  END IF;
+
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- Backfill existing rows, tables are locked for writes not to miss any
+-- change between backfill and triggers creation
+BEGIN;
+LOCK TABLE bid, "event" IN SHARE MODE;
+
+DELETE FROM bid_daily_stats;
+INSERT INTO bid_daily_stats
+  (day, resource_id, bid_type, status, bids, amount, volume)
+SELECT created::date, resource_id, bid_type, status,
+       count(*), sum(amount), sum(amount * rate)
+FROM bid
+GROUP BY 1, 2, 3, 4;
+
+DELETE FROM event_daily_stats;
+INSERT INTO event_daily_stats (day, event_type, event_count)
+SELECT created::date, event_type, sum(event_count)
+FROM "event"
+GROUP BY 1, 2;
+
+DROP TRIGGER IF EXISTS bid_daily_stats_trigger ON bid;
+CREATE TRIGGER bid_daily_stats_trigger
+  AFTER INSERT OR DELETE
+  OR UPDATE OF created, resource_id, bid_type, status, amount, rate
+  ON bid
+  FOR EACH ROW EXECUTE PROCEDURE update_bid_daily_stats();
+
+DROP TRIGGER IF EXISTS event_daily_stats_trigger ON "event";
+CREATE TRIGGER event_daily_stats_trigger
+  AFTER INSERT OR DELETE
+  OR UPDATE OF created, event_type, event_count
+  ON "event"
+  FOR EACH ROW EXECUTE PROCEDURE update_event_daily_stats();
+
+COMMIT;
@@ -0,0 +1,21 @@
+-- Latest snapshot of a currency is looked up by bank and currency, see
+-- `crawler.models.rate.get_latest_snapshots`. New partitions get the index
+-- from `ensure_history_partition`, this one covers existing partitions.
+DO $$
+DECLARE
+  partition_name TEXT;
+BEGIN
+  FOR partition_name IN
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+    JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+    WHERE parent.relname = 'rate_history'
+  LOOP
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON %I (bank, currency, created DESC)',
+      partition_name || '_latest_idx', partition_name
+    );
+  END LOOP;
+END
+$$;
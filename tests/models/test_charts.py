@@ -17,3 +17,23 @@ async def test_get_profit_last_month(pg_engine):
 async def test_get_notify_events(pg_engine):
     async with pg_engine.acquire() as conn:
         res = await get_notifications_last_month(conn)
+
+
+@pytest.mark.run_loop
+async def test_notifications_rollup_follows_events(pg_engine):
+    from datetime import datetime
+
+    import settings
+    from crawler.models.event import add_event, EventType
+
+    day_key = datetime.now().strftime(settings.DEFAULT_DATE_FORMAT)
+
+    def get_called(data):
+        return sum(item['called'] for item in data if item['date'] == day_key)
+
+    async with pg_engine.acquire() as conn:
+        before = get_called(await get_notifications_last_month(conn))
+        await add_event(conn, event_type=EventType.CALLED, event_count=3)
+        after = get_called(await get_notifications_last_month(conn))
+
+    assert after == before + 3
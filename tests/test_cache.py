@@ -38,3 +38,167 @@ def test_serializing_attr_object():
     b = Bid(amount=5, currency='USD')
     result = json.dumps(b.__dict__)
     assert isinstance(result, str)
+
+
+@pytest.mark.parametrize('name', ['json', 'pickle'])
+def test_serializers_roundtrip(name):
+    from crawler.cache import get_serializer
+
+    serializer = get_serializer(name)
+    value = [{'ccy': 'USD', 'buy': '26.9', 'sale': 27.1}]
+    assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        Cache(serializer='yaml')
+
+
+def test_make_key():
+    cache = Cache(namespace='test')
+    key = cache.make_key('rates', 'privatbank', '01_12_18', 'USD')
+    assert key == 'test:rates:privatbank:01_12_18:USD'
+
+
+def test_privatbank_cache_items(resource):
+    from crawler.grabber.privatbank import PrivatbankGrabber
+
+    resource.name = 'privatbank'
+    grabber = PrivatbankGrabber(resource, cache=Cache(namespace='test'))
+    data = [{'ccy': 'USD', 'sale': '27'}, {'ccy': 'EUR', 'sale': '31'}]
+
+    items = grabber.get_cache_items(data, '01_12_18')
+    assert items == {
+        'test:rates:privatbank:01_12_18': data,
+        'test:rates:privatbank:01_12_18:USD': data[0],
+        'test:rates:privatbank:01_12_18:EUR': data[1],
+    }
+
+
+@pytest.mark.run_loop
+@pytest.mark.external
+async def test_mset_mget_with_ttl(cache):
+    keys = [cache.make_key('test', i) for i in range(3)]
+    await cache.mset({keys[0]: 0, keys[1]: {'a': 1}}, ttl=60)
+
+    assert await cache.mget(keys) == [0, {'a': 1}, None]
+    assert 0 < await cache._pool.ttl(keys[0]) <= 60
+    await cache.delete(*keys)
+
+
+@pytest.mark.run_loop
+@pytest.mark.external
+async def test_get_or_compute_once(cache):
+    import asyncio
+
+    key = cache.make_key('test', 'computed')
+    await cache.delete(key)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'value': 42}
+
+    results = await asyncio.gather(*[
+        cache.get_or_compute(key, compute, ttl=60) for _ in range(5)
+    ])
+    assert results == [{'value': 42}] * 5
+    assert len(calls) == 1
+    await cache.delete(key)
+
+
+@pytest.mark.run_loop
+@pytest.mark.external
+async def test_get_or_compute_remembers_none(cache):
+    key = cache.make_key('test', 'computed_none')
+    await cache.delete(key, f'{key}:none')
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return None
+
+    assert await cache.get_or_compute(key, compute, ttl=60) is None
+    assert await cache.get_or_compute(key, compute, ttl=60) is None
+    assert len(calls) == 1
+    await cache.delete(key, f'{key}:none')
+
+
+class _FakePool(object):
+    def __init__(self):
+        self.published = []
+
+    async def publish_json(self, channel, message):
+        self.published.append(message)
+
+
+class _FakeCache(object):
+    def __init__(self):
+        self.data = {}
+        self.reads = 0
+        self._pool = _FakePool()
+
+    def make_key(self, *parts):
+        return ':'.join(parts)
+
+    async def get(self, key):
+        self.reads += 1
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.reads += 1
+        return [self.data.get(key) for key in keys]
+
+    async def mset(self, mapping, *, ttl=None):
+        self.data.update(mapping)
+
+
+@pytest.mark.run_loop
+async def test_tiered_cache_serves_from_memory():
+    from crawler.cache import TieredCache
+
+    backend = _FakeCache()
+    backend.data = {'a': 1, 'b': 2}
+    cache = TieredCache(backend, maxsize=2)
+
+    assert await cache.get('a') == 1
+    assert await cache.get('a') == 1
+    assert backend.reads == 1
+
+    assert await cache.mget(['a', 'b', 'c']) == [1, 2, None]
+    assert backend.reads == 2
+
+    await cache.mset({'c': 3})
+    assert backend._pool.published[-1]['keys'] == ['c']
+    # Least recently used one is evicted
+    assert await cache.get('c') == 3
+    assert cache.stats() == {
+        'hits': 3, 'misses': 3, 'evictions': 1,
+        'expired': 0, 'invalidated': 0, 'size': 2,
+    }
+
+
+@pytest.mark.run_loop
+async def test_tiered_cache_invalidation():
+    from crawler.cache import TieredCache
+
+    backend = _FakeCache()
+    backend.data = {'a': 1}
+    cache = TieredCache(backend)
+    await cache.get('a')
+
+    # Own messages are ignored
+    cache.handle_invalidation({'sender': cache._sender_id, 'keys': ['a']})
+    assert cache.counters['invalidated'] == 0
+
+    backend.data['a'] = 10
+    cache.handle_invalidation({'sender': 'other', 'keys': ['a']})
+    assert await cache.get('a') == 10
+    assert cache.counters['invalidated'] == 1
+
+    cache.ttl = 0
+    cache.handle_invalidation({'sender': 'other', 'keys': ['a']})
+    await cache.get('a')
+    await cache.get('a')
+    assert cache.counters['expired'] == 1
@@ -1,11 +1,14 @@
+import asyncio
 from unittest import mock
 
+import attr
 import pytest
 
 from crawler.forms.config import config_trafaret
 from crawler.models.configs import insert_new_config
 from crawler.models.bid import (
     insert_new_bid,
+    insert_new_bids,
     get_daily_bids,
     get_bid_by_signature,
     get_bid_by_id,
@@ -76,6 +79,27 @@ async def test_insert_new_bids(pg_engine, resource):
             await insert_new_bid(conn, out_bid, resource=resource)
 
 
+@pytest.mark.run_loop
+async def test_insert_new_bids_skips_stored(pg_engine, resource):
+    new_bid = {
+        'rate': 26.2,
+        'amount': 200,
+        'currency': 'USD',
+        'phone': '+380981110022',
+        'bid_type': BidType.IN.value,
+    }
+
+    with mock.patch('crawler.models.bid.get_resource_by_name',
+                    _get_resource_by_name):
+        async with pg_engine.acquire() as conn:
+            result = await insert_new_bids(
+                conn, [new_bid, dict(new_bid)], resource=resource)
+            assert result == {'inserted': 1, 'skipped': 1}
+
+            result = await insert_new_bids(conn, [new_bid], resource=resource)
+            assert result == {'inserted': 0, 'skipped': 1}
+
+
 @pytest.mark.run_loop
 async def test_get_bid_by_signature(pg_engine):
     nonexisting_bid = {
@@ -150,3 +174,121 @@ async def test_engine_used_with_context_manager():
         assert engine.name == 'postgresql'
 
     assert engine.closed
+
+
+class _FakePool(object):
+    size = 1
+    freesize = 0
+    maxsize = 1
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+    async def acquire(self):
+        await self.lock.acquire()
+        return 'conn'
+
+    async def release(self, conn):
+        self.lock.release()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.run_loop
+async def test_metered_engine_stats():
+    from crawler.db import MeteredEngine
+
+    engine = MeteredEngine(_FakePool(), slow_acquire=0.01)
+
+    async def query():
+        async with engine.acquire() as conn:
+            assert conn == 'conn'
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(query(), query())
+
+    stats = engine.stats()
+    assert stats['acquired'] == 2
+    assert stats['in_use'] == 0
+    assert stats['max_in_use'] == 1
+    assert stats['slow_acquired'] == 1
+    assert stats['max_wait_time'] >= 0.01
+    assert stats['maxsize'] == 1
+    # Everything else is delegated to the engine
+    engine.close()
+    assert engine.closed is True
+
+
+def test_paginate_keyset_query():
+    from datetime import datetime
+
+    from sqlalchemy.dialects import postgresql
+
+    from crawler.models import paginate
+    from crawler.models.bid import bid, BID_PAGE_KEY
+
+    query = paginate(bid.select(), BID_PAGE_KEY,
+                     after=(datetime(2018, 12, 1), 42), limit=10)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert '(bid.created, bid.id) > (' in sql
+    assert 'ORDER BY bid.created ASC, bid.id ASC' in sql
+    assert 'LIMIT' in sql
+
+
+@pytest.mark.run_loop
+async def test_iter_pages():
+    from crawler.models import iter_pages
+
+    rows = [{'id': i} for i in range(7)]
+    calls = []
+
+    async def fetch(after, limit):
+        calls.append(after)
+        start = 0 if after is None else after[0] + 1
+        return rows[start:start + limit]
+
+    id_column = attr.make_class('Column', ['name'])('id')
+    result = [row async for row in iter_pages(fetch, (id_column,), page_size=3)]
+    assert result == rows
+    assert calls == [None, (2,), (5,)]
+
+
+def test_page_key_round_trip():
+    from datetime import datetime
+
+    from webapp.helpers import dump_page_key, load_page_key
+
+    key = (datetime(2018, 12, 1, 10, 30, 15, 120000), 42)
+    assert load_page_key(dump_page_key(key)) == key
+    assert load_page_key('') is None
+
+
+@pytest.mark.run_loop
+async def test_stream_rows(pg_engine):
+    from crawler.models import stream_rows
+    from crawler.models.bid import bid
+
+    query = bid.select().order_by(bid.c.id)
+    async with pg_engine.acquire() as conn:
+        result = await conn.execute(query)
+        expected = await result.fetchall()
+        rows = [row async for row in stream_rows(conn, query, chunk_size=2)]
+
+    assert [tuple(row) for row in rows] == [tuple(row) for row in expected]
+
+
+@pytest.mark.run_loop
+async def test_stream_rows_closed_early(pg_engine):
+    from crawler.models import stream_rows
+    from crawler.models.bid import bid
+
+    query = bid.select().order_by(bid.c.id)
+    async with pg_engine.acquire() as conn:
+        rows = stream_rows(conn, query, chunk_size=1)
+        async for _ in rows:
+            break
+        await rows.aclose()
+
+        assert not conn.in_transaction
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from crawler.driver import BaseDriver
+from crawler.driver.pool import BrowserPool
+
+
+class _FakeWebDriver(object):
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+class FakeDriver(BaseDriver):
+    created = 0
+
+    def __init__(self, *, proxy_uri=None):
+        super().__init__()
+        FakeDriver.created += 1
+        self._driver = _FakeWebDriver()
+
+
+@pytest.fixture
+def fake_driver_cls():
+    FakeDriver.created = 0
+    return FakeDriver
+
+
+@pytest.mark.run_loop
+async def test_driver_reused_and_recycled(fake_driver_cls):
+    pool = BrowserPool(driver_cls=fake_driver_cls, size=1, max_pages=2)
+
+    async with pool.lease() as first:
+        pass
+    async with pool.lease() as second:
+        pass
+
+    assert first is second
+    assert first.driver.closed is True
+
+    async with pool.lease() as third:
+        pass
+
+    assert third is not first
+    assert fake_driver_cls.created == 2
+    await pool.close()
+    assert third.driver.closed is True
+
+
+@pytest.mark.run_loop
+async def test_crashed_driver_recycled(fake_driver_cls):
+    pool = BrowserPool(driver_cls=fake_driver_cls, size=1)
+
+    with pytest.raises(WebDriverException):
+        async with pool.lease() as pooled:
+            raise WebDriverException('crash')
+
+    assert pooled.driver.closed is True
+    await pool.close()
+
+
+@pytest.mark.run_loop
+async def test_pool_size_is_bounded(fake_driver_cls):
+    pool = BrowserPool(driver_cls=fake_driver_cls, size=2)
+
+    async def use():
+        async with pool.lease():
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[use() for _ in range(6)])
+    assert fake_driver_cls.created == 2
+    await pool.close()
+
+
+@pytest.mark.run_loop
+async def test_cancelled_lease_driver_not_reused(fake_driver_cls):
+    pool = BrowserPool(driver_cls=fake_driver_cls, size=1)
+    started = threading.Event()
+    unblock = threading.Event()
+
+    def _get(driver):
+        started.set()
+        unblock.wait(5)
+
+    async def use():
+        async with pool.lease() as pooled:
+            await pool.run(_get, pooled.driver)
+
+    task = asyncio.ensure_future(use())
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+
+    task.cancel()
+    await asyncio.sleep(0.01)
+    # Call still runs on the driver, it cannot be back in the pool
+    assert not pool._idle
+
+    unblock.set()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert not pool._idle
+    assert fake_driver_cls.created == 1
+
+    async with pool.lease() as pooled:
+        assert pooled.driver.closed is False
+    assert fake_driver_cls.created == 2
+    await pool.close()
+
+
+@pytest.mark.run_loop
+async def test_cancelled_acquire_releases_slot(fake_driver_cls):
+    unblock = threading.Event()
+    created = []
+
+    class SlowDriver(fake_driver_cls):
+        def __init__(self, **kwargs):
+            unblock.wait(5)
+            super().__init__(**kwargs)
+            created.append(self)
+
+    pool = BrowserPool(driver_cls=SlowDriver, size=1)
+    task = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    unblock.set()
+    async with pool.lease() as pooled:
+        pass
+
+    assert len(created) == 2
+    # Driver started for the cancelled caller is not leaked
+    assert created[0].driver.closed is True
+    assert pooled.driver is created[1].driver
+    await pool.close()
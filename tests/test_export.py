@@ -0,0 +1,25 @@
+import csv
+import io
+from datetime import datetime
+
+from crawler.models.bid import bid
+from webapp.export import CSVRowsWriter
+
+
+def test_csv_rows_writer_flushes_chunks():
+    writer = CSVRowsWriter(bid.columns)
+    row = {column.name: None for column in bid.columns}
+    row.update(id=1, rate=26.9, created=datetime(2018, 12, 1, 10, 30),
+               in_use=True)
+
+    header = writer.flush()
+    assert writer.size == 0
+    writer.write(row)
+    assert writer.size > 0
+    data = header + writer.flush() + writer.close()
+
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert len(rows) == 1
+    assert rows[0]['rate'] == '26.9'
+    assert rows[0]['in_use'] == '1'
+    assert rows[0]['created'] == '10:30 01/12/18'
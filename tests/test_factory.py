@@ -22,3 +22,27 @@ async def test_create_daily_tasks():
 
     daily_tasks = await factory.create_daily()
     assert isinstance(daily_tasks, list)
+
+
+def test_shared_parser_pool():
+    from crawler.parser.pool import ParserPool
+
+    parser_pool = ParserPool()
+    factory = Factory(parser_pool=parser_pool)
+
+    assert factory.parser_pool is parser_pool
+    assert factory._own_parser_pool is False
+
+
+def test_proxy_pool_shared_between_resources():
+    from crawler.models.resource import Resource
+
+    pool = [{'ip': '10.0.0.1', 'port': 3128}, {'ip': '10.0.0.2'}]
+    factory = Factory()
+    first = factory.get_proxy_pool(Resource(
+        name='first', link='', proxy={'use': True, 'pool': pool}))
+    second = factory.get_proxy_pool(Resource(
+        name='second', link='', proxy={'use': True, 'pool': pool[::-1]}))
+
+    assert first is second
+    assert len(factory.proxy_pools) == 1
@@ -35,3 +35,265 @@ async def test_fetch_i_ua(simple_fetcher):
 
     # with open('f.html', 'w') as f:
     #     f.write(resp)
+
+
+@pytest.fixture
+def etag_server(loop):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    etag = '"v1"'
+
+    async def handler(request):
+        request.app['hits'] += 1
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304)
+        return web.json_response([{'ccy': 'USD'}], headers={'ETag': etag})
+
+    app = web.Application()
+    app['hits'] = 0
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    loop.run_until_complete(server.start_server(loop=loop))
+    yield server
+    loop.run_until_complete(server.close())
+
+
+@pytest.mark.run_loop
+async def test_conditional_request(etag_server):
+    from crawler.response_cache import MemoryResponseCache
+
+    fetcher = SimpleFetcher(None, response_cache=MemoryResponseCache())
+    url = str(etag_server.make_url('/'))
+
+    modified, body = await fetcher.request_if_modified(url, is_json=True)
+    assert modified is True
+    assert body == [{'ccy': 'USD'}]
+
+    modified, cached_body = await fetcher.request_if_modified(
+        url, is_json=True)
+    assert modified is False
+    assert cached_body == body
+    assert etag_server.app['hits'] == 2
+
+    await fetcher.close()
+
+
+class _SlowPageDriver(object):
+    def __init__(self, ready_after):
+        self.polls = 0
+        self.ready_after = ready_after
+
+    def find_elements_by_css_selector(self, selector):
+        self.polls += 1
+        return ['table'] if self.polls > self.ready_after else []
+
+
+def test_page_readiness_polling():
+    from crawler.models.configs import FetcherConfig
+
+    config = FetcherConfig(instance='browser', wait={'css': 'table'})
+    fetcher = BrowserFetcher(None, wait=config.wait)
+    fetcher.POLL_INTERVAL = 0.001
+
+    driver = _SlowPageDriver(ready_after=2)
+    assert fetcher._wait_ready(driver) is True
+    assert driver.polls == 3
+
+    config.wait.timeout = 0
+    assert fetcher._wait_ready(_SlowPageDriver(ready_after=10)) is False
+
+
+@pytest.fixture
+def rates_server(loop):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    rates = [{'currency': 'USD', 'saleRate': 28.1 + i} for i in range(100)]
+
+    async def handler(request):
+        return web.json_response({'bank': 'PB', 'exchangeRate': rates})
+
+    app = web.Application()
+    app['rates'] = rates
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    loop.run_until_complete(server.start_server(loop=loop))
+    yield server
+    loop.run_until_complete(server.close())
+
+
+def test_json_items_decoder_split_anywhere():
+    import json
+    from crawler.streaming import JsonItemsDecoder
+
+    items = [{'a': 'x]},'}, 12, [1, 2], 'text', None, 3.5]
+    document = json.dumps({'date': '01.12.2014', 'exchangeRate': items})
+    for split in range(len(document)):
+        decoder = JsonItemsDecoder(key='exchangeRate')
+        result = decoder.feed(document[:split])
+        result += decoder.feed(document[split:])
+        result += decoder.close()
+        assert result == items
+
+
+@pytest.mark.run_loop
+async def test_stream_json(rates_server):
+    fetcher = SimpleFetcher(None)
+    url = str(rates_server.make_url('/'))
+
+    items = [item async for item in fetcher.stream_json(
+        url, key='exchangeRate', chunk_size=64)]
+    assert items == rates_server.app['rates']
+
+    await fetcher.close()
+
+
+@pytest.mark.run_loop
+async def test_stream_max_size(rates_server):
+    from crawler.streaming import ResponseTooLarge
+
+    fetcher = SimpleFetcher(None)
+    url = str(rates_server.make_url('/'))
+
+    with pytest.raises(ResponseTooLarge):
+        async for _ in fetcher.stream(url, chunk_size=64, max_size=256):
+            pass
+
+    await fetcher.close()
+
+
+@pytest.mark.run_loop
+async def test_browser_fetcher_follows_sticky_proxy():
+    from selenium.common.exceptions import WebDriverException
+    from crawler.proxy import ProxyPool
+
+    proxies = [Proxy(ip='10.0.0.1', port=3128), Proxy(ip='10.0.0.2')]
+    proxy_pool = ProxyPool(proxies, check_interval=0)
+    first, second = proxies
+    proxy_pool.report(second, latency=2)
+
+    class _Lease(object):
+        def __init__(self, pool):
+            self.pool = pool
+
+        async def __aenter__(self):
+            return self.pool
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+    class _FakePool(object):
+        def __init__(self, proxy):
+            self.proxy = proxy
+            self.driver = proxy
+
+        def lease(self):
+            return _Lease(self)
+
+        async def run(self, fn, *args):
+            return fn(*args)
+
+    pools = {}
+
+    def get_browser_pool(driver_cls, proxy):
+        return pools.setdefault(proxy.uri, _FakePool(proxy))
+
+    proxy = proxy_pool.sticky('sky_bet')
+    fetcher = BrowserFetcher(
+        None,
+        proxy=proxy,
+        browser_pool=get_browser_pool(None, proxy),
+        proxy_pool=proxy_pool,
+        proxy_key='sky_bet',
+        get_browser_pool=get_browser_pool,
+    )
+
+    def _get(driver, url, wait=0):
+        if driver is first:
+            raise WebDriverException('proxy is down')
+        return 'page'
+
+    fetcher._get = _get
+    while proxy_pool.is_healthy(first):
+        with pytest.raises(WebDriverException):
+            await fetcher.request('http://example.com')
+
+    assert await fetcher.request('http://example.com') == 'page'
+    assert fetcher.proxy is second
+    assert fetcher.pool is pools[second.uri]
+    assert proxy_pool.stats[second.uri].successes == 2
+    assert proxy_pool.stats[first.uri].failures >= 1
+
+
+class _ActionsDriver(_SlowPageDriver):
+    def __init__(self, ready_after, navigate=False):
+        super().__init__(ready_after)
+        self.current_url = 'http://example.com'
+        self.navigate = navigate
+
+    def find_element_by_xpath(self, xpath):
+        driver = self
+
+        class _Elem(object):
+            def click(self):
+                if driver.navigate:
+                    driver.current_url = 'http://example.com/all'
+                    driver.polls = 0
+
+        return _Elem()
+
+
+def test_actions_wait_only_when_page_is_not_ready():
+    from crawler.models.configs import FetcherConfig
+
+    config = FetcherConfig(instance='browser', wait={'css': 'table'})
+    fetcher = BrowserFetcher(None, wait=config.wait)
+    fetcher.POLL_INTERVAL = 0.001
+
+    # Page is still ready after expanding elements, checked once
+    driver = _ActionsDriver(ready_after=0)
+    fetcher._do_actions(driver, state={})
+    assert driver.polls == 1
+
+    # Navigation requires waiting for the new page
+    driver = _ActionsDriver(ready_after=2, navigate=True)
+    fetcher._do_actions(driver, state={})
+    assert driver.polls == 3
+
+
+@pytest.fixture
+def chunked_server(loop):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request):
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b'x' * 100)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    loop.run_until_complete(server.start_server(loop=loop))
+    yield server
+    loop.run_until_complete(server.close())
+
+
+@pytest.mark.run_loop
+async def test_request_max_size_without_content_length(chunked_server):
+    from crawler.streaming import ResponseTooLarge
+
+    fetcher = SimpleFetcher(None)
+    url = str(chunked_server.make_url('/'))
+    assert await fetcher.request(url) == 'x' * 1000
+
+    fetcher.max_size = 256
+    with pytest.raises(ResponseTooLarge):
+        await fetcher.request(url)
+
+    await fetcher.close()
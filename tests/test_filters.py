@@ -1,6 +1,11 @@
 import operator
 import collections
-from crawler.filters import Filter, Container
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from crawler.filters import Filter, Container, QueryContainer, is_in
+from crawler.models.bid import bid
 
 
 def test_filter():
@@ -31,3 +36,130 @@ def test_filters_chain():
 
     assert isinstance(result, collections.Sequence)
     assert len(result) == 1
+
+
+def test_filters_combinators():
+    data = [{'a': i, 'b': i % 3} for i in range(10)]
+    predicate = (Filter('a', operator.ge, 5) & ~Filter('b', operator.eq, 0)) | \
+        Filter('a', operator.eq, 0)
+
+    result = Container(data) >> predicate
+    assert [e['a'] for e in result] == [0, 5, 7, 8]
+    assert predicate({'a': 7, 'b': 1})
+
+
+def test_filters_chain_is_fused():
+    from crawler.filters import And
+
+    container = Container([{'a': 1}, {'a': 5}]) >> \
+        Filter('a', operator.gt, 0) >> Filter('a', operator.lt, 3)
+    assert isinstance(container.predicate, And)
+    assert len(container.predicate.filters) == 2
+    assert container.data == [{'a': 1}]
+
+
+def test_filters_chain_after_mutation():
+    data = [{'a': i} for i in range(10)]
+    result = Container(data) >> Filter('a', operator.ge, 5)
+    assert len(result) == 5
+
+    result.append({'a': 20})
+    result.extend([{'a': 30}, {'a': 1}])
+    chained = result >> Filter('a', operator.lt, 25)
+    assert [elem['a'] for elem in chained] == [5, 6, 7, 8, 9, 20, 1]
+
+
+def test_filters_columnar(monkeypatch):
+    import settings
+
+    data = [{'a': i, 'b': float(i % 7)} for i in range(1000)]
+    predicate = (Filter('a', operator.gt, 100) & Filter('b', operator.le, 3)) \
+        | ~Filter('a', operator.ne, 7)
+    expected = (Container(data) >> predicate).data
+
+    monkeypatch.setattr(settings, 'FILTER_COLUMNAR_MIN_SIZE', 1)
+    assert (Container(data) >> predicate).data == expected
+    # Values which do not fit into typed columns are filtered by rows
+    data.append({'a': None, 'b': 1.0})
+    result = Container(data) >> Filter('a', operator.eq, None)
+    assert result.data == [data[-1]]
+
+
+def test_filter_objects_and_missing_props():
+    Item = collections.namedtuple('Item', 'a')
+    container = Container([Item(1), Item(5), {'a': 7}])
+    assert len(container >> Filter('a', operator.gt, 2)) == 2
+
+    with pytest.raises(ValueError):
+        len(Container([{'b': 1}]) >> Filter('a', operator.gt, 2))
+
+
+def _render(query):
+    compiled = query.compile(dialect=postgresql.dialect(),
+                             compile_kwargs={'literal_binds': True})
+    return str(compiled)
+
+
+def test_filter_is_in(monkeypatch):
+    data = [{'a': i, 'b': i % 3} for i in range(10)]
+    predicate = Filter('b', is_in, {0, 2}) & Filter('a', operator.gt, 2)
+    expected = [elem for elem in data if elem['b'] != 1 and elem['a'] > 2]
+    assert list(Container(data) >> predicate) == expected
+
+    monkeypatch.setattr('settings.FILTER_COLUMNAR_MIN_SIZE', 1)
+    assert list(Container(data) >> predicate) == expected
+
+
+def test_filters_pushed_down_to_query():
+    bids = Container.from_query(bid.select()) >> \
+        Filter('amount', operator.ge, 100) >> \
+        Filter('status', is_in, ['new', 'called']) >> \
+        (Filter('rate', operator.lt, 27) | ~Filter('bid_type', operator.eq,
+                                                   'in'))
+    assert isinstance(bids, QueryContainer)
+
+    query, residual = bids.compile()
+    assert residual is None
+    sql = _render(query)
+    assert 'bid.amount >= 100' in sql
+    assert "bid.status IN ('new', 'called')" in sql
+    assert "bid.rate < 27 OR bid.bid_type != 'in'" in sql
+
+
+def test_filters_residual_evaluated_in_memory():
+    def endswith(value, suffix):
+        return value.endswith(suffix)
+
+    phone_filter = Filter('phone', endswith, '42')
+    bids = Container.from_query(bid.select()) >> \
+        Filter('amount', operator.ge, 100) >> \
+        phone_filter >> \
+        Filter('unknown', operator.eq, 1)
+
+    query, residual = bids.compile()
+    assert 'bid.amount >= 100' in _render(query)
+    assert residual.filters == [phone_filter, bids.predicate.filters[-1]]
+    with pytest.raises(ValueError):
+        bids.paginate([bid.c.id])
+
+    # Disjunction is translated as a whole or not at all
+    bids = Container.from_query(bid.select()) >> \
+        (Filter('amount', operator.ge, 100) | phone_filter)
+    query, residual = bids.compile()
+    assert 'WHERE' not in _render(query)
+    assert residual is bids.predicate
+
+
+def test_filters_apply_to_limited_query():
+    query = bid.select().order_by(bid.c.id)
+    bids = Container.from_query(query, limit=10)
+    assert 'LIMIT 10' in _render(bids.compile()[0])
+
+    bids >>= Filter('amount', operator.ge, 100)
+    sql = _render(bids.compile()[0])
+    assert sql.index('LIMIT 10') < sql.index('amount >= 100')
+
+    page = (Container.from_query(bid.select()) >>
+            Filter('amount', operator.ge, 100)).paginate([bid.c.id], limit=5)
+    sql = _render(page.compile()[0])
+    assert sql.index('amount >= 100') < sql.index('LIMIT 5')
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from crawler.grabber.dummy import DummyGrabber
@@ -33,3 +35,114 @@ async def test_await_grabber():
 
     result = await grabber
     assert result is None
+
+
+class _RatesGrabber(DummyGrabber):
+    async def get_rates(self):
+        return []
+
+
+@pytest.mark.run_loop
+async def test_fan_out_keeps_order_and_isolates_errors(resource):
+    resource.concurrency = 2
+    grabber = _RatesGrabber(resource)
+    running = 0
+    max_running = 0
+
+    async def fetch(i):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01 * (5 - i))
+        running -= 1
+        if i == 3:
+            raise RuntimeError('Incorrect response: 500')
+        return i
+
+    results = await grabber.fan_out(fetch(i) for i in range(5))
+
+    assert results[:3] == [0, 1, 2]
+    assert isinstance(results[3], RuntimeError)
+    assert results[4] == 4
+    assert max_running == 2
+
+
+def test_changed_rate_snapshots(resource):
+    from crawler.grabber.privatbank import PrivatbankGrabber
+
+    grabber = PrivatbankGrabber(resource)
+    data = [
+        {'ccy': 'USD', 'buy': '26.90', 'sale': '27.15'},
+        {'ccy': 'EUR', 'buy': '30.50', 'sale': '31.00'},
+    ]
+    assert len(grabber.get_changed_snapshots(data)) == 2
+
+    grabber._last_snapshots = {
+        'USD': {'currency': 'USD', 'rate_buy': 26.9, 'rate_sale': 27.15},
+        'EUR': {'currency': 'EUR', 'rate_buy': 30.4, 'rate_sale': 31.0},
+    }
+    assert grabber.get_changed_snapshots(data) == [
+        {'currency': 'EUR', 'rate_buy': 30.5, 'rate_sale': 31.0},
+    ]
+
+
+@pytest.mark.run_loop
+async def test_store_history_only_changed(pg_engine, resource):
+    from datetime import datetime, timedelta
+
+    from crawler.grabber.privatbank import PrivatbankGrabber
+    from crawler.models.rate import get_rate_history
+
+    resource.name = 'test_history_bank'
+    started = datetime.now() - timedelta(seconds=1)
+    data = [{'ccy': 'USD', 'buy': '26.90', 'sale': '27.15'}]
+    grabber = PrivatbankGrabber(resource, engine=pg_engine)
+    await grabber.store_history(data)
+    # Fresh grabber knows nothing about stored values
+    grabber = PrivatbankGrabber(resource, engine=pg_engine)
+    assert await grabber.store_history(data) == []
+
+    async with pg_engine.acquire() as conn:
+        history = await get_rate_history(
+            conn, bank=resource.name, currency='USD', start=started)
+    assert history['rate_sale'].tolist() == [27.15]
+    assert history['created'].dtype.kind == 'M'
+
+
+@pytest.mark.run_loop
+async def test_partial_rates_cached_shortly(resource):
+    import settings
+    from crawler.grabber.privatbank import PrivatbankGrabber
+    from crawler.models.configs import URLConfig
+
+    class _Fetcher(object):
+        async def request_if_modified(self, url, is_json):
+            if url == 'eur':
+                raise RuntimeError('Incorrect response: 500')
+            return True, [{'ccy': 'USD', 'buy': '26.90', 'sale': '27.15'}]
+
+    class _Cache(object):
+        def __init__(self):
+            self.ttls = []
+
+        def make_key(self, *parts):
+            return ':'.join(parts)
+
+        async def mset(self, mapping, *, ttl=None):
+            self.ttls.append(ttl)
+
+    resource.urls = [
+        URLConfig(currency='USD', url='usd'),
+        URLConfig(currency='EUR', url='eur'),
+    ]
+    cache = _Cache()
+    grabber = PrivatbankGrabber(resource, fetcher=_Fetcher(), cache=cache)
+
+    await grabber.update()
+    assert grabber.complete is False
+    assert cache.ttls == [settings.PARTIAL_RATES_CACHE_TTL]
+
+    # Same rates are written for the whole day once all the requests succeed
+    resource.urls = resource.urls[:1]
+    await grabber.update()
+    assert cache.ttls[-1] == settings.RATES_CACHE_TTL
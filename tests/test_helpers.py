@@ -12,3 +12,80 @@ async def test_load_config(pg_engine):
     assert hasattr(config, 'MIN_BID_AMOUNT')
     assert hasattr(config, 'MAX_BID_AMOUNT')
     assert isinstance(config.MAX_BID_AMOUNT, float)
+
+
+@pytest.mark.run_loop
+async def test_config_service_caches_config():
+    from unittest import mock
+    from crawler.helpers import ConfigService, Config
+
+    service = ConfigService(ttl=60)
+    loaded = Config(MIN_BID_AMOUNT=100)
+    load_mock = mock.Mock()
+
+    async def load_config_mock(conn):
+        load_mock(conn)
+        return loaded
+
+    with mock.patch('crawler.helpers.load_config', load_config_mock):
+        assert await service.get(conn='conn') is loaded
+        assert await service.get(conn='conn') is loaded
+        assert load_mock.call_count == 1
+
+        service.invalidate()
+        await service.get(conn='conn')
+        assert load_mock.call_count == 2
+
+        service.ttl = 0
+        await service.get(conn='conn')
+        assert load_mock.call_count == 3
+
+
+@pytest.mark.run_loop
+async def test_config_service_listens_outside_pool():
+    import asyncio
+    from unittest import mock
+    from crawler.helpers import ConfigService, Config
+    from crawler.models.configs import CONFIG_CHANNEL
+
+    class FakeCursor(object):
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        async def execute(self, query):
+            conn.queries.append(query)
+
+    class FakeConnection(object):
+        def __init__(self):
+            self.queries = []
+            self.notifies = asyncio.Queue()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        def cursor(self):
+            return FakeCursor()
+
+    conn = FakeConnection()
+    engine = mock.Mock()
+    service = ConfigService(ttl=60)
+    service.set(Config())
+
+    with mock.patch('crawler.helpers.aiopg.connect') as connect_mock:
+        connect_mock.return_value = conn
+        service.start_listening(engine, dsn='dsn')
+        await asyncio.sleep(0)
+        conn.notifies.put_nowait('changed')
+        await asyncio.sleep(0)
+        await service.stop_listening()
+
+    connect_mock.assert_called_once_with('dsn')
+    assert conn.queries == [f'LISTEN {CONFIG_CHANNEL}']
+    assert not service.is_valid
+    assert not engine.acquire.called
@@ -0,0 +1,136 @@
+import csv
+from datetime import date
+
+import pytest
+
+import settings
+from crawler.fetcher.simple import SimpleFetcher
+from crawler.history import HistoryDownloader, Checkpoint, CSVWriter
+from crawler.retry import RetryPolicy
+
+
+@pytest.fixture
+def archive_server(loop):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request):
+        request.app['hits'] += 1
+        # Throttle every third request
+        if request.app['hits'] % 3 == 0:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+
+        return web.json_response({
+            'date': request.query['date'],
+            'exchangeRate': [
+                {'currency': 'USD', 'saleRateNB': 27.1,
+                 'purchaseRate': 27, 'saleRate': 27.3},
+                {'currency': 'EUR', 'saleRateNB': 30.2},
+            ],
+        })
+
+    app = web.Application()
+    app['hits'] = 0
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    loop.run_until_complete(server.start_server(loop=loop))
+    yield server
+    loop.run_until_complete(server.close())
+
+
+@pytest.mark.run_loop
+async def test_download_history_resumes(archive_server, tmpdir, monkeypatch):
+    url = str(archive_server.make_url('/')) + '?date={date}'
+    monkeypatch.setattr(settings, 'HISTORY_URL_TEMPLATE', url)
+
+    fetcher = SimpleFetcher(None)
+    writer = CSVWriter(data_dir=tmpdir)
+    checkpoint_path = tmpdir / 'checkpoint'
+
+    def make_downloader():
+        return HistoryDownloader(
+            fetcher, writer,
+            checkpoint=Checkpoint(checkpoint_path).load(),
+            concurrency=4,
+            retry_policy=RetryPolicy(attempts=5, base_delay=0),
+        )
+
+    stats = await make_downloader().run(date(2015, 1, 1), date(2015, 1, 10))
+    assert stats['downloaded'] == 10
+    assert stats['missing'] == 10
+    assert not stats['failed']
+
+    hits = archive_server.app['hits']
+    stats = await make_downloader().run(date(2015, 1, 1), date(2015, 1, 12))
+    assert stats['skipped'] == 10
+    assert stats['downloaded'] == 2
+    assert archive_server.app['hits'] - hits >= 2
+
+    with open(writer.get_filename('USD', 2015)) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 12
+    assert rows[0]['sale'] == '27.3'
+
+    await fetcher.close()
+
+
+def test_partition_bounds():
+    from datetime import datetime
+
+    from crawler.models.rate import get_partition_bounds
+
+    assert get_partition_bounds(datetime(2018, 12, 31, 23, 59)) == (
+        datetime(2018, 12, 1), datetime(2019, 1, 1))
+    assert get_partition_bounds(date(2018, 3, 15)) == (
+        datetime(2018, 3, 1), datetime(2018, 4, 1))
+
+
+@pytest.mark.run_loop
+async def test_rate_history_day_rewritten(pg_engine):
+    from datetime import datetime
+
+    from crawler.history import RateHistoryWriter
+    from crawler.models.rate import get_rate_history
+
+    day = date(2015, 2, 1)
+    rows = [{
+        'date': datetime(2015, 2, 1),
+        'bank': 'test_archive_bank',
+        'currency': 'USD',
+        'rate_buy': 27,
+        'rate_sale': 27.3,
+    }]
+    writer = RateHistoryWriter(pg_engine, bank='test_archive_bank',
+                               currencies=['USD'])
+    # Second write repeats a day lost by checkpoint
+    await writer.write(day, rows)
+    await writer.write(day, rows)
+
+    async with pg_engine.acquire() as conn:
+        history = await get_rate_history(
+            conn, bank='test_archive_bank', currency='USD',
+            start=datetime(2015, 2, 1))
+    assert history['rate_sale'].tolist() == [27.3]
+
+
+@pytest.mark.run_loop
+async def test_latest_snapshots_query_is_bounded():
+    from sqlalchemy.dialects import postgresql
+
+    from crawler.models.rate import get_latest_snapshots
+
+    class _Result(object):
+        async def fetchall(self):
+            return []
+
+    class _Conn(object):
+        async def execute(self, query):
+            self.sql = str(query.compile(dialect=postgresql.dialect()))
+            return _Result()
+
+    conn = _Conn()
+    assert await get_latest_snapshots(
+        conn, bank='privatbank', currencies=['USD', 'EUR']) == {}
+    assert conn.sql.count('LIMIT') == 2
+    assert 'UNION ALL' in conn.sql
+    assert await get_latest_snapshots(conn, bank='pb', currencies=[]) == {}
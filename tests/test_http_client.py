@@ -0,0 +1,28 @@
+import pytest
+
+from crawler.http_client import HttpClient
+from crawler.fetcher.simple import SimpleFetcher
+
+
+@pytest.mark.run_loop
+async def test_session_is_shared():
+    client = HttpClient(limit_per_host=2)
+    session = client.session
+    assert client.session is session
+    assert session.connector.limit_per_host == 2
+
+    await client.close()
+    assert client.closed
+
+
+@pytest.mark.run_loop
+async def test_fetcher_does_not_close_shared_session():
+    client = HttpClient()
+    fetcher1 = SimpleFetcher(None, http_client=client)
+    fetcher2 = SimpleFetcher(None, http_client=client)
+    assert fetcher1.session is fetcher2.session
+
+    await fetcher1.close()
+    assert not client.closed
+
+    await client.close()
@@ -1,7 +1,117 @@
+import pytest
+
 from crawler.parser.i_ua import IUaParser
+from crawler.parser.paddy_power import PaddyPowerParser
+from crawler.parser.william_hill import WilliamHillParser
 
 
 def test_i_ua_parser(page_html):
     html = page_html('i_ua')
     parser = IUaParser()
     data = parser.parse(html=html)
+
+
+WILLIAM_HILL_HTML = '''
+<html><body>
+<ui-scoreboard-runner class="ui-scoreboard-runner__home">
+  Arsenal
+</ui-scoreboard-runner><!---->
+<ui-scoreboard-runner class="ui-scoreboard-runner__home">
+  Chelsea
+</ui-scoreboard-runner>
+<avb-item><btn-odds class="avb-item__btn-odds"> 5/2 </btn-odds></avb-item>
+<avb-item><btn-odds class="avb-item__btn-odds">EVS</btn-odds></avb-item>
+</body></html>
+'''
+
+
+@pytest.mark.parametrize('parser_cls,page_name', [
+    (IUaParser, 'i_ua'),
+    (PaddyPowerParser, 'paddy_power'),
+    (WilliamHillParser, None),
+])
+def test_lxml_engine_parity(parser_cls, page_name, page_html):
+    html = page_html(page_name) if page_name else WILLIAM_HILL_HTML
+    expected = parser_cls().parse(html)
+    assert expected
+    assert parser_cls.with_engine('lxml').parse(html) == expected
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        IUaParser.with_engine('html')
+
+
+@pytest.mark.run_loop
+async def test_parser_pool(page_html):
+    from crawler.parser.pool import ParserPool
+
+    html = page_html('i_ua')
+    parser = IUaParser.with_engine('lxml')
+    pool = ParserPool(workers=1, min_size=1000)
+    try:
+        assert await pool.parse(parser, html) == parser.parse(html)
+        # Errors of workers are propagated, small pages are parsed inline
+        with pytest.raises(ValueError):
+            await pool.parse(parser, '<html></html>')
+    finally:
+        await pool.close()
+
+    assert pool.stats() == {'inline': 1, 'offloaded': 1}
+
+
+def test_stream_engine_parity(page_html):
+    html = page_html('i_ua')
+    expected = IUaParser().parse(html)
+    assert IUaParser.with_engine('stream').parse(html) == expected
+
+
+async def _chunks(text, size=1024):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+@pytest.mark.run_loop
+async def test_iter_bids_skips_known_rows(page_html):
+    html = page_html('i_ua')
+    expected = IUaParser().parse(html)
+    parser = IUaParser.with_engine('stream')
+
+    bids = [bid async for bid in parser.iter_bids(_chunks(html), key='in')]
+    assert bids == expected
+
+    # Two new bids on top of the same page
+    first_row = html.index('<tr', html.index('<tbody>'))
+    new_rows = (
+        '<tr><td></td><td>26.11</td><td>500 $</td>'
+        '<td>+380 67 <span class="a" '
+        'onclick="showPhone(this, \'MTIzNDU2Nw==\')"></span></td></tr>'
+        '<tr><td></td><td>26.12</td><td>700 $</td>'
+        '<td>+380 67 <span class="a" '
+        'onclick="showPhone(this, \'NzY1NDMyMQ==\')"></span></td></tr>'
+    )
+    html = html[:first_row] + new_rows + html[first_row:]
+
+    bids = [bid async for bid in parser.iter_bids(_chunks(html), key='in')]
+    assert bids == [
+        {'rate': 26.11, 'amount': 500.0, 'phone': '+380671234567',
+         'currency': 'USD'},
+        {'rate': 26.12, 'amount': 700.0, 'phone': '+380677654321',
+         'currency': 'USD'},
+    ]
+    # Other pages are tracked separately
+    bids = [bid async for bid in parser.iter_bids(_chunks(html), key='out')]
+    assert len(bids) == len(expected) + 2
+
+    # New bid below known ones when site changes order of rows
+    last_row = html.index('</tbody>', html.index('<tbody>'))
+    html = html[:last_row] + (
+        '<tr><td></td><td>26.13</td><td>900 $</td>'
+        '<td>+380 67 <span class="a" '
+        'onclick="showPhone(this, \'MTExMTExMQ==\')"></span></td></tr>'
+    ) + html[last_row:]
+    bids = [bid async for bid in parser.iter_bids(_chunks(html), key='in')]
+    assert bids == [
+        {'rate': 26.13, 'amount': 900.0, 'phone': '+380671111111',
+         'currency': 'USD'},
+    ]
@@ -3,7 +3,7 @@ from http import HTTPStatus
 import pytest
 
 from crawler.fetcher.simple import SimpleFetcher
-from crawler.proxy import Proxy
+from crawler.proxy import Proxy, ProxyPool
 
 
 @pytest.fixture
@@ -32,3 +32,57 @@ async def test_response_with_proxy(fetcher):
     resp = await fetcher.request(url)
     assert isinstance(resp, str)
     assert 'Sky Bet' in resp
+
+
+@pytest.fixture
+def proxy_pool():
+    proxies = [
+        Proxy(ip='10.0.0.1', port=3128),
+        Proxy(ip='10.0.0.2', port=3128),
+        Proxy(ip='10.0.0.3', port=3128),
+    ]
+    return ProxyPool(proxies, check_interval=0)
+
+
+def test_best_proxy_selected(proxy_pool):
+    slow, fast, failing = proxy_pool.proxies
+    proxy_pool.report(slow, latency=2)
+    proxy_pool.report(fast, latency=0.2)
+    proxy_pool.report(failing, latency=0.1)
+    proxy_pool.report(failing, error=True)
+    proxy_pool.report(failing, error=True)
+
+    assert proxy_pool.get() is fast
+
+
+def test_sticky_proxy_replaced_when_unhealthy(proxy_pool):
+    proxy = proxy_pool.sticky('sky_bet')
+    assert proxy_pool.sticky('sky_bet') is proxy
+
+    for _ in range(3):
+        proxy_pool.report(proxy, error=True)
+
+    assert not proxy_pool.is_healthy(proxy)
+    assert proxy_pool.sticky('sky_bet') is not proxy
+
+
+@pytest.mark.run_loop
+async def test_health_check_continues_after_error(proxy_pool):
+    import asyncio
+
+    calls = []
+
+    async def check_all():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('unexpected')
+
+    proxy_pool.http_client = object()
+    proxy_pool.check_interval = 0.001
+    proxy_pool.check_all = check_all
+    proxy_pool._check_task = asyncio.ensure_future(proxy_pool._check_forever())
+    await asyncio.sleep(0.05)
+
+    assert not proxy_pool._check_task.done()
+    assert len(calls) > 1
+    await proxy_pool.close()
@@ -0,0 +1,126 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from crawler.retry import (
+    RetryPolicy,
+    ResponseError,
+    CircuitOpenError,
+    CircuitBreaker,
+    get_host,
+    parse_retry_after,
+)
+
+
+URL = 'https://api.privatbank.ua/p24api/pubinfo'
+
+
+def _flaky(failures, status=HTTPStatus.SERVICE_UNAVAILABLE, retry_after=None):
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ResponseError(status, retry_after=retry_after)
+        return 'ok'
+
+    return request, calls
+
+
+@pytest.mark.run_loop
+async def test_retry_until_success():
+    policy = RetryPolicy(attempts=3, base_delay=0.001)
+    request, calls = _flaky(failures=2)
+
+    result = await policy.run(URL, request)
+
+    assert result == 'ok'
+    assert len(calls) == 3
+    stats = policy.stats()['api.privatbank.ua']
+    assert stats['retries'] == 2
+    assert stats['state'] == CircuitBreaker.CLOSED
+
+
+@pytest.mark.run_loop
+async def test_client_errors_are_not_retried():
+    policy = RetryPolicy(attempts=3, base_delay=0.001)
+    request, calls = _flaky(failures=1, status=HTTPStatus.NOT_FOUND)
+
+    with pytest.raises(ResponseError):
+        await policy.run(URL, request)
+    assert len(calls) == 1
+
+
+@pytest.mark.run_loop
+async def test_circuit_opens_for_dead_host():
+    policy = RetryPolicy(attempts=2, base_delay=0.001,
+                         failure_threshold=2, reset_timeout=60)
+    request, calls = _flaky(failures=10)
+
+    with pytest.raises(ResponseError):
+        await policy.run(URL, request)
+
+    with pytest.raises(CircuitOpenError):
+        await policy.run(URL, request)
+    assert len(calls) == 2
+    assert policy.stats()['api.privatbank.ua']['rejected'] == 1
+
+
+def test_circuit_half_open_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert [breaker.allow(), breaker.allow()] == [True, False]
+    assert breaker.stats()['rejected'] == 1
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert [breaker.allow(), breaker.allow()] == [True, True]
+
+
+@pytest.mark.run_loop
+async def test_cancelled_trial_does_not_block_circuit():
+    policy = RetryPolicy(attempts=1, failure_threshold=1, reset_timeout=0)
+    breaker = policy.get_breaker(get_host(URL))
+    breaker.record_failure()
+
+    async def hanging():
+        await asyncio.sleep(1)
+
+    trial = asyncio.ensure_future(policy.run(URL, hanging))
+    await asyncio.sleep(0)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.trial_pending is False
+
+    async def request():
+        return 'ok'
+
+    assert await policy.run(URL, request) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_after_respected():
+    policy = RetryPolicy(max_delay=30)
+    exc = ResponseError(HTTPStatus.TOO_MANY_REQUESTS,
+                        retry_after=parse_retry_after('12'))
+    assert policy.get_delay(0, exc) == 12
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('garbage') is None
@@ -77,3 +77,89 @@ async def test_run_task_exceptions(resource, caplog):
     for record in caplog.records:
         print(record)
     print('asdf')
+
+
+class _SlowTask(object):
+    def __init__(self, duration):
+        self.duration = duration
+        self.started = 0
+        self.finished = 0
+
+    def __str__(self):
+        return f'SlowTask({self.duration})'
+
+    def __await__(self):
+        return self.run().__await__()
+
+    async def run(self):
+        self.started += 1
+        await asyncio.sleep(self.duration)
+        self.finished += 1
+
+
+@pytest.mark.run_loop
+async def test_periodic_task_skips_overlapping_runs():
+    from crawler.scheduled_task import PeriodicTask
+
+    task = _SlowTask(0.05)
+    job = PeriodicTask(task=task, interval=1)
+    job.start(default_interval=1)
+    job.start(default_interval=1)
+    await job.running
+    assert task.started == 1
+    assert job.counters['skipped'] == 1
+
+    job.overlap = PeriodicTask.QUEUE
+    job.start(default_interval=1)
+    job.start(default_interval=1)
+    job.start(default_interval=1)
+    await asyncio.sleep(0.15)
+    assert task.started == 3
+    assert job.counters['queued'] == 1
+
+
+@pytest.mark.run_loop
+async def test_periodic_task_deadline():
+    from crawler.scheduled_task import PeriodicTask
+
+    task = _SlowTask(1)
+    job = PeriodicTask(task=task, interval=1, deadline=0.05)
+    job.start(default_interval=1)
+    await job.running
+    assert task.finished == 0
+    assert job.counters['overdue'] == 1
+
+
+def test_periodic_task_fixed_rate():
+    from crawler.scheduled_task import PeriodicTask
+
+    job = PeriodicTask(task=None, interval=10)
+    assert job.get_next_time(100, default_interval=60) == 100
+    # Next run does not depend on when previous one has finished
+    assert job.get_next_time(107, default_interval=60) == 110
+    # Missed periods are skipped rather than run in a burst
+    assert job.get_next_time(135, default_interval=60) == 140
+
+
+@pytest.mark.run_loop
+async def test_run_forever_independent_schedules():
+    from crawler.models.configs import ScheduleConfig
+
+    fast = _SlowTask(0.01)
+    fast.resource = attr.make_class('R', ['schedule'])(
+        ScheduleConfig(interval=0.05 / 60))
+    fast.name = 'fast'
+    slow = _SlowTask(0.5)
+    slow.resource = attr.make_class('R', ['schedule'])(
+        ScheduleConfig(interval=0.5 / 60))
+    slow.name = 'slow'
+
+    scheduler = Scheduler(tasks=[fast, slow])
+    with mock.patch('crawler.scheduler.get_config', _get_config_mock):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.run_forever(), 0.3)
+
+    # Fast resource is not held back by the slow one
+    assert fast.finished >= 4
+    assert slow.finished == 0
+    assert scheduler.stats()['fast']['runs'] == fast.started
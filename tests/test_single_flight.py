@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from crawler.single_flight import SingleFlight
+
+
+@pytest.mark.run_loop
+async def test_concurrent_calls_are_shared():
+    single_flight = SingleFlight(ttl=0)
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {'url': url}
+
+    results = await asyncio.gather(*[
+        single_flight.run(('simple', 'url'), fetch, 'url')
+        for _ in range(5)
+    ])
+    assert calls == ['url']
+    assert all(result == {'url': 'url'} for result in results)
+    assert single_flight.counters['shared'] == 4
+
+    # Nothing is cached without ttl
+    await single_flight.run(('simple', 'url'), fetch, 'url')
+    assert len(calls) == 2
+
+
+@pytest.mark.run_loop
+async def test_result_reused_within_ttl():
+    single_flight = SingleFlight(ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert await single_flight.run('key', fetch) == 1
+    assert await single_flight.run('key', fetch) == 1
+    assert single_flight.counters['cached'] == 1
+
+    single_flight.forget('key')
+    assert await single_flight.run('key', fetch) == 2
+
+
+@pytest.mark.run_loop
+async def test_errors_are_shared_but_not_cached():
+    single_flight = SingleFlight(ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('upstream is down')
+
+    results = await asyncio.gather(
+        single_flight.run('key', fetch),
+        single_flight.run('key', fetch),
+        return_exceptions=True,
+    )
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    with pytest.raises(RuntimeError):
+        await single_flight.run('key', fetch)
+    assert len(calls) == 2
+
+
+@pytest.mark.run_loop
+async def test_cancelled_leader_does_not_affect_waiters():
+    single_flight = SingleFlight(ttl=0)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return 'result'
+
+    leader = asyncio.ensure_future(single_flight.run('key', fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(single_flight.run('key', fetch))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert await waiter == 'result'
+    assert len(calls) == 1
+
+
+@pytest.mark.run_loop
+async def test_call_cancelled_without_waiters():
+    single_flight = SingleFlight(ttl=0)
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    callers = [asyncio.ensure_future(single_flight.run('key', fetch))
+               for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert cancelled == [1]
+    assert not single_flight._calls
@@ -2,10 +2,13 @@ import statistics
 
 import pytest
 
+from crawler.models.bid import daily_bids
 from crawler.models.stats import (
     _f,
+    get_bids_info,
     get_daily_profit,
     get_current_profit,
+    get_query_bids_info,
 )
 
 
@@ -27,6 +30,18 @@ async def test_get_current_profit(pg_engine):
     print(profit)
 
 
+@pytest.mark.run_loop
+async def test_get_query_bids_info(pg_engine):
+    bids = daily_bids()
+    async with pg_engine.acquire() as conn:
+        info = await get_query_bids_info(conn, bids)
+        expected = get_bids_info(await bids.fetch(conn))
+
+    assert info['active'] == expected['active']
+    assert info['rate'] == pytest.approx(expected['rate'])
+    assert info['amount'] == pytest.approx(expected['amount'])
+
+
 def test_info_calculation_empty_lists():
     assert _f(min, []) == 0
     assert _f(statistics.mean, []) == 0
@@ -38,3 +53,17 @@ def test_info_calculation():
     assert _f(min, data) == 2
     assert _f(statistics.mean, data) == 4
     assert _f(max, data) == 6
+
+
+def test_bids_info_counters():
+    from collections import namedtuple
+
+    Bid = namedtuple('Bid', 'rate amount status')
+    info = get_bids_info([
+        Bid(27.1, 100, 'new'),
+        Bid(27.3, 300, 'closed'),
+        Bid(27.0, 50, 'rejected'),
+    ])
+    assert info['total'] == 3
+    assert (info['active'], info['dropped'], info['closed']) == (1, 1, 1)
+    assert info['amount'] == {'min': 50, 'avg': 150, 'max': 300}
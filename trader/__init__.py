@@ -13,17 +13,20 @@ from utils import LoggableMixin
 
 
 class BaseTrader(ABC, LoggableMixin):
-    def __init__(self):
+    def __init__(self, *, http_client=None, engine=None, cache=None):
         self.amount = 0
-        self.engine = None
-        self.cache = None
+        # Shared engine and cache are owned by the factory
+        self.engine = engine
+        self.cache = cache
+        self.http_client = http_client
         super().__init__()
 
     async def init(self):
-        self.engine = await get_engine()
-        self.cache = Cache()  # todo: what about without a pool
-        # todo: maybe singletone for all traders
-        await self.cache._create_pool()
+        if self.engine is None:
+            self.engine = await get_engine()
+        if self.cache is None:
+            self.cache = Cache()
+            await self.cache._create_pool()
 
     @abstractmethod
     def trade(self, daily_data):
@@ -7,8 +7,9 @@ from utils import get_midnight, get_date_cache_key
 
 
 class ShiftTrader_v0(BaseTrader):
-    def __init__(self, starting_amount):
-        super().__init__()
+    def __init__(self, starting_amount, *,
+                 http_client=None, engine=None, cache=None):
+        super().__init__(http_client=http_client, engine=engine, cache=cache)
         # todo: this should be fund table
         self.amount = starting_amount  # operation money we use to buy currency
         # todo: init notifier
@@ -16,19 +17,17 @@ class ShiftTrader_v0(BaseTrader):
     async def daily(self):
         # fetch rate from cache
         now = datetime.now()
-        key = get_date_cache_key(now)
-        data = await self.cache.get(key)
+        key = self.cache.make_key(
+            'rates', 'privatbank', get_date_cache_key(now), 'USD')
+        # todo: iterate banks, iterate currencies
+        item = await self.cache.get(key)
+        if item is None:
+            self.logger.warning('No rates cached for %s, skip trading', key)
+            return
 
         # bank's perspective
-        sale = None
-        buy = None
-
-        # todo: iterate banks, iterate currencies
-        for item in data:
-            if item['ccy'] == 'USD':
-                sale = float(item['sale'])
-                buy = float(item['buy'])
-                break
+        sale = float(item['sale'])
+        buy = float(item['buy'])
         daily_data = {
             'date': get_midnight(now),
             'sale': sale,
@@ -37,7 +36,10 @@ class ShiftTrader_v0(BaseTrader):
         await self.trade(daily_data=daily_data)
 
     async def notify(self, message):
-        await notify(message)
+        session = None
+        if self.http_client is not None:
+            session = self.http_client.session
+        await notify(message, session=session)
 
     async def trade(self, daily_data):
         date = daily_data['date']
@@ -47,7 +49,7 @@ class ShiftTrader_v0(BaseTrader):
         bank = 'privatbank'
 
         self.logger.info('Trading on %.2f/%.2f', rate_sale, rate_buy)
-        await notify(f'{DOLLAR_ICON} {rate_sale:.2f}/{rate_buy:.2f}')
+        await self.notify(f'{DOLLAR_ICON} {rate_sale:.2f}/{rate_buy:.2f}')
 
         transactions = await self.hanging()
         self.logger.info('Handling hanging transactions')
@@ -58,7 +60,7 @@ class ShiftTrader_v0(BaseTrader):
                 rate_sale > t.rate_buy  # todo: we can add coefficient here
             ):
                 amount = await self.sale_transaction(t, rate_sale)
-                await notify(format_message('sale', amount, rate_sale, bank))
+                await self.notify(format_message('sale', amount, rate_sale, bank))
 
         # buy some amount of currency
         t = NewTransaction(
@@ -72,7 +74,7 @@ class ShiftTrader_v0(BaseTrader):
         #       'Cannot buy {:.2f}$. Available: {:.2f}UAH'.format(self.daily_amount, self.amount))
 
         self.amount -= t.price
-        await notify(format_message('buy', self.daily_amount, rate_buy, bank))
+        await self.notify(format_message('buy', self.daily_amount, rate_buy, bank))
         await self.add_transaction(t)
 
         self.logger.info('Amount in the end of the day: %.2f', self.amount)
@@ -2,7 +2,6 @@
 import base64
 
 import jinja2
-import aioredis
 import aiopg.sa
 import aiohttp_jinja2
 import aiohttp_session
@@ -10,6 +9,9 @@ from aiohttp_session.cookie_storage import EncryptedCookieStorage
 from cryptography import fernet
 
 import settings
+from crawler.db import MeteredEngine
+from crawler.cache import Cache, TieredCache
+from crawler.parser.pool import ParserPool
 from . import views
 from . import endpoints
 from . import filters
@@ -49,7 +51,8 @@ def setup_routes(app):
         '/transaction/delete/{t_id}', endpoints.delete_transaction)
 
     # export
-    # app.router.add_post('/export/csv', endpoints.export_to_csv)
+    app.router.add_post(
+        '/export/{export_format}', endpoints.export_bids, name='export')
 
     # resource
     app.router.add_get('/resource/{resource_id}', views.resource)
@@ -105,14 +108,15 @@ def setup_session(app):
 
 
 async def setup_cache(app):
-    redis = await aioredis.create_redis(settings.REDIS_URI)
-    app['cache'] = redis
+    cache = Cache()
+    await cache._create_pool()
+    # Dashboard reads rates written by crawler process
+    app['cache'] = TieredCache(cache)
+    app['cache'].start_listening()
 
 
 async def destroy_cache(app):
-    redis = app['cache']
-    redis.close()
-    await redis.wait_closed()
+    await app['cache'].close()
 
 
 async def init_pg(app):
@@ -122,9 +126,18 @@ async def init_pg(app):
         maxsize=settings.DATABASE_POOL_MAXSIZE,
         loop=app.loop,
     )
-    app['db'] = engine
+    app['db'] = MeteredEngine(engine)
 
 
 async def close_pg(app):
     app['db'].close()
     await app['db'].wait_closed()
+
+
+async def setup_parser_pool(app):
+    # Shared by all the refreshes, workers are spawned on first use
+    app['parser_pool'] = ParserPool()
+
+
+async def close_parser_pool(app):
+    await app['parser_pool'].close()
@@ -6,6 +6,7 @@ from .transaction_endpoints import (
     set_transaction_bought,
     set_transaction_sold,
     delete_transaction,
+    export_bids,
 )
 from .chart_endpoints import (
     get_daily_profit_month,
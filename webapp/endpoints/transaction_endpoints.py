@@ -1,7 +1,4 @@
 import datetime
-import csv
-import operator
-import tempfile
 
 import dateparser
 from aiohttp import web, hdrs
@@ -16,7 +13,9 @@ from crawler.models.transaction import (
     set_transaction_status,
     TransactionStatus,
 )
+from crawler.models.bid import bid, stream_bids_for_period
 from crawler.models.event import add_event, EventType
+from webapp.export import WRITERS
 from webapp.helpers import login_required, flash
 
 
@@ -89,45 +88,60 @@ async def delete_transaction(request):
     return web.HTTPFound(router['index'].url_for())
 
 
-def _dump_field(field):
-    if isinstance(field, bool):
-        return int(field)
-    elif isinstance(field, datetime.datetime):
-        return field.strftime(settings.DEFAULT_DATETIME_FORMAT)
-    else:
-        return field
-
-
 @login_required
-async def export_to_csv(request):
+async def export_bids(request):
+    """
+    Stream bids for the period as they are fetched from database.
+    """
     app = request.app
     router = app.router
     logger = app['logger']
     engine = app['db']
 
+    export_format = request.match_info.get('export_format')
+    writer_cls = WRITERS.get(export_format)
+    if writer_cls is None:
+        raise web.HTTPNotFound(text='No such export format')
+
+    try:
+        writer = writer_cls(bid.columns)
+    except RuntimeError as e:
+        flash(request, str(e))
+        return web.HTTPFound(router['admin'].url_for())
+
     form = await request.post()
     start_date = dateparser.parse(form['day_start'])
     datetime_day_end = dateparser.parse(form['day_end'])
     end_date = datetime_day_end + datetime.timedelta(days=1)
     logger.debug('Exporting bids for period %s - %s', start_date, end_date)
-    async with engine.acquire() as conn:
-        bids = await get_bids_for_period(
-            conn,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-    with tempfile.NamedTemporaryFile('w', delete=False) as f:
-        writer = csv.writer(f)
-        header = [*map(operator.attrgetter('name'), bid.columns)]
-        writer.writerow(header)
-        for b in bids:
-            writer.writerow([_dump_field(getattr(b, prop)) for prop in header])
 
     start_date_str = start_date.strftime('%d-%m-%y')
     end_date_str = datetime_day_end.strftime('%d-%m-%y')
-    filename = 'exported_bids_{}_{}.csv'.format(start_date_str, end_date_str)
+    filename = 'exported_bids_{}_{}.{}'.format(
+        start_date_str, end_date_str, writer.extension)
 
-    return web.FileResponse(path=f.name, headers={
+    response = web.StreamResponse(headers={
+        hdrs.CONTENT_TYPE: writer.content_type,
         hdrs.CONTENT_DISPOSITION: 'inline; filename="{}"'.format(filename)
     })
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    async with engine.acquire() as conn:
+        bids = stream_bids_for_period(
+            conn,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        try:
+            async for b in bids:
+                writer.write(b)
+                if writer.size >= settings.EXPORT_FLUSH_SIZE:
+                    await response.write(writer.flush())
+        finally:
+            # Ends cursor's transaction when client has gone away
+            await bids.aclose()
+
+    await response.write(writer.close())
+    await response.write_eof()
+    return response
@@ -0,0 +1,148 @@
+"""
+Writers turning rows into chunks of bytes which are sent to a client as soon
+as they are ready.
+"""
+import io
+import csv
+import datetime
+
+import sqlalchemy as sa
+
+import settings
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def dump_field(field):
+    if isinstance(field, bool):
+        return int(field)
+    elif isinstance(field, datetime.datetime):
+        return field.strftime(settings.DEFAULT_DATETIME_FORMAT)
+    else:
+        return field
+
+
+class CSVRowsWriter(object):
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    def __init__(self, columns):
+        self.names = [column.name for column in columns]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(self.names)
+
+    @property
+    def size(self):
+        return self._buffer.tell()
+
+    def write(self, row):
+        self._writer.writerow([dump_field(row[name]) for name in self.names])
+
+    def flush(self):
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def close(self):
+        return self.flush()
+
+
+class _ChunksSink(io.RawIOBase):
+    """
+    File object collecting written bytes until they are taken away.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Writer relies on offsets within the whole file
+        return self._position
+
+    @property
+    def size(self):
+        return sum(len(chunk) for chunk in self._chunks)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetRowsWriter(object):
+    content_type = 'application/octet-stream'
+    extension = 'parquet'
+
+    def __init__(self, columns, *, row_group_size=settings.STREAM_CHUNK_ROWS):
+        if pyarrow is None:
+            raise RuntimeError('Install pyarrow to export to parquet')
+
+        self.names = [column.name for column in columns]
+        self.schema = pyarrow.schema([
+            (column.name, self._get_type(column)) for column in columns
+        ])
+        self.row_group_size = row_group_size
+        self._rows = []
+        self._sink = _ChunksSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self.schema)
+
+    @staticmethod
+    def _get_type(column):
+        if isinstance(column.type, sa.Boolean):
+            return pyarrow.bool_()
+        if isinstance(column.type, sa.Integer):
+            return pyarrow.int64()
+        if isinstance(column.type, sa.Numeric):
+            return pyarrow.float64()
+        if isinstance(column.type, sa.DateTime):
+            return pyarrow.timestamp('us')
+        return pyarrow.string()
+
+    @property
+    def size(self):
+        return self._sink.size
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._rows:
+            return
+
+        arrays = [
+            pyarrow.array([row[name] for row in self._rows], type=field.type)
+            for name, field in zip(self.names, self.schema)
+        ]
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def flush(self):
+        return self._sink.pop()
+
+    def close(self):
+        self._write_row_group()
+        self._writer.close()
+        return self.flush()
+
+
+WRITERS = {
+    'csv': CSVRowsWriter,
+    'parquet': ParquetRowsWriter,
+}
@@ -90,6 +90,29 @@ def setup_flash(app):
     app.middlewares.append(flash_middleware)
 
 
+def dump_page_key(key):
+    """
+    Represent keyset pagination key as a query string parameter.
+    """
+    return ','.join(
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in key
+    )
+
+
+def load_page_key(value):
+    if not value:
+        return None
+
+    key = []
+    for part in value.split(','):
+        try:
+            key.append(int(part))
+        except ValueError:
+            key.append(datetime.fromisoformat(part))
+    return tuple(key)
+
+
 def create_password(raw_password):
     # todo: give me salt
     dk = hashlib.pbkdf2_hmac(
@@ -1,4 +1,3 @@
-import json
 import operator
 
 import yaml
@@ -7,6 +6,12 @@ import settings
 from utils import get_logger
 from crawler.scheduler import Scheduler
 from crawler.factory import Factory
+from crawler.single_flight import SingleFlight
+
+
+# Shared by all refreshes so manual refresh does not repeat requests made
+# moments ago
+single_flight = SingleFlight()
 
 
 async def load_yaml(filepath):
@@ -20,19 +25,23 @@ async def load_resources():
 
 
 async def get_cached_value(*, cache, key):
-    value = await cache.get(key)
-    if value is not None:
-        return json.loads(value)
+    return await cache.get(key)
 
 
-async def refresh_data():
+async def refresh_data(engine=None, parser_pool=None):
     logger = get_logger()
     logger.info('Refreshing initiated from webapp')
-    factory = Factory()
-    await factory.init_cache()
-    factory.load_resources()
-    tasks = factory.create()
-    scheduler = Scheduler(tasks=tasks)
-
-    await scheduler.run_tasks()
-    await scheduler.cleanup()
+    factory = Factory(
+        engine=engine,
+        single_flight=single_flight,
+        parser_pool=parser_pool,
+    )
+    await factory.init()
+    tasks = await factory.create_grabbers()
+    scheduler = Scheduler(tasks=tasks, http_client=factory.http_client)
+
+    try:
+        await scheduler.run_tasks()
+    finally:
+        await scheduler.cleanup()
+        await factory.cleanup()
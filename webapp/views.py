@@ -5,6 +5,8 @@ import aiohttp_jinja2
 from aiohttp import web
 from aiohttp_session import get_session
 
+from settings import PAGE_SIZE
+
 from crawler.helpers import load_config
 from crawler.models.transaction import (
     get_transactions,
@@ -12,13 +14,20 @@ from crawler.models.transaction import (
     UNCONFIRMED_STATUSES,
 )
 from crawler.models.resource import get_resource_by_id
-from crawler.models.rate import get_rates
+from crawler.models import get_page_key
+from crawler.models.rate import get_rates, RATE_PAGE_KEY
 from crawler.models.user import get_user
-from crawler.models.stats import collect_statistics, get_bids_info
+from crawler.models.stats import collect_statistics, get_daily_bids_info
 from crawler.models.configs import get_config_history
 from crawler.models.fund import get_investments
 from webapp.utils import refresh_data
-from webapp.helpers import login_required, flash, check_password
+from webapp.helpers import (
+    login_required,
+    flash,
+    check_password,
+    dump_page_key,
+    load_page_key,
+)
 
 
 @login_required
@@ -38,15 +47,19 @@ async def index(request):
             conn,
             statuses=[TransactionStatus.HANGING],
         )
+        # Only recent ones, completed transactions pile up
         completed = await get_transactions(
             conn,
             statuses=[TransactionStatus.COMPLETED],
+            limit=PAGE_SIZE,
         )
         stats = {
             'total_profit': 0,
             'expected_profit': 0,
             'current_profit': 0,
             'fund': {'USD': 0, 'UAH': 0},
+            # Aggregated by database
+            'daily_bids': await get_daily_bids_info(conn),
         }
 
     return {
@@ -64,7 +77,10 @@ async def loading(request):
     logger.info('Accessing loading page')
     task = getattr(app, 'refreshing', None)
     if task is None:
-        task = asyncio.ensure_future(refresh_data())
+        task = asyncio.ensure_future(refresh_data(
+            engine=app['db'],
+            parser_pool=app['parser_pool'],
+        ))
         callback = partial(done_refresh, app)
         task.add_done_callback(callback)
         app.refreshing = task
@@ -176,12 +192,21 @@ async def rates(request):
     logger = app['logger']
     engine = app['db']
 
+    try:
+        after = load_page_key(request.query.get('after'))
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid page')
     async with engine.acquire() as conn:
-        rates = await get_rates(conn)
+        rates = await get_rates(conn, after=after, limit=PAGE_SIZE)
+
+    next_page = None
+    if len(rates) == PAGE_SIZE:
+        next_page = dump_page_key(get_page_key(rates[-1], RATE_PAGE_KEY))
 
     logger.info('Accessing rates archive page')
     return {
         'rates': rates,
+        'next_page': next_page,
     }
 
 